@@ -1,4 +1,5 @@
 from .utils.footer import footer
 from .utils.map import generate_map
+from .utils.store import build_snapshot, load_snapshot
 
-__all__ = ["footer", "generate_map"]
\ No newline at end of file
+__all__ = ["footer", "generate_map", "build_snapshot", "load_snapshot"]
\ No newline at end of file
@@ -0,0 +1,155 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the aggregate cube of the prices
+# (count, sum, min, max per region / departement / city and fuel)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .store import FUELS, PRICE_COLUMNS, HASH_KEY, default_data_dir, write_atomic
+from .profiling import traced
+
+# Name of the cube file in the data directory
+CUBE_NAME = 'prix-des-carburants-en-france-flux-instantane-v2.cube.arrow'
+
+# Levels of the cube, from the coarsest to the finest
+LEVELS = ['region', 'departement', 'ville']
+
+# Labels of the fuels in the charts
+FUEL_LABELS = {'e10': 'E10', 'gazole': 'Gazole', 'sp95': 'SP95', 'sp98': 'SP98', 'e85': 'E85', 'gplc': 'GPLC'}
+
+
+@traced()
+def build_cube(df):
+    """
+    Build the cube with a single groupby over all the prices of the stations
+    Args:
+        df (dataframe): Snapshot with the columns of LEVELS and the *_prix columns
+    Returns:
+        cube (dataframe): One row per region, departement, city and fuel with the columns 'count', 'sum', 'min' and 'max'
+    """
+    levels = [level for level in LEVELS if level in df.columns]
+
+    # One row per station and available fuel
+    prices = df[PRICE_COLUMNS].to_numpy(dtype='float64')
+    rows, fuels = np.nonzero(~np.isnan(prices))
+
+    long = pd.DataFrame({level: np.asarray(df[level].to_numpy(dtype=object))[rows] for level in levels})
+    long['fuel'] = pd.Categorical.from_codes(fuels, FUELS)
+    long['prix'] = prices[rows, fuels]
+
+    cube = long.groupby(levels + ['fuel'], observed=True, dropna=False, sort=False)['prix'].agg(['count', 'sum', 'min', 'max'])
+    cube = cube.reset_index()
+    cube['fuel'] = cube['fuel'].astype(str)
+    return cube
+
+
+def update_cube(cube, previous, current, ids):
+    """
+    Update the cube after a new snapshot, recomputing only the locations of the changed stations
+    Args:
+        cube (dataframe): Cube of the previous snapshot
+        previous (dataframe): Previous snapshot (at least 'id' and the columns of LEVELS)
+        current (dataframe): New snapshot (at least 'id', the columns of LEVELS and the *_prix columns)
+        ids (array): Ids of the stations added, removed or updated
+    Returns:
+        cube (dataframe): Cube of the new snapshot
+    """
+    levels = [level for level in LEVELS if level in cube.columns]
+
+    # Locations where a station was added, removed or changed its prices
+    touched = pd.concat([
+        previous.loc[previous['id'].isin(ids), levels],
+        current.loc[current['id'].isin(ids), levels],
+    ]).astype(object)
+    touched = pd.MultiIndex.from_frame(touched).unique()
+
+    kept = cube[~pd.MultiIndex.from_frame(cube[levels].astype(object)).isin(touched)]
+    recomputed = build_cube(current[pd.MultiIndex.from_frame(current[levels].astype(object)).isin(touched)])
+
+    return pd.concat([kept, recomputed], ignore_index=True)
+
+
+@traced()
+def rollup(cube, level=None):
+    """
+    Aggregate the cube at a coarser level
+    Args:
+        cube (dataframe): Cube returned by build_cube
+        level (str): 'region', 'departement', 'ville', or None for the whole country
+    Returns:
+        summary (dataframe): One row per location and fuel with the columns 'count', 'sum', 'min', 'max' and 'mean'
+    """
+    keys = ['fuel'] if level is None else [level, 'fuel']
+    summary = cube.groupby(keys, sort=True).agg(
+        count=('count', 'sum'), sum=('sum', 'sum'), min=('min', 'min'), max=('max', 'max')
+    )
+    summary['mean'] = summary['sum'] / summary['count']
+    return summary.reset_index()
+
+
+@traced()
+def pivot(cube, level, value):
+    """
+    Build a table with one row per location and one column per fuel label
+    Args:
+        cube (dataframe): Cube returned by build_cube
+        level (str): 'region', 'departement' or 'ville'
+        value (str): 'count', 'sum', 'min', 'max' or 'mean'
+    Returns:
+        table (dataframe): Dataframe with the location column and one column per fuel label
+    """
+    summary = rollup(cube, level)
+    table = summary.pivot(index=level, columns='fuel', values=value)
+    table = table.reindex(columns=list(FUEL_LABELS)).rename(columns=FUEL_LABELS)
+    if value == 'count':
+        table = table.fillna(0).astype(int)
+    table.columns.name = None
+    return table.reset_index()
+
+
+def save_cube(cube, cube_path, snapshot_id):
+    """
+    Save the cube with the hash of the snapshot it was built from
+    Args:
+        cube (dataframe): Cube to save
+        cube_path (str): Path of the cube file
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    table = pa.Table.from_pandas(cube, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), HASH_KEY: snapshot_id.encode()})
+    write_atomic(cube_path, lambda tmp_path: feather.write_feather(table, tmp_path, compression='uncompressed'))
+
+
+def load_cube(cube_path, snapshot_id):
+    """
+    Load the cube if it was built from the given snapshot
+    Args:
+        cube_path (str): Path of the cube file
+        snapshot_id (str): Hash of the current snapshot
+    Returns:
+        cube (dataframe): Cube, or None if it is missing or out of date
+    """
+    if not os.path.exists(cube_path):
+        return None
+    table = feather.read_table(cube_path, memory_map=True)
+    if (table.schema.metadata or {}).get(HASH_KEY, b'').decode() != snapshot_id:
+        return None
+    return table.to_pandas()
+
+
+def default_cube_path():
+    """
+    Return the path of the cube file of the project
+    Args:
+        None
+    Returns:
+        cube_path (str): Path of the cube file
+    """
+    return os.path.join(default_data_dir(), CUBE_NAME)
@@ -0,0 +1,287 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the validation of the prices of a new snapshot:
+# absurd prices, missing or future dates, sudden jumps and outliers are quarantined
+# before the snapshot is written, and stale prices are flagged, using per-station
+# statistics kept from one snapshot to the next
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import numpy as np
+import pandas as pd
+
+from .store import FUELS, build_snapshot, write_atomic
+
+# Names of the files in the data directory
+STATE_NAME = 'prix-des-carburants-en-france-flux-instantane-v2.anomalies.arrow'
+QUARANTINE_NAME = 'prix-des-carburants-en-france-flux-instantane-v2.quarantine.arrow'
+
+# Name and version of the validation, stored in the snapshots it screened (change it when the checks change,
+# so that the snapshots screened by the previous checks are rebuilt and get a new hash)
+VALIDATION = 'anomalies-v2'
+
+# Reason of each quarantine code (0 means the price is kept)
+REASONS = ['', 'bounds', 'stale', 'jump', 'outlier', 'date']
+
+# Reasons of the prices recorded in the quarantine but kept in the snapshot (a station that has not updated
+# its price for a while still sells the fuel, it must not vanish from the counts, the averages and the map)
+FLAGGED_REASONS = ['stale']
+
+# Plausible prices in euros per litre
+PRICE_BOUNDS = (0.3, 4.0)
+
+# A price is stale if its update is older than this, its date is wrong if it is too far in the future
+STALE_DAYS = 60
+FUTURE_DAYS = 1
+
+# Jumps: robust z-score against the moving statistics of the station, once it has enough updates
+JUMP_Z = 8.0
+MIN_UPDATES = 3
+# Floor of the scale of a station, relative to its mean price (a station that never changes its price still moves a few cents)
+MIN_RELATIVE_SCALE = 0.02
+# Weight of a new update in the moving mean and mean absolute deviation
+ALPHA = 0.1
+
+# Outliers: robust z-score against the median and MAD of the fuel over all the stations of the snapshot
+OUTLIER_Z = 12.0
+
+# Scale of the median absolute deviation to the standard deviation of a normal distribution
+MAD_SCALE = 1.4826
+
+# Value of a missing date in the int64 columns
+MISSING_DATE = np.iinfo('int64').min
+
+
+def empty_state():
+    """
+    Return the statistics of no station
+    Args:
+        None
+    Returns:
+        state (dataframe): Dataframe with the columns 'id' and, per fuel, '{fuel}_mean', '{fuel}_mad', '{fuel}_count',
+            '{fuel}_last' (last update seen, in ns) and '{fuel}_pending' (rejected jump waiting for a confirmation)
+    """
+    columns = {'id': np.empty(0, dtype='int64')}
+    for fuel in FUELS:
+        columns[f'{fuel}_mean'] = np.empty(0, dtype='float32')
+        columns[f'{fuel}_mad'] = np.empty(0, dtype='float32')
+        columns[f'{fuel}_count'] = np.empty(0, dtype='int32')
+        columns[f'{fuel}_last'] = np.empty(0, dtype='int64')
+        columns[f'{fuel}_pending'] = np.empty(0, dtype='float32')
+    return pd.DataFrame(columns)
+
+
+def align_state(state, ids):
+    """
+    Align the statistics on the stations of a snapshot, new stations starting without statistics
+    Args:
+        state (dataframe): Statistics returned by empty_state or AnomalyDetector.screen
+        ids (array): Ids of the stations of the snapshot
+    Returns:
+        aligned (dict): Arrays of the columns of the state, one row per station of the snapshot
+    """
+    ids = np.asarray(ids, dtype='int64')
+    known = state['id'].to_numpy()
+    # Same stations in the same order as the previous snapshot: the statistics are copied as they are
+    if np.array_equal(known, ids):
+        return {column: state[column].to_numpy().copy() for column in state.columns}
+
+    order = np.argsort(known, kind='stable')
+    rows = order[np.searchsorted(known, ids, sorter=order).clip(0, len(known) - 1)] if len(known) else np.zeros(len(ids), dtype='int64')
+    found = known[rows] == ids if len(known) else np.zeros(len(ids), dtype=bool)
+
+    aligned = {'id': ids}
+    for column in state.columns.drop('id'):
+        values = state[column].to_numpy()
+        if column.endswith('_count'):
+            missing = 0
+        elif column.endswith('_last'):
+            missing = MISSING_DATE
+        else:
+            missing = np.nan
+        aligned[column] = np.full(len(ids), missing, dtype=values.dtype)
+        aligned[column][found] = values[rows[found]]
+    return aligned
+
+
+def robust_z(values):
+    """
+    Compute the robust z-score of values (distance to the median in median absolute deviations)
+    Args:
+        values (array): Values
+    Returns:
+        z (array): Robust z-scores (0 if the deviation is 0)
+    """
+    if len(values) == 0:
+        return np.zeros(0)
+    median = np.median(values)
+    mad = np.median(np.abs(values - median)) * MAD_SCALE
+    if mad == 0:
+        return np.zeros(len(values))
+    return (values - median) / mad
+
+
+class AnomalyDetector():
+    """
+    Validation stage between the download and the snapshot.
+    Each price goes through the checks in a single vectorized pass per fuel; the moving statistics take
+    a fixed number of values per station and fuel, and are saved next to the snapshot.
+    A jump is kept in quarantine until the station confirms the new price with a later update.
+    """
+    def __init__(self, state_path=None):
+        """
+        Load the statistics of the previous snapshots
+        Args:
+            state_path (str): Path of the statistics (no statistics if None or missing)
+        """
+        self.state_path = state_path
+        if state_path is not None and os.path.exists(state_path):
+            self.state = pd.read_feather(state_path)
+        else:
+            self.state = empty_state()
+        self.quarantine = pd.DataFrame({'id': [], 'fuel': [], 'maj': [], 'prix': [], 'reason': []})
+
+    def screen(self, df, now=None):
+        """
+        Quarantine the suspicious prices of a snapshot, flag the stale ones and update the statistics of the stations
+        Args:
+            df (dataframe): Snapshot read by read_csv_typed (float32 '*_prix', datetime '*_maj')
+            now (timestamp): Reference time of the stale check (current time if None)
+        Returns:
+            df (dataframe): Snapshot where the quarantined prices are missing, the stale prices being kept
+                (the records of both are kept in self.quarantine)
+        """
+        now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+        oldest = (now - pd.Timedelta(days=STALE_DAYS)).value
+        latest = (now + pd.Timedelta(days=FUTURE_DAYS)).value
+
+        state = align_state(self.state, df['id'].to_numpy())
+        quarantine = []
+        # The quarantined prices replace columns of a shallow copy, the dataframe of the caller is not modified
+        df = df.copy(deep=False)
+
+        for fuel in FUELS:
+            if f'{fuel}_prix' not in df.columns:
+                continue
+            price = df[f'{fuel}_prix'].to_numpy(dtype='float32', na_value=np.nan)
+            maj = df[f'{fuel}_maj']
+            # Dates in ns
+            date = pd.DatetimeIndex(maj).as_unit('ns').asi8
+
+            mean, mad = state[f'{fuel}_mean'], state[f'{fuel}_mad']
+            count, last, pending = state[f'{fuel}_count'], state[f'{fuel}_last'], state[f'{fuel}_pending']
+
+            # The checks only look at the stations selling the fuel
+            rows = np.flatnonzero(~np.isnan(price))
+            p, d = price[rows], date[rows]
+            m, c = mean[rows], count[rows]
+            code = np.zeros(len(rows), dtype='uint8')
+
+            # Zero, negative or absurd prices
+            code[(p < PRICE_BOUNDS[0]) | (p > PRICE_BOUNDS[1])] = 1
+
+            # Missing (NaT is the smallest int64) or future updates
+            code[(code == 0) & ((d == MISSING_DATE) | (d > latest))] = 5
+
+            # Old updates
+            code[(code == 0) & (d < oldest)] = 2
+
+            # Jumps against the statistics of the station, unless a later update confirms the pending price
+            new = d > last[rows]
+            scale = np.maximum(mad[rows] * MAD_SCALE, m * MIN_RELATIVE_SCALE)
+            with np.errstate(invalid='ignore'):
+                jump = (code == 0) & (c >= MIN_UPDATES) & (np.abs(p - m) > JUMP_Z * scale)
+            confirmed = jump & new & (p == pending[rows])
+            jump &= ~confirmed
+            code[jump] = 3
+
+            # Outliers among the other stations of the snapshot
+            kept = np.flatnonzero(code == 0)
+            code[kept[np.abs(robust_z(p[kept].astype('float64'))) > OUTLIER_Z]] = 4
+
+            # Update the statistics with the new accepted prices, a confirmed or first price resetting them
+            accepted = (code == 0) & new
+            reset = rows[accepted & ((c == 0) | confirmed)]
+            update = accepted & (c > 0) & ~confirmed
+            delta = p[update] - m[update]
+            update = rows[update]
+            mean[update] += ALPHA * delta
+            mad[update] = (1 - ALPHA) * mad[update] + ALPHA * np.abs(delta)
+            count[update] += 1
+            mean[reset], mad[reset], count[reset] = price[reset], 0, 1
+            pending[rows[accepted]] = np.nan
+            last[rows[accepted]] = d[accepted]
+
+            # A new rejected jump waits for its confirmation
+            waiting = jump & new
+            pending[rows[waiting]] = p[waiting]
+            last[rows[waiting]] = d[waiting]
+
+            flagged = rows[code > 0]
+            code = code[code > 0]
+            if len(flagged):
+                quarantine.append(pd.DataFrame({
+                    'id': df['id'].to_numpy('int64')[flagged],
+                    'fuel': fuel,
+                    'maj': maj.iloc[flagged].array,
+                    'prix': price[flagged],
+                    'reason': np.array(REASONS, dtype=object)[code],
+                }))
+                dropped = flagged[~np.isin(code, [REASONS.index(reason) for reason in FLAGGED_REASONS])]
+                if len(dropped):
+                    price = price.copy()
+                    price[dropped] = np.nan
+                    df[f'{fuel}_prix'] = price
+
+        self.state = pd.DataFrame(state)
+        if quarantine:
+            self.quarantine = pd.concat(quarantine, ignore_index=True)
+        else:
+            self.quarantine = self.quarantine.iloc[:0]
+        return df
+
+    def save(self, quarantine_path=None):
+        """
+        Save the statistics, and the records quarantined by the last screen
+        Args:
+            quarantine_path (str): Path of the quarantined records (not saved if None)
+        Returns:
+            None
+        """
+        if self.state_path is not None:
+            write_atomic(self.state_path, self.state.to_feather)
+        if quarantine_path is not None:
+            write_atomic(quarantine_path, self.quarantine.reset_index(drop=True).to_feather)
+
+
+def build_screened_snapshot(csv_path, snapshot_path):
+    """
+    Build the snapshot of a CSV without its suspicious prices, updating the statistics and the quarantine
+    saved next to the snapshot. The date checks are relative to the download of the CSV (its modification time),
+    so that rebuilding the snapshot of an old download does not flag all its prices.
+    Args:
+        csv_path (str): Path of the semicolon-separated CSV
+        snapshot_path (str): Path of the snapshot to write
+    Returns:
+        snapshot_path (str): Path of the written snapshot
+    """
+    data_dir = os.path.dirname(snapshot_path)
+    detector = AnomalyDetector(os.path.join(data_dir, STATE_NAME))
+    downloaded = pd.Timestamp(os.path.getmtime(csv_path), unit='s', tz='UTC')
+    build_snapshot(csv_path, snapshot_path, validate=lambda df: detector.screen(df, now=downloaded), validation=VALIDATION)
+    detector.save(os.path.join(data_dir, QUARANTINE_NAME))
+    return snapshot_path
+
+
+def load_quarantine(data_dir):
+    """
+    Load the records quarantined or flagged by the last download
+    Args:
+        data_dir (str): Data directory
+    Returns:
+        quarantine (dataframe): Dataframe with the columns 'id', 'fuel', 'maj', 'prix' and 'reason' (empty if none)
+    """
+    path = os.path.join(data_dir, QUARANTINE_NAME)
+    if not os.path.exists(path):
+        return pd.DataFrame({'id': [], 'fuel': [], 'maj': [], 'prix': [], 'reason': []})
+    return pd.read_feather(path)
@@ -0,0 +1,116 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the epsilon-greedy bandit simulation, running
+# every epsilon and every seed of a sweep as one batch of NumPy operations
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import numpy as np
+
+from .profiling import traced
+
+# Epsilon values offered by the dashboard
+EPSILON_VALUES = [0.01, 0.05, 0.1, 0.2, 0.5, 1.0]
+
+# Number of steps whose random numbers are drawn at once
+CHUNK_STEPS = 4096
+
+
+@traced()
+def simulate(rewards, epsilons, steps=1000, runs=1, noise=0.0, seed=0):
+    """
+    Simulate epsilon-greedy with incremental update (Sutton and Barto, p. 24) for every epsilon and run at once.
+    Each arm is a station and pulling it returns its price (plus a gaussian noise).
+    The greedy arm is tracked incrementally: arms are grouped in blocks of sqrt(arms) keeping their best arm,
+    and only a block whose best arm lost value is rescanned (ties keep the current best arm).
+    ValueError if no arm has a reward.
+    Args:
+        rewards (array): Mean reward of each arm (NaN arms are left out)
+        epsilons (list): Epsilon values to compare
+        steps (int): Number of steps of each run
+        runs (int): Number of runs (seeds) per epsilon
+        noise (float): Standard deviation of the gaussian noise added to the rewards
+        seed (int): Seed of the random generator
+    Returns:
+        result (dict): 'epsilons', 'regret' (mean cumulative regret, epsilons x steps),
+            'reward' (mean reward per step, epsilons x steps), 'counts' and 'values' (mean N and Q, epsilons x arms)
+    """
+    rewards = np.asarray(rewards, dtype='float64')
+    rewards = rewards[~np.isnan(rewards)]
+    epsilons = np.asarray(epsilons, dtype='float64')
+
+    arm_count = len(rewards)
+    if arm_count == 0:
+        raise ValueError('No reward to simulate: every arm is missing')
+    batch = len(epsilons) * runs
+    epsilon = np.repeat(epsilons, runs)
+    rng = np.random.default_rng(seed)
+
+    # Arms are grouped in blocks keeping their best value, padded with -inf arms that are never pulled
+    block_size = max(1, int(np.sqrt(arm_count)))
+    block_count = -(-arm_count // block_size)
+    width = block_count * block_size
+
+    Q = np.full((batch, width), -np.inf)  # q-value of actions
+    Q[:, :arm_count] = 0
+    N = np.zeros((batch, width), dtype='int64')  # action count
+    block_value = np.zeros((batch, block_count))
+    block_arm = np.tile(np.arange(block_count) * block_size, (batch, 1))
+
+    # Flat views: one fancy index per step instead of (row, arm) pairs
+    Q_flat, N_flat = Q.ravel(), N.ravel()
+    block_value_flat, block_arm_flat = block_value.ravel(), block_arm.ravel()
+    row_offset = np.arange(batch) * width
+    block_offset = np.arange(batch) * block_count
+    Q_blocks = Q.reshape(batch * block_count, block_size)
+
+    actions = np.empty((steps, batch), dtype='int64')
+    pulled = np.empty((steps, batch))
+
+    for start in range(0, steps, CHUNK_STEPS):
+        size = min(CHUNK_STEPS, steps - start)
+
+        # Random numbers of the chunk: explored arm of each step and run (-1 when exploiting) and noise
+        explore = rng.random((size, batch)) < epsilon
+        explored_arm = np.where(explore, rng.integers(0, arm_count, (size, batch)), -1)
+        noises = rng.normal(0.0, noise, (size, batch)) if noise > 0 else np.zeros((size, batch))
+
+        for t in range(size):
+            # Greedy arm of each run: best arm of its best block
+            greedy_arm = block_arm_flat[block_offset + block_value.argmax(axis=1)]
+            action = np.where(explored_arm[t] >= 0, explored_arm[t], greedy_arm)
+            reward = rewards[action] + noises[t]
+
+            cell = row_offset + action
+            count = N_flat[cell] + 1
+            value = Q_flat[cell]
+            value += 1 / count * (reward - value)  # inc. update rule
+            N_flat[cell] = count
+            Q_flat[cell] = value
+
+            # Best arm of the block: the pulled arm takes over if it beats it, the block is rescanned if its best arm went down
+            block = block_offset + action // block_size
+            best_value = block_value_flat[block]
+            is_best = block_arm_flat[block] == action
+            lost = is_best & (value < best_value)
+            better = is_best | (value > best_value)
+            block_value_flat[block] = np.where(better, value, best_value)
+            block_arm_flat[block] = np.where(better, action, block_arm_flat[block])
+            if lost.any():
+                rescan = block[lost]
+                best = Q_blocks[rescan].argmax(axis=1)
+                block_value_flat[rescan] = Q_blocks[rescan, best]
+                block_arm_flat[rescan] = (rescan - block_offset[lost]) * block_size + best
+
+            actions[start + t] = action
+            pulled[start + t] = reward
+
+    # Regret of each step against the best arm, averaged over the runs of each epsilon
+    regret = np.cumsum(rewards.max() - rewards[actions], axis=0).T.reshape(len(epsilons), runs, steps)
+
+    return {
+        'epsilons': epsilons,
+        'regret': regret.mean(axis=1),
+        'reward': pulled.T.reshape(len(epsilons), runs, steps).mean(axis=1),
+        'counts': N[:, :arm_count].reshape(len(epsilons), runs, arm_count).mean(axis=1),
+        'values': Q[:, :arm_count].reshape(len(epsilons), runs, arm_count).mean(axis=1),
+    }
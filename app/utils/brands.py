@@ -0,0 +1,297 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the brand of each station, keyed by the id of
+# the station (data/brand_by_id.csv) instead of the position of its row. On
+# request (python get_data.py --brands, PETRODASH_FETCH_BRANDS=1), the brands of
+# the new stations are fetched from a third-party API describing each station
+# (https://api.prix-carburants.2aaz.fr), a bounded number of stations at a time
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# Names of the brand files in the data directory
+BRAND_CSV_NAME = 'brand.csv'
+BRAND_TABLE_NAME = 'brand_by_id.csv'
+# Stations whose request failed, with the number of attempts and the time of the next one
+BRAND_RETRY_NAME = 'brand_by_id.retry.csv'
+
+# Brands that are not a real brand
+UNKNOWN_BRANDS = ['Marque inconnue', 'No Brand']
+
+# API describing a station by its id, with its brand (the objects listed in data/brand.txt)
+STATION_API_URL = 'https://api.prix-carburants.2aaz.fr/station/'
+
+# Maximum number of stations requested by one update (the other new stations wait for the next updates)
+MAX_BRAND_REQUESTS = 500
+
+# Delay before requesting again a station whose request failed, doubled at each failure up to the maximum
+RETRY_DELAY = pd.Timedelta(hours=1)
+MAX_RETRY_DELAY = pd.Timedelta(days=7)
+
+# Statuses telling that the API is overloaded: the rest of the update is left to the next one
+BACKOFF_STATUSES = (429, 500, 502, 503, 504)
+
+
+def ensure_brand_table(data_dir):
+    """
+    Return the id-keyed table, building it from brand.csv if the file has an 'id' column
+    (ValueError if no brand is keyed by station id: brand.csv without 'id' column and no table fetched yet)
+    Args:
+        data_dir (str): Data directory
+    Returns:
+        table_path (str): Path of the table
+    """
+    table_path = os.path.join(data_dir, BRAND_TABLE_NAME)
+    if os.path.exists(table_path):
+        return table_path
+
+    # The rows of a brand.csv without ids follow a snapshot that is long gone: they are never matched by position
+    csv_path = os.path.join(data_dir, BRAND_CSV_NAME)
+    if os.path.exists(csv_path) and 'id' in pd.read_csv(csv_path, nrows=0).columns:
+        df_brand = pd.read_csv(csv_path, usecols=['id', 'brand'], dtype={'id': 'int64'})
+        write_brand_table(table_path, df_brand)
+        return table_path
+
+    raise ValueError(
+        f"No brand keyed by station id in {data_dir}: run python get_data.py --brands to fetch the brands of the stations, "
+        f"or give {BRAND_CSV_NAME} an 'id' column"
+    )
+
+
+def legacy_brands(data_dir, ids):
+    """
+    Return the brands of a brand.csv without 'id' column (the file bundled with the project), its rows being matched
+    to the stations by position as the first versions of the dashboard did, until the brands keyed by id are fetched
+    Args:
+        data_dir (str): Data directory
+        ids (array): Ids of the stations
+    Returns:
+        brands (series): Categorical brand of each station (NaN beyond the rows of the file), None if there is no such file
+    """
+    csv_path = os.path.join(data_dir, BRAND_CSV_NAME)
+    if not os.path.exists(csv_path) or 'id' in pd.read_csv(csv_path, nrows=0).columns:
+        return None
+    brands = pd.read_csv(csv_path, usecols=['brand'], dtype={'brand': 'category'}, nrows=len(ids))['brand']
+    return brands.reindex(range(len(ids))).reset_index(drop=True)
+
+
+def station_brands(data_dir, ids):
+    """
+    Return the brand of each station, joined on the id-keyed table, or matched by position on the legacy brand.csv
+    while there is no table (ValueError if there is neither)
+    Args:
+        data_dir (str): Data directory
+        ids (array): Ids of the stations
+    Returns:
+        brands (series): Categorical brand of each station, in the order of ids (NaN if unknown)
+        keyed (bool): True if the brands are joined on the station id, False if they are matched by position
+    """
+    try:
+        return join_brands(ids, load_brand_table(ensure_brand_table(data_dir))), True
+    except ValueError:
+        brands = legacy_brands(data_dir, ids)
+        if brands is None:
+            raise
+        return brands, False
+
+
+def write_brand_table(table_path, df_brand):
+    """
+    Write the table atomically, one row per station
+    Args:
+        table_path (str): Path of the table
+        df_brand (dataframe): Dataframe with the columns 'id' and 'brand'
+    Returns:
+        None
+    """
+    df_brand = df_brand[['id', 'brand']].drop_duplicates('id', keep='last').sort_values('id')
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(table_path) + '.', suffix='.tmp', dir=os.path.dirname(os.path.abspath(table_path)))
+    with os.fdopen(fd, 'w', encoding='utf-8', newline='') as file:
+        df_brand.to_csv(file, index=False)
+    os.replace(tmp_path, table_path)
+
+
+def station_brand(value):
+    """
+    Read the name of the brand in a response of the station API
+    Args:
+        value (dict): Decoded JSON describing a station
+    Returns:
+        brand (str): Name of the brand ('Marque inconnue' if the station has none)
+    """
+    brand = value.get('Brand') if isinstance(value, dict) else None
+    name = brand.get('name') if isinstance(brand, dict) else None
+    return name or UNKNOWN_BRANDS[0]
+
+
+def load_retry_state(data_dir):
+    """
+    Load the stations whose brand request failed
+    Args:
+        data_dir (str): Data directory
+    Returns:
+        retry (dataframe): Dataframe indexed by id with the columns 'attempts' and 'retry_after' (UTC)
+    """
+    path = os.path.join(data_dir, BRAND_RETRY_NAME)
+    if not os.path.exists(path):
+        return pd.DataFrame({'attempts': pd.Series(dtype='int64'), 'retry_after': pd.Series(dtype='datetime64[ns, UTC]')},
+                            index=pd.Index([], dtype='int64', name='id'))
+    retry = pd.read_csv(path, dtype={'id': 'int64', 'attempts': 'int64'})
+    retry['retry_after'] = pd.to_datetime(retry['retry_after'], utc=True)
+    return retry.set_index('id')
+
+
+def update_brand_table(data_dir, ids, url=STATION_API_URL, session=None, max_requests=MAX_BRAND_REQUESTS, max_workers=4,
+                       timeout=(3.05, 10), now=None):
+    """
+    Fetch the brand of up to max_requests stations missing from the table, and add them to it.
+    A station without brand is stored as 'Marque inconnue'; a failed request (unknown station, network error,
+    overloaded API) is retried by a later update, after a delay doubled at each failure, and an overloaded API
+    (429 or 5xx) stops the update so that the remaining stations wait for the next one
+    Args:
+        data_dir (str): Data directory
+        ids (array): Ids of the stations of the current snapshot
+        url (str): URL of the station API, followed by the id of the station
+        session (requests.Session): Session used for the requests (a pooled session is created if None)
+        max_requests (int): Maximum number of stations requested
+        max_workers (int): Number of requests run at the same time
+        timeout (tuple): Connect and read timeouts of the requests, in seconds
+        now (timestamp): Current time (UTC), to schedule the retries
+    Returns:
+        nb_added (int): Number of stations added to the table
+        nb_failed (int): Number of stations whose request failed (requested again by a later update)
+    """
+    now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+    table_path = os.path.join(data_dir, BRAND_TABLE_NAME)
+    try:
+        table = load_brand_table(ensure_brand_table(data_dir))
+    except ValueError:
+        table = load_brand_table(None)
+
+    # New stations never requested first, then the failed stations whose delay is over, the oldest first
+    ids = np.asarray(ids, dtype='int64')
+    missing = np.setdiff1d(ids, table.index.to_numpy())
+    retry = load_retry_state(data_dir)
+    retry = retry[retry.index.isin(missing)]
+    missing = np.concatenate([
+        np.setdiff1d(missing, retry.index.to_numpy()),
+        retry[retry['retry_after'] <= now].sort_values('retry_after').index.to_numpy(),
+    ])[:max_requests]
+    if not len(missing):
+        return 0, 0
+
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+    overloaded = threading.Event()
+
+    def fetch(station_id):
+        # (brand, requested): the brand is None if the request failed
+        if overloaded.is_set():
+            return None, False
+        try:
+            response = session.get(f'{url}{station_id}', timeout=timeout)
+            if response.status_code in BACKOFF_STATUSES:
+                overloaded.set()
+            response.raise_for_status()
+            return station_brand(response.json()), True
+        except (requests.RequestException, ValueError):
+            return None, True
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(fetch, missing.tolist()))
+
+    brands = [brand for brand, _ in results]
+    fetched = np.array([brand is not None for brand in brands], dtype=bool)
+    failed = np.array([brand is None and requested for brand, requested in results], dtype=bool)
+    if fetched.any():
+        added = pd.DataFrame({'id': missing[fetched], 'brand': [brand for brand in brands if brand is not None]})
+        known = pd.DataFrame({'id': table.index.to_numpy(), 'brand': table.astype(object).to_numpy()})
+        write_brand_table(table_path, pd.concat([known, added], ignore_index=True))
+
+    # Delay of the failed stations, the fetched and the gone stations leaving the state
+    attempts = retry['attempts'].reindex(missing[failed], fill_value=0).to_numpy() + 1
+    delays = np.minimum(RETRY_DELAY.value * 2.0 ** (attempts - 1), MAX_RETRY_DELAY.value).astype('int64')
+    retry = pd.concat([
+        retry.drop(missing[fetched | failed], errors='ignore'),
+        pd.DataFrame({'attempts': attempts, 'retry_after': now + pd.to_timedelta(delays)}, index=pd.Index(missing[failed], name='id')),
+    ])
+    write_retry_state(data_dir, retry)
+    return int(fetched.sum()), int(failed.sum())
+
+
+def write_retry_state(data_dir, retry):
+    """
+    Write the stations whose brand request failed atomically (the file is removed when there is none)
+    Args:
+        data_dir (str): Data directory
+        retry (dataframe): Dataframe returned by load_retry_state
+    Returns:
+        None
+    """
+    path = os.path.join(data_dir, BRAND_RETRY_NAME)
+    if retry.empty:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    fd, tmp_path = tempfile.mkstemp(prefix=BRAND_RETRY_NAME + '.', suffix='.tmp', dir=os.path.abspath(data_dir))
+    with os.fdopen(fd, 'w', encoding='utf-8', newline='') as file:
+        retry.sort_index().reset_index().to_csv(file, index=False)
+    os.replace(tmp_path, path)
+
+
+def load_brand_table(table_path):
+    """
+    Load the table as categorical brands indexed by station id
+    Args:
+        table_path (str): Path of the table (None for an empty table)
+    Returns:
+        table (series): Brand of each station, indexed by id
+    """
+    if table_path is None:
+        return pd.Series([], index=pd.Index([], dtype='int64', name='id'), dtype='category', name='brand')
+
+    table = pd.read_csv(table_path, dtype={'id': 'int64', 'brand': 'category'})
+    return table.drop_duplicates('id', keep='last').set_index('id')['brand']
+
+
+def join_brands(ids, table):
+    """
+    Return the brand of each station with a hash lookup of its id
+    Args:
+        ids (array): Ids of the stations
+        table (series): Table returned by load_brand_table
+    Returns:
+        brands (series): Categorical brand of each station, in the order of ids (NaN if unknown)
+    """
+    positions = table.index.get_indexer(np.asarray(ids))
+
+    # Stations missing from the table keep the code -1 (NaN)
+    codes = np.full(len(positions), -1, dtype=table.cat.codes.dtype)
+    found = positions >= 0
+    codes[found] = table.cat.codes.to_numpy()[positions[found]]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=table.cat.categories), name='brand')
+
+
+def brand_counts(brands):
+    """
+    Count the stations of each brand
+    Args:
+        brands (series): Brand of each station
+    Returns:
+        df_summary_brand (dataframe): Dataframe with the columns 'Brand' and 'Number of stations'
+    """
+    counts = brands.value_counts()
+    counts = counts[(counts > 0) & ~counts.index.isin(UNKNOWN_BRANDS)]
+    return pd.DataFrame({'Brand': counts.index.astype(str), 'Number of stations': counts.to_numpy()})
@@ -0,0 +1,276 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the builders of the Altair charts of the pages
+# and the cache of their Vega-Lite specs: a chart is built and serialized once
+# per page, parameters and snapshot, then sent as is by every rerun
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import hashlib
+import threading
+from collections import OrderedDict
+
+import altair as alt
+import pandas as pd
+import pyarrow as pa
+
+from .aggregates import FUEL_LABELS, rollup, pivot
+from .brands import brand_counts
+from .timeseries import AUTO, MAX_POINTS, price_series
+
+# Range of the y axis of the evolution of the prices
+PRICE_DOMAIN = [1.0, 3.0]
+
+
+def bar_chart(data, x, y, x_title=None, y_title=None):
+    """
+    Build a bar chart
+    Args:
+        data (dataframe): Data of the chart
+        x (str): Column of the bars, with its type ('Carburant:O')
+        y (str): Column of the heights, with its type ('Number of stations:Q')
+        x_title (str): Title of the x axis (name of the column if None)
+        y_title (str): Title of the y axis (name of the column if None)
+    Returns:
+        chart (Chart): Altair chart
+    """
+    return alt.Chart(data).mark_bar().encode(
+        x=alt.X(x, title=x_title) if x_title else x,
+        y=alt.Y(y, title=y_title) if y_title else y,
+    )
+
+
+def stacked_bar_chart(data, x, columns, x_title, y_title, color_title):
+    """
+    Build a bar chart stacking several columns in each bar
+    Args:
+        data (dataframe): Data of the chart, one row per bar
+        x (str): Column of the bars, with its type ('Region:O')
+        columns (list): Columns stacked in each bar
+        x_title (str): Title of the x axis
+        y_title (str): Title of the y axis
+        color_title (str): Title of the legend of the columns
+    Returns:
+        chart (Chart): Altair chart
+    """
+    return alt.Chart(data).transform_fold(columns).mark_bar().encode(
+        x=alt.X(x, title=x_title),
+        y=alt.Y('value:Q', title=y_title),
+        color=alt.Color('key:N', title=color_title),
+    )
+
+
+def band_chart(data, x, y, low, high, x_title, y_title, domain=None):
+    """
+    Build a line chart over a band, on a temporal x axis
+    Args:
+        data (dataframe): Data of the chart, one row per point
+        x (str): Datetime column of the x axis
+        y (str): Column of the line
+        low (str): Column of the bottom of the band
+        high (str): Column of the top of the band
+        x_title (str): Title of the x axis
+        y_title (str): Title of the y axis
+        domain (list): Minimum and maximum of the y axis (fitted to the data if None)
+    Returns:
+        chart (LayerChart): Altair chart
+    """
+    scale = alt.Scale(domain=domain) if domain is not None else alt.Undefined
+    base = alt.Chart().encode(x=alt.X(f'{x}:T', title=x_title))
+    band = base.mark_area(opacity=0.3, clip=True).encode(
+        y=alt.Y(f'{low}:Q', title=y_title, scale=scale),
+        y2=alt.Y2(f'{high}:Q'),
+    )
+    line = base.mark_line(clip=True).encode(
+        y=alt.Y(f'{y}:Q', title=y_title, scale=scale),
+        tooltip=[alt.Tooltip(f'{x}:T', title=x_title), *[alt.Tooltip(f'{column}:Q', format='.3f') for column in (low, y, high)]],
+    )
+    return alt.layer(band, line, data=data)
+
+
+def stations_per_fuel_chart(cube):
+    """
+    Build the chart of the number of stations per fuel
+    Args:
+        cube (dataframe): Aggregate cube of the snapshot
+    Returns:
+        chart (Chart): Bar chart with one bar per fuel
+    """
+    summary_fuel = rollup(cube).set_index('fuel')
+    df_summary = pd.DataFrame({
+        'Carburant': list(FUEL_LABELS.values()),
+        'Number of stations': summary_fuel['count'].reindex(list(FUEL_LABELS)).fillna(0).astype(int).to_numpy(),
+    })
+    return bar_chart(df_summary, 'Carburant:O', 'Number of stations:Q')
+
+
+def price_per_fuel_chart(cube, carburants):
+    """
+    Build the chart of the average price per fuel
+    Args:
+        cube (dataframe): Aggregate cube of the snapshot, or of the rows of a city
+        carburants (list): Names of the fuels, in the order of the bars
+    Returns:
+        chart (Chart): Bar chart with one bar per fuel
+    """
+    summary_fuel = rollup(cube).set_index('fuel')
+    df_summary_price = pd.DataFrame({
+        'Carburant': list(carburants),
+        'Average price': [summary_fuel['mean'].get(carburant.lower()) for carburant in carburants],
+    })
+    return bar_chart(df_summary_price, 'Carburant:O', 'Average price:Q', 'Carburant', 'Average price')
+
+
+def per_region_chart(cube, value, y_title):
+    """
+    Build the chart of a value of each fuel per region
+    Args:
+        cube (dataframe): Aggregate cube of the snapshot
+        value (str): 'count' or 'mean'
+        y_title (str): Title of the y axis
+    Returns:
+        chart (Chart): Bar chart with one bar per region, stacking the fuels
+    """
+    df_summary_region = pivot(cube, 'region', value).rename(columns={'region': 'Region'})
+    return stacked_bar_chart(df_summary_region, 'Region:O', list(FUEL_LABELS.values()), 'Region', y_title, 'Carburant')
+
+
+def stations_per_brand_chart(brands):
+    """
+    Build the chart of the number of stations per brand
+    Args:
+        brands (series): Brand of each station
+    Returns:
+        chart (Chart): Bar chart with one bar per brand
+    """
+    return bar_chart(brand_counts(brands), 'Brand:O', 'Number of stations:Q', 'Brand', 'Number of stations')
+
+
+def price_evolution_chart(df_evolution, fuel, bucket=AUTO, max_points=MAX_POINTS):
+    """
+    Build the chart of the evolution of the price of a fuel: mean price of each bucket over the band of its
+    minimum and maximum prices
+    Args:
+        df_evolution (dataframe): Dataframe with the columns '{fuel}_maj' (datetime) and '{fuel}_prix'
+        fuel (str): Fuel in lowercase
+        bucket (str): Hourly, Daily, Weekly, Monthly, or Auto to choose it from the range of the dates
+        max_points (int): Maximum number of points sent to the browser
+    Returns:
+        chart (LayerChart): Band and line chart of the prices
+    """
+    series, bucket = price_series(df_evolution[f'{fuel}_maj'], df_evolution[f'{fuel}_prix'], bucket, max_points)
+    series = series.rename(columns={'min': 'Minimum price', 'mean': 'Average price', 'max': 'Maximum price'})
+    return band_chart(series, 'date', 'Average price', 'Minimum price', 'Maximum price', f'Date ({bucket.lower()})', 'Price', domain=PRICE_DOMAIN)
+
+
+def chart_spec(chart):
+    """
+    Serialize a chart into a Vega-Lite spec whose data is already in the Arrow format sent to the browser
+    Args:
+        chart (Chart): Altair chart built on a dataframe
+    Returns:
+        spec (dict): Vega-Lite spec, to be displayed with st.vega_lite_chart
+    """
+    table = pa.Table.from_pandas(chart.data, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    data = sink.getvalue().to_pybytes()
+
+    # The dataset is named after its content, as Altair does, so that the browser sees when the data changed
+    name = 'data-' + hashlib.sha1(data).hexdigest()[:16]
+    chart = chart.copy(deep=False)
+    chart.data = alt.NamedData(name=name)
+    spec = chart.to_dict()
+    spec['datasets'] = {name: data}
+    return spec
+
+
+class ChartCache():
+    """
+    Cache of the Vega-Lite specs of the charts, keyed by page, parameters and snapshot hash, shared by all the sessions.
+    A spec holds the aggregated data of its chart, so a hit skips the aggregation, the Altair validation and the
+    serialization of the data.
+    """
+    def __init__(self, max_entries=256, max_bytes=64 * 2 ** 20):
+        """
+        Create the cache
+        Args:
+            max_entries (int): Number of specs kept, the least recently used ones being dropped first
+            max_bytes (int): Size of the data of the kept specs, the least recently used ones being dropped first
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (page, params, snapshot_id) -> (spec, size of its data)
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.pages = {}  # page -> [hits, misses]
+
+    def get(self, page, params, snapshot_id, build):
+        """
+        Return the spec of a chart, building it on a miss
+        Args:
+            page (str): Name of the chart
+            params (tuple): Hashable parameters of the chart (selected fuel, region, dates...)
+            snapshot_id (str): Hash of the snapshot the chart is built on
+            build (function): Function without arguments returning the Altair chart
+        Returns:
+            spec (dict): Vega-Lite spec of the chart, shared by the sessions and not to be modified
+        """
+        key = (page, params, snapshot_id)
+        with self.lock:
+            entry = self.entries.get(key)
+            counters = self.pages.setdefault(page, [0, 0])
+            if entry is not None:
+                self.hits += 1
+                counters[0] += 1
+                self.entries.move_to_end(key)
+                return entry[0]
+            self.misses += 1
+            counters[1] += 1
+
+        # Built outside of the lock: two sessions missing the same chart at once both build it
+        spec = chart_spec(build())
+        size = sum(len(data) for data in spec['datasets'].values())
+
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = (spec, size)
+                self.size += size
+            while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+                _, (_, dropped) = self.entries.popitem(last=False)
+                self.size -= dropped
+        return spec
+
+    def clear(self):
+        """
+        Drop every spec and reset the counters
+        Args:
+            None
+        Returns:
+            None
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.pages = {}
+
+    def stats(self):
+        """
+        Return the counters of the cache
+        Args:
+            None
+        Returns:
+            stats (list): One dict per page with the keys 'page', 'hits', 'misses' and 'hit_rate'
+            entries (int): Number of cached specs
+            size (int): Size of the data of the cached specs in bytes
+        """
+        with self.lock:
+            rows = [
+                {'page': page, 'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses)}
+                for page, (hits, misses) in sorted(self.pages.items())
+            ]
+            return rows, len(self.entries), self.size
@@ -0,0 +1,157 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the index of the cities: every spelling of a
+# city ('PARIS', 'Paris', 'St-Étienne') shares one canonical key, and the keys
+# are sorted for prefix lookups
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import re
+import unicodedata
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+
+# Abbreviations written in full in the keys
+ABBREVIATIONS = {'st': 'saint', 'ste': 'sainte'}
+
+# Letters that are not decomposed by the unicode normalization
+LIGATURES = {'œ': 'oe', 'æ': 'ae'}
+
+
+def city_key(name):
+    """
+    Return the canonical key of a city name (without accent, in lowercase, words separated by a space,
+    abbreviations in full and without CEDEX suffix)
+    Args:
+        name (str): Name of the city
+    Returns:
+        key (str): Canonical key
+    """
+    text = unicodedata.normalize('NFKD', str(name)).casefold()
+    text = ''.join(character for character in text if not unicodedata.combining(character))
+    for ligature, letters in LIGATURES.items():
+        text = text.replace(ligature, letters)
+
+    words = re.sub(r'[^a-z0-9]+', ' ', text).split()
+    if 'cedex' in words:
+        words = words[:words.index('cedex')]
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in words)
+
+
+def city_keys(villes):
+    """
+    Return the canonical key of the city of each station, computing the key of each distinct spelling once
+    Args:
+        villes (series): City of each station (categorical or text, NaN if unknown)
+    Returns:
+        keys (categorical): Key of each station (NaN if unknown)
+    """
+    villes = villes.astype('category')
+    keys = np.array([city_key(name) for name in villes.cat.categories] + [None], dtype=object)
+    # Code -1 (unknown city) takes the last element, None
+    return pd.Categorical(keys[villes.cat.codes.to_numpy()])
+
+
+class CityIndex():
+    """
+    Index of the cities of a snapshot, built once per snapshot.
+    Each key is displayed with its most frequent spelling, and lookups are binary searches
+    in the sorted keys and in the sorted words of the keys.
+    """
+    def __init__(self, villes):
+        """
+        Build the index
+        Args:
+            villes (series): City of each station (categorical or text, NaN if unknown)
+        """
+        villes = villes.astype('category')
+        names = villes.cat.categories
+        counts = np.bincount(villes.cat.codes.to_numpy()[villes.cat.codes.to_numpy() >= 0], minlength=len(names))
+
+        keys = np.array([city_key(name) for name in names], dtype=object)
+        self.keys = sorted(set(keys) - {''})
+        positions = {key: position for position, key in enumerate(self.keys)}
+
+        # Key of each spelling, and key of each station (-1 if unknown)
+        spelling_codes = np.array([positions.get(key, -1) for key in keys], dtype='int32')
+        codes = villes.cat.codes.to_numpy()
+        self.codes = np.where(codes >= 0, spelling_codes[codes] if len(names) else codes, -1)
+
+        # Spellings of each key, the most frequent one being used as label
+        self.variants = [[] for _ in self.keys]
+        best = np.full(len(self.keys), -1)
+        for spelling, code in enumerate(spelling_codes):
+            if code < 0:
+                continue
+            self.variants[code].append(names[spelling])
+            # Most frequent spelling, the shortest one on a tie ('Lyon' rather than 'Lyon Cedex')
+            if best[code] < 0 or (counts[spelling], -len(names[spelling])) > (counts[best[code]], -len(names[best[code]])):
+                best[code] = spelling
+        self.labels = [names[spelling] for spelling in best]
+
+        # Words of the keys, to find 'Saint-Étienne' from 'etienne'
+        words = sorted((word, position) for position, key in enumerate(self.keys) for word in key.split()[1:])
+        self.words = [word for word, _ in words]
+        self.word_positions = [position for _, position in words]
+
+    def position(self, name):
+        """
+        Return the position of the key of a city name
+        Args:
+            name (str): Any spelling of the city
+        Returns:
+            position (int): Position of the key in self.keys, -1 if the city is unknown
+        """
+        key = city_key(name)
+        position = bisect_left(self.keys, key)
+        return position if position < len(self.keys) and self.keys[position] == key else -1
+
+    def spellings(self, name):
+        """
+        Return every spelling of a city in the snapshot
+        Args:
+            name (str): Any spelling of the city
+        Returns:
+            spellings (list): Names of the city in the snapshot
+        """
+        position = self.position(name)
+        return list(self.variants[position]) if position >= 0 else []
+
+    def mask(self, name):
+        """
+        Select the stations of a city, whatever its spelling
+        Args:
+            name (str): Any spelling of the city
+        Returns:
+            selected (array): Boolean mask of the stations
+        """
+        position = self.position(name)
+        return self.codes == position if position >= 0 else np.zeros(len(self.codes), dtype=bool)
+
+    def search(self, query, limit=50):
+        """
+        Find the cities whose key, or a word of it, starts with a query
+        Args:
+            query (str): Beginning of the name, with or without accents
+            limit (int): Maximum number of cities
+        Returns:
+            labels (list): Labels of the cities, in the order of their keys
+        """
+        prefix = city_key(query)
+        if not prefix:
+            return self.labels[:limit]
+
+        found = set()
+        start = bisect_left(self.keys, prefix)
+        for position in range(start, len(self.keys)):
+            if not self.keys[position].startswith(prefix) or len(found) >= limit:
+                break
+            found.add(position)
+
+        start = bisect_left(self.words, prefix)
+        for index in range(start, len(self.words)):
+            if not self.words[index].startswith(prefix) or len(found) >= limit:
+                break
+            found.add(self.word_positions[index])
+
+        return [self.labels[position] for position in sorted(found)]
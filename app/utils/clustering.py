@@ -0,0 +1,214 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the incremental clustering of the gas stations:
+# a mini-batch k-means where the missing prices are masked instead of replaced
+# by 0, warm-started from the centroids of the previous snapshot
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+
+import numpy as np
+
+from .store import write_atomic
+
+# Features of the clustering
+CLUSTER_FEATURES = ['latitude', 'longitude', 'gazole_prix', 'e10_prix', 'sp98_prix', 'sp95_prix', 'e85_prix', 'gplc_prix']
+
+# Number of stations of each mini-batch
+BATCH_SIZE = 4096
+
+# Number of mini-batches of a fit from scratch, and of a fit starting from the saved centroids
+COLD_STEPS = 150
+WARM_STEPS = 20
+
+# Weight kept by the counts of the saved centroids at each new snapshot, so that they follow the prices
+FORGET = 0.5
+
+# Number of stations labelled at once (bounds the memory of the distance matrix)
+CHUNK_SIZE = 65536
+
+
+def masked_features(X, mean, scale):
+    """
+    Standardize the features and separate the missing values
+    Args:
+        X (array): Features (NaN if missing)
+        mean (array): Mean of each feature
+        scale (array): Standard deviation of each feature
+    Returns:
+        values (array): Standardized features, 0 where missing
+        mask (array): 1 where the feature is known, 0 where missing
+    """
+    mask = ~np.isnan(X)
+    values = np.where(mask, (X - mean) / scale, 0)
+    return values, mask.astype('float64')
+
+
+def masked_distances(values, mask, centroids):
+    """
+    Compute the squared distances of the stations to the centroids on the known features only
+    Args:
+        values (array): Standardized features, 0 where missing
+        mask (array): 1 where the feature is known, 0 where missing
+        centroids (array): Centroids (k x features)
+    Returns:
+        distances (array): Squared distance of each station to each centroid (stations x k)
+    """
+    # sum over the known features of (x - c)^2, expanded into products of matrices
+    distances = (values ** 2).sum(axis=1)[:, None] - 2 * values @ centroids.T + mask @ (centroids ** 2).T
+    return np.maximum(distances, 0)
+
+
+class StationClustering():
+    """
+    Mini-batch k-means of the stations on their position and their prices.
+    The distances and the centroid updates only use the known features of each station, so a station that does
+    not sell a fuel is not pulled towards a price of 0. The centroids, the scaling of the features and the number
+    of stations seen by each centroid are saved, and the next snapshot starts from them with a few mini-batches.
+    """
+    def __init__(self, k=6, state_path=None, random_state=0):
+        """
+        Load the centroids of the previous snapshots
+        Args:
+            k (int): Number of clusters
+            state_path (str): Path of the saved centroids (fit from scratch if None, missing or of another k)
+            random_state (int): Seed of the mini-batches and of the initialization
+        """
+        self.k = k
+        self.state_path = state_path
+        self.rng = np.random.default_rng(random_state)
+        self.centroids = None
+        self.counts = None
+        self.mean = None
+        self.scale = None
+        self.warm = False
+
+        if state_path is not None and os.path.exists(state_path):
+            with np.load(state_path) as state:
+                if state['centroids'].shape == (k, len(CLUSTER_FEATURES)) and list(state['features']) == CLUSTER_FEATURES:
+                    self.centroids = state['centroids']
+                    self.counts = state['counts'] * FORGET
+                    self.mean = state['mean']
+                    self.scale = state['scale']
+                    self.warm = True
+
+    def init_centroids(self, values, mask):
+        """
+        Choose the first centroids among the stations with k-means++
+        Args:
+            values (array): Standardized features of a sample of stations, 0 where missing
+            mask (array): 1 where the feature is known, 0 where missing
+        Returns:
+            None
+        """
+        # The missing features of the chosen stations start at the mean (0 once standardized)
+        centroids = [values[self.rng.integers(len(values))]]
+        closest = masked_distances(values, mask, np.array(centroids))[:, 0]
+        for _ in range(1, self.k):
+            total = closest.sum()
+            row = self.rng.choice(len(values), p=closest / total) if total > 0 else self.rng.integers(len(values))
+            centroids.append(values[row])
+            closest = np.minimum(closest, masked_distances(values, mask, values[row][None])[:, 0])
+        self.centroids = np.array(centroids)
+        self.counts = np.zeros(self.centroids.shape)
+
+    def partial_fit(self, values, mask):
+        """
+        Move the centroids towards a mini-batch of stations
+        Args:
+            values (array): Standardized features of the mini-batch, 0 where missing
+            mask (array): 1 where the feature is known, 0 where missing
+        Returns:
+            None
+        """
+        labels = masked_distances(values, mask, self.centroids).argmin(axis=1)
+        members = np.zeros((len(values), self.k))
+        members[np.arange(len(values)), labels] = 1
+
+        # Each feature of a centroid is the running mean of the known values of its stations
+        sums = members.T @ values
+        counts = members.T @ mask
+        self.counts += counts
+        known = self.counts > 0
+        self.centroids[known] += (sums[known] - counts[known] * self.centroids[known]) / self.counts[known]
+
+        # A centroid that no station reached yet restarts from a station of the mini-batch
+        empty = np.flatnonzero(self.counts.sum(axis=1) == 0)
+        if len(empty):
+            self.centroids[empty] = values[self.rng.choice(len(values), len(empty))]
+
+    def fit(self, X):
+        """
+        Fit the centroids on the stations, from the saved centroids if there are some
+        Args:
+            X (array): Features of the stations in the order of CLUSTER_FEATURES (NaN if missing)
+        Returns:
+            clustering (StationClustering): The clustering itself
+        """
+        rows = np.flatnonzero(~np.isnan(X).all(axis=1))
+        if len(rows) == 0:
+            return self
+
+        if not self.warm:
+            with np.errstate(invalid='ignore'):
+                self.mean = np.nan_to_num(np.nanmean(X[rows], axis=0))
+                self.scale = np.nan_to_num(np.nanstd(X[rows], axis=0))
+            self.scale[self.scale == 0] = 1
+            sample = self.rng.choice(rows, min(len(rows), 10 * BATCH_SIZE), replace=False)
+            self.init_centroids(*masked_features(X[sample], self.mean, self.scale))
+
+        for _ in range(WARM_STEPS if self.warm else COLD_STEPS):
+            batch = rows[self.rng.integers(len(rows), size=min(len(rows), BATCH_SIZE))]
+            self.partial_fit(*masked_features(X[batch], self.mean, self.scale))
+        return self
+
+    def predict(self, X):
+        """
+        Assign each station to its closest centroid
+        Args:
+            X (array): Features of the stations in the order of CLUSTER_FEATURES (NaN if missing)
+        Returns:
+            labels (array): Cluster of each station (-1 if all its features are missing or nothing is fitted)
+            inertia (float): Mean squared distance of the stations to their centroid, per known feature
+        """
+        labels = np.full(len(X), -1, dtype='int64')
+        if self.centroids is None:
+            return labels, np.nan
+
+        total, known = 0.0, 0.0
+        for start in range(0, len(X), CHUNK_SIZE):
+            values, mask = masked_features(X[start:start + CHUNK_SIZE], self.mean, self.scale)
+            distances = masked_distances(values, mask, self.centroids)
+            features = mask.sum(axis=1)
+            chunk = np.where(features > 0, distances.argmin(axis=1), -1)
+            labels[start:start + CHUNK_SIZE] = chunk
+            total += distances[features > 0, chunk[features > 0]].sum()
+            known += features.sum()
+        return labels, total / known if known else np.nan
+
+    def centers(self):
+        """
+        Return the centroids in the units of the features
+        Args:
+            None
+        Returns:
+            centers (array): Centroids (k x features)
+        """
+        return self.centroids * self.scale + self.mean
+
+    def save(self):
+        """
+        Save the centroids for the next snapshot
+        Args:
+            None
+        Returns:
+            None
+        """
+        if self.state_path is None or self.centroids is None:
+            return
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as file:
+                np.savez(file, centroids=self.centroids, counts=self.counts, mean=self.mean, scale=self.scale,
+                         features=np.array(CLUSTER_FEATURES))
+
+        write_atomic(self.state_path, write)
@@ -0,0 +1,70 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the dataset shared by all the sessions: the
+# snapshot and its derived data are built once and handed out as views
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import threading
+import pandas as pd
+
+from .store import load_snapshot
+from .profiling import span
+
+
+class Dataset():
+    """
+    Read-only data of one snapshot, shared by all the sessions.
+    The snapshot is read once with memory-mapping, the derived data (names, brands, map columns, indexes)
+    are built once on first use, and the pages receive views that cost no copy.
+    The views share the memory of the dataset: the app enables the copy-on-write mode of pandas (see app.py) so that
+    a session modifying a view gets its own copy of the modified columns instead of modifying the other sessions' data.
+    """
+    def __init__(self, snapshot_path, snapshot_id, data_dir):
+        """
+        Load the snapshot
+        Args:
+            snapshot_path (str): Path of the columnar snapshot
+            snapshot_id (str): Hash of the snapshot
+            data_dir (str): Data directory (brands, cube)
+        """
+        self.snapshot_path = snapshot_path
+        self.snapshot_id = snapshot_id
+        self.data_dir = data_dir
+        self.df = load_snapshot(snapshot_path)
+        self.derived = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def frame(self, columns=None):
+        """
+        Return a view of the snapshot
+        Args:
+            columns (list): Columns of the view (all columns if None)
+        Returns:
+            df (dataframe): View of the snapshot, its data being copied only if it is modified
+        """
+        if columns is None:
+            return self.df.copy(deep=False)
+        return self.df[list(columns)]
+
+    def derive(self, name, build):
+        """
+        Return derived data of the snapshot, built once by the first session asking for it
+        Args:
+            name (str): Name of the derived data
+            build (function): Function building the data from the dataset
+        Returns:
+            value: Derived data (a view if it is a dataframe or a series)
+        """
+        # One lock per name: sessions asking for other data are not blocked by a build in progress
+        with self.lock:
+            lock = self.locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self.derived:
+                with span(f'build {name}'):
+                    self.derived[name] = build(self)
+            value = self.derived[name]
+
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value.copy(deep=False)
+        return value
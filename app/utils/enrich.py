@@ -0,0 +1,101 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the enrichment of the stations for the map
+# (coordinates in degrees, formatted dates, brand logos, highway stations),
+# applied to the stations sent to the browser only
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import numpy as np
+import pandas as pd
+
+from .store import PRICE_COLUMNS, DATE_COLUMNS
+from .stations import degrees
+from .profiling import traced
+
+# Names of the logo files that do not follow the brand name
+LOGO_NAMES = {
+    'nobrand': 'autre',
+    'totalenergies': 'total',
+    'totalenergiesaccess': 'totalaccess',
+    'marqueinconnue': 'autre',
+    'supermarchesspar': 'spar',
+    'supercasino': 'supermarchecasino',
+    'intermarchecontact': 'intermarche',
+    'e.leclerc': 'eleclerc',
+}
+
+# Labels of the 1440 minutes of a day
+TIME_LABELS = np.array([f'{minute // 60:02d}:{minute % 60:02d}' for minute in range(1440)], dtype=object)
+
+
+def format_dates(dates, missing='No Update'):
+    """
+    Format dates as 'dd/mm at HH:MM', formatting each distinct day once and looking up the time of day
+    Args:
+        dates (series): Datetime column
+        missing (str): Label of the missing dates
+    Returns:
+        labels (array): Formatted dates
+    """
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+
+    known = dates.notna().to_numpy()
+    minutes = dates.to_numpy().astype('datetime64[m]').astype('int64')[known]
+
+    days, day_index = np.unique(minutes // 1440, return_inverse=True)
+    day_labels = pd.to_datetime(days, unit='D').strftime('%d/%m at ').to_numpy(dtype=object)
+
+    labels = np.full(len(dates), missing, dtype=object)
+    labels[known] = day_labels[day_index] + TIME_LABELS[minutes % 1440]
+    return labels
+
+
+def logo_name(brand):
+    """
+    Return the name of the logo file of a brand (without space, without accent & in lowercase)
+    Args:
+        brand (str): Name of the brand
+    Returns:
+        logo (str): Name of the logo file, without extension
+    """
+    logo = brand.replace(' ', '').replace('à', 'a').replace('é', 'e').replace('è', 'e').lower()
+    return LOGO_NAMES.get(logo, logo)
+
+
+@traced()
+def enrich(df, brand):
+    """
+    Add the columns displayed by the map, working on whole columns and on the distinct brands only
+    Args:
+        df (dataframe): Snapshot or stations of build_stations (coordinates in 1e-5 degrees, datetime *_maj columns)
+        brand (series): Brand of each station, in the order of the rows of df
+    Returns:
+        df_map (dataframe): Copy of the snapshot with the columns formatted for the map
+    """
+    df_map = df.copy()
+
+    # Convert the coordinates of the stations from degrees to decimal
+    df_map['latitude'] = degrees(df_map['latitude'])
+    df_map['longitude'] = degrees(df_map['longitude'])
+
+    # Formatting of the update dates and times of the station by type of fuel
+    for column in DATE_COLUMNS:
+        df_map[column] = format_dates(df_map[column])
+
+    # Prices are stored as float32: round them back to the 3 decimals of the dataset for display
+    for column in PRICE_COLUMNS:
+        prices = df_map[column].astype('float64').round(3)
+        df_map[column] = prices.astype(object).where(prices.notna(), 'Not available in station')
+
+    # Brand and logo of each station, the logo being computed once per distinct brand
+    brands = pd.Series(np.asarray(brand, dtype=object)).reindex(range(len(df_map)))
+    brands = brands.replace('Marque inconnue', 'No Brand').fillna('No Brand').astype('category')
+    logos = np.array([logo_name(name) for name in brands.cat.categories], dtype=object)
+
+    df_map['brand'] = brands.to_numpy()
+    df_map['brand_logo'] = logos[brands.cat.codes.to_numpy()]
+
+    df_map['Autoroute'] = np.where(df_map['pop'].to_numpy() == 'A', 'Yes', 'No')
+
+    return df_map
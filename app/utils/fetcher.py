@@ -0,0 +1,198 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the functions to download a new CSV only when
+# it changed (conditional requests, streaming, retries, atomic write) and to
+# compute the stations whose prices changed between two snapshots
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import json
+import time
+import tempfile
+import requests
+import numpy as np
+import pandas as pd
+
+from .store import CSV_NAME, SNAPSHOT_NAME, PRICE_COLUMNS, DATE_COLUMNS, default_data_dir, load_snapshot, snapshot_hash
+from .aggregates import CUBE_NAME, LEVELS, build_cube, update_cube, load_cube, save_cube
+from .anomalies import build_screened_snapshot
+
+# Url of the CSV export of the dataset
+DATA_URL = "https://data.economie.gouv.fr/api/explore/v2.1/catalog/datasets/prix-des-carburants-en-france-flux-instantane-v2/exports/csv"
+
+# Name of the file listing the stations changed by the last download
+CHANGES_NAME = 'prix-des-carburants-en-france-flux-instantane-v2.changes.arrow'
+
+# Status codes worth retrying (server overloaded or temporarily unavailable)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Errors worth retrying: connection refused or dropped (also in the middle of the body), timeouts and retried statuses
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, requests.HTTPError)
+
+
+def _read_state(state_path):
+    """
+    Read the validators (ETag, Last-Modified) of the last download
+    Args:
+        state_path (str): Path of the JSON state file
+    Returns:
+        state (dict): Validators of the last download (empty if none)
+    """
+    try:
+        with open(state_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(state_path, state):
+    """
+    Write the validators of the last download atomically
+    Args:
+        state_path (str): Path of the JSON state file
+        state (dict): Validators to save
+    Returns:
+        None
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(state_path) + '.', suffix='.tmp', dir=os.path.dirname(os.path.abspath(state_path)))
+    with os.fdopen(fd, 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+    os.replace(tmp_path, state_path)
+
+
+def fetch_file(url, dest_path, state_path=None, session=None, chunk_size=1 << 16, retries=3, backoff=1.0, timeout=60):
+    """
+    Download a file only if it changed since the last download
+    Args:
+        url (str): Url of the file
+        dest_path (str): Path where the file is saved
+        state_path (str): Path of the JSON file keeping the ETag / Last-Modified (default: dest_path + '.state.json')
+        session (requests.Session): Session used for the requests (a new one if None)
+        chunk_size (int): Number of bytes written at a time
+        retries (int): Number of retries on network errors and 429/5xx responses
+        backoff (float): Delay in seconds before the first retry, doubled at each retry
+        timeout (float): Timeout in seconds of the connection and of each read
+    Returns:
+        status_code (int): 200 if a new file was written, 304 if the file did not change
+    """
+    state_path = state_path or dest_path + '.state.json'
+    session = session or requests.Session()
+
+    # Only send the validators if the file they describe is still there
+    headers = {}
+    state = _read_state(state_path) if os.path.exists(dest_path) else {}
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('last_modified'):
+        headers['If-Modified-Since'] = state['last_modified']
+
+    for attempt in range(retries + 1):
+        tmp_path = None
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 304:
+                    return 304
+
+                if response.status_code in RETRY_STATUS and attempt < retries:
+                    raise requests.HTTPError(f'{response.status_code} on {url}', response=response)
+                response.raise_for_status()
+
+                # Stream the body to a temporary file of its own (get_data.py and the refresh scheduler may
+                # download at the same time), then rename it over the previous one
+                fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(dest_path) + '.', suffix='.part', dir=os.path.dirname(os.path.abspath(dest_path)))
+                with os.fdopen(fd, 'wb') as file:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        file.write(chunk)
+                os.replace(tmp_path, dest_path)
+                tmp_path = None
+
+                _write_state(state_path, {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                })
+                return response.status_code
+
+        except RETRY_ERRORS as error:
+            status = getattr(error.response, 'status_code', None)
+            if attempt == retries or (status is not None and status not in RETRY_STATUS):
+                raise
+
+            time.sleep(backoff * 2 ** attempt)
+
+        finally:
+            # A partial body never stays on disk, whatever the error
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def diff_snapshots(previous, current):
+    """
+    Compute the stations whose prices changed between two snapshots
+    Args:
+        previous (dataframe): Previous snapshot (at least 'id' and the *_prix / *_maj columns)
+        current (dataframe): New snapshot
+    Returns:
+        changes (dataframe): One row per changed station with the columns 'id' and 'change' ('added', 'removed' or 'updated')
+    """
+    columns = [column for column in PRICE_COLUMNS + DATE_COLUMNS if column in previous.columns and column in current.columns]
+
+    merged = previous[['id'] + columns].merge(
+        current[['id'] + columns], on='id', how='outer', suffixes=('_old', '_new'), indicator=True
+    )
+
+    # Two missing values are equal, a missing value and a price are not
+    updated = np.zeros(len(merged), dtype=bool)
+    for column in columns:
+        old = merged[column + '_old']
+        new = merged[column + '_new']
+        updated |= ~((old == new) | (old.isna() & new.isna())).to_numpy()
+
+    change = np.select(
+        [merged['_merge'].to_numpy() == 'right_only', merged['_merge'].to_numpy() == 'left_only', updated],
+        ['added', 'removed', 'updated'],
+        default='',
+    )
+
+    changes = pd.DataFrame({'id': merged['id'].to_numpy(), 'change': change})
+    return changes[changes['change'] != ''].reset_index(drop=True)
+
+
+def update_snapshot(url=DATA_URL, data_dir=None, session=None):
+    """
+    Download the CSV if it changed, rebuild the snapshot without the suspicious prices (see AnomalyDetector),
+    save the stations that changed and update the aggregate cube
+    Args:
+        url (str): Url of the CSV export
+        data_dir (str): Data directory (default: ./data)
+        session (requests.Session): Session used for the requests
+    Returns:
+        changes (dataframe): Stations that changed (see diff_snapshots), None if the file did not change
+    """
+    data_dir = data_dir or default_data_dir()
+    csv_path = os.path.join(data_dir, CSV_NAME)
+    snapshot_path = os.path.join(data_dir, SNAPSHOT_NAME)
+
+    if fetch_file(url, csv_path, session=session) == 304:
+        return None
+
+    # Keep the prices of the previous snapshot before it is replaced
+    columns = ['id'] + LEVELS + PRICE_COLUMNS + DATE_COLUMNS
+    previous, previous_id = None, None
+    if os.path.exists(snapshot_path):
+        previous = load_snapshot(snapshot_path, columns=columns)
+        previous_id = snapshot_hash(snapshot_path)
+
+    # Quarantine the suspicious prices before they reach the snapshot, the history and the cube
+    build_screened_snapshot(csv_path, snapshot_path)
+    current = load_snapshot(snapshot_path, columns=columns)
+
+    changes = diff_snapshots(current.iloc[:0] if previous is None else previous, current)
+    changes.to_feather(os.path.join(data_dir, CHANGES_NAME))
+
+    # Update the aggregate cube, only recomputing the locations of the changed stations
+    cube_path = os.path.join(data_dir, CUBE_NAME)
+    cube = load_cube(cube_path, previous_id) if previous is not None else None
+    cube = build_cube(current) if cube is None else update_cube(cube, previous, current, changes['id'])
+    save_cube(cube, cube_path, snapshot_hash(snapshot_path))
+
+    return changes
@@ -0,0 +1,75 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the filter engine of the map: per-fuel bitsets
+# and per-location row lists, built once per snapshot and combined with ANDs
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import numpy as np
+
+from .stations import FUEL_BITS, fuel_mask
+
+# Columns whose values have their own list of rows (canonical key of the city, region)
+LOCATION_COLUMNS = ['city', 'region']
+
+# Row list of an unknown location
+NO_ROWS = np.empty(0, dtype='int64')
+
+
+def group_positions(values):
+    """
+    Group the row positions by value of a categorical column
+    Args:
+        values (series): Categorical column
+    Returns:
+        groups (dict): Sorted row positions of each category (rows without value are left out)
+    """
+    codes = values.cat.codes.to_numpy()
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories))
+
+    # Rows without value (code -1) come first in the order
+    bounds = np.cumsum(counts) + np.count_nonzero(codes < 0)
+    starts = bounds - counts
+    return {category: order[start:stop] for category, start, stop in zip(values.cat.categories, starts, bounds) if stop > start}
+
+
+class FilterIndex():
+    """
+    Index of the stations answering the filters of the map.
+    A location is resolved with its precomputed list of rows, the fuels with the bitmask of these rows,
+    and fuels alone with an AND of the packed bitsets of the fuels.
+    """
+    def __init__(self, stations):
+        """
+        Build the index
+        Args:
+            stations (dataframe): Table returned by build_stations
+        """
+        self.size = len(stations)
+        self.fuels = stations['fuels'].to_numpy()
+        self.bitsets = {fuel: np.packbits((self.fuels & bit) != 0) for fuel, bit in FUEL_BITS.items()}
+        self.locations = {column: group_positions(stations[column]) for column in LOCATION_COLUMNS}
+
+    def select(self, fuels=(), column=None, value=None):
+        """
+        Find the stations selling all the given fuels, in a location if one is given
+        Args:
+            fuels (list): Fuels in lowercase
+            column (str): Column of the location ('city' with a key of city_key, or 'region'), None for every location
+            value (str): Value of the location
+        Returns:
+            positions (array): Sorted row positions of the stations
+        """
+        if column is not None:
+            positions = self.locations[column].get(value, NO_ROWS)
+            if fuels:
+                mask = fuel_mask(fuels)
+                positions = positions[(self.fuels[positions] & mask) == mask]
+            return positions
+
+        if not fuels:
+            return np.arange(self.size)
+        bits = self.bitsets[fuels[0]]
+        for fuel in fuels[1:]:
+            bits = bits & self.bitsets[fuel]
+        return np.flatnonzero(np.unpackbits(bits, count=self.size))
@@ -0,0 +1,233 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the append-only history of the prices
+# (one Parquet directory per day, one row per station, fuel and update date)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .store import FUELS, default_data_dir, write_atomic
+from .locks import FileLock
+
+# Name of the history directory inside the data directory
+HISTORY_NAME = 'history'
+
+# Schema of the history files
+SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('fuel', pa.string()),
+    ('maj', pa.timestamp('us', tz='UTC')),
+    ('prix', pa.float32()),
+])
+
+# Key identifying a price record
+KEY = ['id', 'fuel', 'maj']
+
+# Name of the lock file of the history, in the history directory
+LOCK_NAME = '.lock'
+
+# Number of times a query lists the files again when a compaction removed them while they were read
+QUERY_ATTEMPTS = 5
+
+
+def default_history_dir():
+    """
+    Return the history directory of the project
+    Args:
+        None
+    Returns:
+        history_dir (str): Path of the history directory
+    """
+    return os.path.join(default_data_dir(), HISTORY_NAME)
+
+
+def snapshot_to_records(df, ids=None):
+    """
+    Convert a snapshot (one row per station) into price records (one row per station and fuel)
+    Args:
+        df (dataframe): Snapshot with the columns 'id', '*_prix' and '*_maj'
+        ids (array): Only keep these stations (all the stations if None)
+    Returns:
+        records (dataframe): Dataframe with the columns 'id', 'fuel', 'maj' and 'prix'
+    """
+    if ids is not None:
+        df = df[df['id'].isin(ids)]
+
+    records = []
+    for fuel in FUELS:
+        if f'{fuel}_prix' not in df.columns:
+            continue
+        rows = df[df[f'{fuel}_prix'].notna() & df[f'{fuel}_maj'].notna()]
+        records.append(pd.DataFrame({
+            'id': rows['id'].to_numpy('int64'),
+            'fuel': fuel,
+            'maj': pd.DatetimeIndex(pd.to_datetime(rows[f'{fuel}_maj'], utc=True)),
+            'prix': rows[f'{fuel}_prix'].to_numpy('float32'),
+        }))
+
+    return pd.concat(records, ignore_index=True)
+
+
+def history_lock(history_dir, shared=False):
+    """
+    Return the lock of the history, held by the threads of the dashboard and by get_data.py: exclusive for the
+    writers while they write a day, shared by the queries while they list the files, so that a query never sees a day
+    both in its compacted file and in the files it replaces
+    Args:
+        history_dir (str): History directory
+        shared (bool): True for a query, False for a writer
+    Returns:
+        lock (FileLock): Lock to use as a context manager
+    """
+    return FileLock(os.path.join(history_dir, LOCK_NAME), shared=shared)
+
+
+def _day_files(history_dir, day):
+    """
+    List the Parquet files of a day
+    Args:
+        history_dir (str): History directory
+        day (str): Day formatted as YYYY-MM-DD
+    Returns:
+        files (list): Paths of the files of the day
+    """
+    day_dir = os.path.join(history_dir, f'day={day}')
+    if not os.path.isdir(day_dir):
+        return []
+    return sorted(os.path.join(day_dir, name) for name in os.listdir(day_dir) if name.endswith('.parquet'))
+
+
+def _write_atomic(table, path):
+    """
+    Write a Parquet file in a temporary file then rename it
+    Args:
+        table (pyarrow.Table): Table to write
+        path (str): Path of the file
+    Returns:
+        None
+    """
+    write_atomic(path, lambda tmp_path: pq.write_table(table, tmp_path))
+
+
+def ingest(df, history_dir=None, ids=None):
+    """
+    Append the price records of a snapshot that are not already in the history
+    Args:
+        df (dataframe): Snapshot with the columns 'id', '*_prix' and '*_maj'
+        history_dir (str): History directory (default: ./data/history)
+        ids (array): Only ingest these stations, e.g. the stations changed since the previous snapshot
+    Returns:
+        nb_records (int): Number of records appended
+    """
+    history_dir = history_dir or default_history_dir()
+    records = snapshot_to_records(df, ids).drop_duplicates(KEY)
+    records['day'] = records['maj'].dt.strftime('%Y-%m-%d')
+
+    nb_records = 0
+    for day, new in records.groupby('day', sort=False):
+        new = new.drop(columns='day')
+
+        with history_lock(history_dir):
+            # Drop the records already written for this day (only the key columns are read)
+            files = _day_files(history_dir, day)
+            if files:
+                existing = pq.read_table(files, columns=KEY).to_pandas()
+                new = new.merge(existing, on=KEY, how='left', indicator=True)
+                new = new[new['_merge'] == 'left_only'].drop(columns='_merge')
+
+            if new.empty:
+                continue
+
+            day_dir = os.path.join(history_dir, f'day={day}')
+            os.makedirs(day_dir, exist_ok=True)
+            table = pa.Table.from_pandas(new.sort_values(['fuel', 'id', 'maj']), schema=SCHEMA, preserve_index=False)
+            _write_atomic(table, os.path.join(day_dir, f'part-{uuid.uuid4().hex}.parquet'))
+            nb_records += len(new)
+
+    return nb_records
+
+
+def compact(history_dir=None, before=None):
+    """
+    Merge the files of each past day into a single file sorted by fuel and station
+    (the lock is taken day by day, the queries waiting for at most one day)
+    Args:
+        history_dir (str): History directory (default: ./data/history)
+        before (str): Only compact the days strictly before this day (default: today, UTC)
+    Returns:
+        nb_days (int): Number of days compacted
+    """
+    history_dir = history_dir or default_history_dir()
+    before = before or pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%d')
+    if not os.path.isdir(history_dir):
+        return 0
+
+    nb_days = 0
+    for name in sorted(os.listdir(history_dir)):
+        day = name.partition('=')[2]
+        if not name.startswith('day=') or day >= before:
+            continue
+
+        with history_lock(history_dir):
+            files = _day_files(history_dir, day)
+            if len(files) < 2:
+                continue
+            table = pq.read_table(files, schema=SCHEMA).sort_by([('fuel', 'ascending'), ('id', 'ascending'), ('maj', 'ascending')])
+            _write_atomic(table, os.path.join(history_dir, name, f'part-{uuid.uuid4().hex}.parquet'))
+            for path in files:
+                os.remove(path)
+        nb_days += 1
+
+    return nb_days
+
+
+def query(fuel, start, end, ids=None, history_dir=None):
+    """
+    Read the price records of a fuel between two dates, reading only the days in the range
+    Args:
+        fuel (str): Fuel in lowercase (e.g. 'gazole')
+        start (date): First day of the range
+        end (date): Last day of the range (included)
+        ids (array): Only return these stations (all the stations if None)
+        history_dir (str): History directory (default: ./data/history)
+    Returns:
+        records (dataframe): Dataframe with the columns 'id', 'maj' and 'prix' sorted by date
+    """
+    history_dir = history_dir or default_history_dir()
+    start = pd.Timestamp(start).strftime('%Y-%m-%d')
+    end = pd.Timestamp(end).strftime('%Y-%m-%d')
+
+    condition = pc.field('fuel') == fuel
+    if ids is not None:
+        condition &= pc.field('id').isin(pa.array(pd.unique(pd.Series(ids)).astype('int64')))
+
+    empty = pd.DataFrame({'id': pd.Series(dtype='int64'), 'maj': pd.Series(dtype='datetime64[us, UTC]'), 'prix': pd.Series(dtype='float32')})
+    if not os.path.isdir(history_dir):
+        return empty
+
+    for attempt in range(QUERY_ATTEMPTS):
+        # Only the listing holds the lock (shared with the other queries), the files being read after it
+        with history_lock(history_dir, shared=True):
+            # Partition pruning: only list the directories of the requested days
+            files = []
+            for name in sorted(os.listdir(history_dir)):
+                day = name.partition('=')[2]
+                if start <= day <= end:
+                    files += _day_files(history_dir, day)
+
+        if not files:
+            return empty
+
+        try:
+            table = ds.dataset(files, schema=SCHEMA, format='parquet').to_table(columns=['id', 'maj', 'prix'], filter=condition)
+            return table.sort_by('maj').to_pandas()
+        except FileNotFoundError:
+            # A compaction replaced some of the listed files: the new listing finds the compacted file
+            if attempt == QUERY_ATTEMPTS - 1:
+                raise
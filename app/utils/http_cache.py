@@ -0,0 +1,146 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the client of the external APIs: requests run
+# in background threads on pooled connections, with timeouts, a TTL + LRU cache
+# of the responses and one request per URL whatever the number of sessions
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# API listing the stations of a city
+CITY_API_URL = 'https://api.prix-carburants.2aaz.fr/pdv_liste/'
+
+
+def city_url(ville, base_url=CITY_API_URL):
+    """
+    Return the URL listing the stations of a city
+    Args:
+        ville (str): Name of the city
+        base_url (str): URL of the API
+    Returns:
+        url (str): URL with the encoded query
+    """
+    return base_url + '?' + urlencode({'opendata': 'v2', 'q': ville})
+
+
+class HttpCache():
+    """
+    Cache of the responses of GET requests, shared by all the sessions.
+    get() never waits for the network: it returns the cached response (possibly expired, or None) and fetches
+    missing or expired URLs in the background, concurrent calls for the same URL sharing a single request.
+    """
+    def __init__(self, ttl=600, max_entries=256, timeout=(3.05, 10), max_workers=4, session=None):
+        """
+        Create the cache
+        Args:
+            ttl (float): Number of seconds a response stays fresh
+            max_entries (int): Number of responses kept, the least recently used ones being dropped first
+            timeout (tuple): Connect and read timeouts of the requests, in seconds
+            max_workers (int): Number of requests run at the same time
+            session (Session): Session of requests (a pooled session is created if None)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = OrderedDict()  # url -> (expiry time, response)
+        self.pending = {}  # url -> future of the request in flight
+        # Reentrant: the callback of a request finished before it is registered runs under the lock
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='http-cache')
+
+    def _fetch(self, url):
+        """
+        Request a URL and keep its response
+        Args:
+            url (str): URL to request
+        Returns:
+            value: Decoded JSON of the response (text if it is not JSON)
+        """
+        response = self.session.get(url, timeout=self.timeout, allow_redirects=True)
+        response.raise_for_status()
+        try:
+            value = response.json()
+        except ValueError:
+            value = response.text
+
+        with self.lock:
+            self.entries[url] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(url)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def _done(self, url, future):
+        """
+        Forget the request in flight of a URL once it is finished (failed requests are retried by the next call)
+        Args:
+            url (str): URL of the request
+            future (Future): Future of the request
+        Returns:
+            None
+        """
+        with self.lock:
+            if self.pending.get(url) is future:
+                del self.pending[url]
+
+    def submit(self, url):
+        """
+        Return the future of the response of a URL, starting a request only if it is neither cached nor in flight
+        Args:
+            url (str): URL to request
+        Returns:
+            future (Future): Future of the decoded response
+        """
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                self.entries.move_to_end(url)
+                future = Future()
+                future.set_result(entry[1])
+                return future
+
+            self.misses += 1
+            future = self.pending.get(url)
+            if future is None:
+                future = self.executor.submit(self._fetch, url)
+                self.pending[url] = future
+                future.add_done_callback(lambda done: self._done(url, done))
+            return future
+
+    def get(self, url, wait=0):
+        """
+        Return the response of a URL without waiting for the network: an expired response is returned
+        while it is refreshed in the background, a missing one is fetched in the background
+        Args:
+            url (str): URL to request
+            wait (float): Number of seconds to wait for a missing or expired response (0 to never block)
+        Returns:
+            value: Decoded response, or None if it is not available yet and the request did not succeed in time
+        """
+        future = self.submit(url)
+        try:
+            if wait or future.done():
+                return future.result(timeout=wait or None)
+        except Exception:
+            pass
+
+        with self.lock:
+            entry = self.entries.get(url)
+        return entry[1] if entry is not None else None
@@ -0,0 +1,73 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the lock files of the data directory, held by
+# the threads of the dashboard as well as by the other processes writing the data
+# (get_data.py run while the dashboard refreshes it in background)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Name of the lock file of the writers of the data directory
+DATA_LOCK_NAME = '.data.lock'
+
+
+class FileLock():
+    """
+    Lock on a file, for the threads of this process and for the other processes: exclusive for the writers,
+    shared by the readers (exclusive on Windows, which has no shared lock).
+    Each acquisition opens its own descriptor, so that two threads of the same process also wait for each other:
+    the lock is not reentrant. Use it as a context manager: with FileLock(path): ...
+    """
+    def __init__(self, path, shared=False):
+        """
+        Create the lock, without acquiring it
+        Args:
+            path (str): Path of the lock file (created if missing)
+            shared (bool): True for a lock shared with the other readers, False for an exclusive lock
+        """
+        self.path = path
+        self.shared = shared
+        self.file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.file = open(self.path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        else:
+            # LK_LOCK gives up after 10 seconds: wait until the lock is free
+            self.file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        return self
+
+    def __exit__(self, *args):
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        self.file = None
+
+
+def data_lock(data_dir):
+    """
+    Return the lock serializing the writers of a data directory (download, snapshot, history, cube)
+    Args:
+        data_dir (str): Data directory
+    Returns:
+        lock (FileLock): Lock to use as a context manager
+    """
+    return FileLock(os.path.join(data_dir, DATA_LOCK_NAME))
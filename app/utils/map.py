@@ -3,24 +3,134 @@
 # ------------------------------------------------------------------------------
 
 # Import libraries
+import numpy as np
+import pandas as pd
 import pydeck as pdk
 
+from .stations import degrees
+from .enrich import enrich
+from .profiling import span
+
+# Columns used by the layer and the tooltip, the only ones sent to the browser
+TOOLTIP_COLUMNS = [
+    'longitude', 'latitude', 'adresse', 'cp', 'ville', 'brand', 'brand_logo', 'Autoroute',
+    'gazole_prix', 'gazole_maj', 'sp98_prix', 'sp98_maj', 'e85_prix', 'e85_maj',
+    'sp95_prix', 'sp95_maj', 'e10_prix', 'e10_maj', 'gplc_prix', 'gplc_maj',
+]
+
+# Below this number of stations, every station is displayed whatever the zoom
+MAX_POINTS = 2000
+
+# From this zoom, the stations of the viewport are displayed instead of clusters
+DETAIL_ZOOM = 9
+
+# Size of the viewport and of a cluster in pixels
+VIEWPORT_PX = (1000, 600)
+CLUSTER_PX = 40
+
+
+def degrees_per_pixel(zoom):
+    """
+    Return the number of degrees of longitude covered by a pixel at a zoom level
+    Args:
+        zoom (float): Zoom level of the map
+    Returns:
+        degrees (float): Degrees per pixel
+    """
+    return 360 / (256 * 2 ** zoom)
+
+
+def viewport(data, latitude, longitude, zoom, index=None):
+    """
+    Keep the stations inside the viewport centered on a point
+    Args:
+        data (dataframe): Dataframe with the columns 'latitude' and 'longitude' in 1e-5 degrees
+        latitude (float): Latitude of the center of the map
+        longitude (float): Longitude of the center of the map
+        zoom (float): Zoom level of the map
+        index (SpatialIndex): Spatial index built on the rows of data, queried instead of scanning them (scan if None)
+    Returns:
+        data (dataframe): Stations inside the viewport, in the order of data
+    """
+    half_width = VIEWPORT_PX[0] / 2 * degrees_per_pixel(zoom)
+    # A degree of latitude is shorter on screen than a degree of longitude away from the equator
+    half_height = VIEWPORT_PX[1] / 2 * degrees_per_pixel(zoom) * np.cos(np.radians(latitude))
+
+    if index is not None:
+        positions = index.bbox(latitude - half_height, longitude - half_width, latitude + half_height, longitude + half_width)
+        return data.iloc[np.sort(positions)]
+
+    lat = degrees(data['latitude'])
+    lon = degrees(data['longitude'])
+    inside = (np.abs(lat - latitude) <= half_height) & (np.abs(lon - longitude) <= half_width)
+    return data[inside]
+
+
+def clusters(data, zoom):
+    """
+    Aggregate the stations on a grid whose cells are about CLUSTER_PX pixels wide
+    Args:
+        data (dataframe): Dataframe with the columns 'latitude' and 'longitude' in 1e-5 degrees
+        zoom (float): Zoom level of the map
+    Returns:
+        clusters (dataframe): One row per cell with the columns 'longitude', 'latitude', 'count' and 'radius'
+    """
+    cell = CLUSTER_PX * degrees_per_pixel(zoom)
+
+    lat = degrees(data['latitude'])
+    lon = degrees(data['longitude'])
+    known = ~np.isnan(lat) & ~np.isnan(lon)
+    lat, lon = lat[known], lon[known]
+
+    grid = pd.DataFrame({
+        'cell_x': np.floor(lon / cell).astype('int64'),
+        'cell_y': np.floor(lat / cell).astype('int64'),
+        'longitude': lon,
+        'latitude': lat,
+    })
+    clusters = grid.groupby(['cell_x', 'cell_y'], sort=False).agg(
+        longitude=('longitude', 'mean'), latitude=('latitude', 'mean'), count=('latitude', 'size')
+    ).reset_index(drop=True)
+
+    # Radius in meters growing with the square root of the number of stations
+    meters_per_pixel = degrees_per_pixel(zoom) * 111320
+    clusters['radius'] = np.sqrt(clusters['count'] / clusters['count'].max()) * CLUSTER_PX / 2 * meters_per_pixel
+    return clusters
+
+
 # Function to generate the map
-def generate_map(data):
+def generate_map(data, latitude=48.8566, longitude=2.3522, zoom=4, index=None):
     """
-    Generate the map with the data
+    Generate the map with the data, with clusters when zoomed out and the stations of the viewport when zoomed in
     Args:
-        data (dataframe): Dataframe with the data to display on the map
+        data (dataframe): Stations to display (table of build_stations), formatted for the tooltip once the level of detail is applied
+        latitude (float): Latitude of the center of the map
+        longitude (float): Longitude of the center of the map
+        zoom (float): Zoom level of the map
+        index (SpatialIndex): Spatial index built on the rows of data, used to find the stations of the viewport (None to scan them)
     Returns:
         map_ (map): Map with the data
     """
     view_state = pdk.ViewState(
-        latitude=48.8566,
-        longitude=2.3522,
-        zoom=4,
+        latitude=latitude,
+        longitude=longitude,
+        zoom=zoom,
         pitch=0,
     )
 
+    # Level of detail: clusters, stations of the viewport, or every station if there are few of them
+    if len(data) > MAX_POINTS and zoom < DETAIL_ZOOM:
+        with span('map clusters', stations=len(data)):
+            return generate_cluster_map(clusters(data, zoom), view_state)
+    if len(data) > MAX_POINTS:
+        with span('map viewport', stations=len(data)):
+            data = viewport(data, latitude, longitude, zoom, index)
+
+    # Display strings are built for the stations sent to the browser only
+    with span('map tooltip', stations=len(data)):
+        data = enrich(data, data['brand'])
+        data = data[[column for column in TOOLTIP_COLUMNS if column in data.columns]]
+
     def custom_tooltip():
         """
         Generate the tooltip
@@ -92,4 +202,40 @@ def generate_map(data):
         tooltip=custom_tooltip()
     )
 
+    return map_
+
+
+# Function to generate the map of the clusters
+def generate_cluster_map(clusters, view_state):
+    """
+    Generate the map of the clusters of stations
+    Args:
+        clusters (dataframe): Dataframe returned by clusters()
+        view_state (pdk.ViewState): View of the map
+    Returns:
+        map_ (map): Map with the clusters
+    """
+    layer = pdk.Layer(
+        "ScatterplotLayer",
+        data=clusters,
+        get_position=["longitude", "latitude"],
+        get_radius="radius",
+        get_color=[255, 0, 0, 160],
+        pickable=True,
+        auto_highlight=True,
+    )
+
+    map_ = pdk.Deck(
+        map_style="mapbox://styles/mapbox/light-v9",
+        layers=[layer],
+        initial_view_state=view_state,
+        tooltip={
+            "html": "<b>{count}</b> stations<br/>Zoom in to see the stations",
+            "style": {
+                "backgroundColor": "white",
+                "color": "black"
+            }
+        }
+    )
+
     return map_
\ No newline at end of file
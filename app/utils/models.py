@@ -0,0 +1,299 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the registry of the machine learning models
+# (trained once per fuel and snapshot, saved on disk, retrained in background)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_squared_error
+from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import Pipeline
+
+from .store import FUELS, load_snapshot, write_atomic
+from .clustering import CLUSTER_FEATURES, StationClustering
+from .profiling import traced
+
+# Models are not trained on fewer prices than this
+MIN_PRICES = 10
+
+
+def to_timestamp(dates):
+    """
+    Convert dates to POSIX timestamps in seconds
+    Args:
+        dates (series): Datetime column (UTC)
+    Returns:
+        timestamps (series): Number of seconds since 1970-01-01
+    """
+    return (dates - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)
+
+
+@traced()
+def train_regression(data, fuel):
+    """
+    Train the linear regression predicting the price of a fuel from the update date and the position
+    (ValueError if the snapshot has fewer than MIN_PRICES prices of the fuel)
+    Args:
+        data (dataframe): Snapshot with the columns '{fuel}_maj', 'latitude', 'longitude' and '{fuel}_prix'
+        fuel (str): Fuel in lowercase
+    Returns:
+        model (dict): Fitted pipeline, mean square error, actual and predicted prices of the test set
+    """
+    # Select the data for the machine learning and delete the rows with missing values
+    data_fuels = data[[f'{fuel}_maj', 'latitude', 'longitude', f'{fuel}_prix']].dropna()
+
+    # Convert the date to a timestamp
+    X = pd.DataFrame({
+        f'{fuel}_maj': to_timestamp(data_fuels[f'{fuel}_maj']),
+        'latitude': data_fuels['latitude'],
+        'longitude': data_fuels['longitude'],
+    })
+    y = data_fuels[f'{fuel}_prix'].astype('float64')
+    if len(y) < MIN_PRICES:
+        raise ValueError(f'Not enough {fuel} prices to train the model: {len(y)} (at least {MIN_PRICES})')
+    return fit_regression(X, y)
+
+
+def fit_regression(X, y):
+    """
+    Fit the linear regression of the prices on a training split and evaluate it on the test split
+    Args:
+        X (dataframe): Update timestamp, latitude and longitude of each price
+        y (series): Prices
+    Returns:
+        model (dict): Fitted pipeline, mean square error, actual and predicted prices of the test set
+    """
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    pipeline = Pipeline([
+        ('scaler', StandardScaler()),  # Standardize the data
+        ('regressor', LinearRegression())  # Fit a linear regression model
+    ])
+    pipeline.fit(X_train, y_train)
+    y_pred = pipeline.predict(X_test)
+
+    return {
+        'pipeline': pipeline,
+        'mse': mean_squared_error(y_test, y_pred),
+        'y_test': np.asarray(y_test),
+        'y_pred': y_pred,
+    }
+
+
+@traced()
+def train_clusters(data, k=6, state_path=None):
+    """
+    Group the stations with a mini-batch K-Means on their position and their prices, the missing prices being masked
+    Args:
+        data (dataframe): Snapshot with the columns of CLUSTER_FEATURES
+        k (int): Number of clusters
+        state_path (str): Path of the centroids of the previous snapshot, updated after the fit (fit from scratch if None)
+    Returns:
+        model (dict): Cluster of each station in the order of the rows of data (-1 without any feature), centroids
+            in the units of the features, inertia, and whether the fit started from the saved centroids
+    """
+    features = data[CLUSTER_FEATURES].to_numpy(dtype='float64', na_value=np.nan)
+
+    clustering = StationClustering(k, state_path)
+    warm = clustering.warm
+    clustering.fit(features)
+    labels, inertia = clustering.predict(features)
+    clustering.save()
+
+    return {
+        'labels': labels,
+        'centers': pd.DataFrame(clustering.centers(), columns=CLUSTER_FEATURES) if clustering.centroids is not None else None,
+        'inertia': inertia,
+        'warm': warm,
+    }
+
+
+class ModelRegistry():
+    """
+    Registry of the fitted models, keyed by model name and snapshot hash.
+    Models are kept in memory, saved on disk with joblib and trained by a single background worker.
+    The models of the last snapshots scheduled are kept (the live and the previous snapshot of the refresh scheduler).
+    """
+    def __init__(self, root, keep=2):
+        """
+        Create the registry
+        Args:
+            root (str): Directory where the models are saved
+            keep (int): Number of snapshots whose models are kept, the most recently scheduled ones
+        """
+        self.root = root
+        self.keep = keep
+        self.models = {}
+        self.futures = {}  # (name, snapshot_id) -> future of the training in flight
+        self.snapshots = []  # Hashes of the scheduled snapshots, in the order of their first schedule
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-registry')
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, name, snapshot_id):
+        """
+        Return the path of a saved model
+        Args:
+            name (str): Name of the model (e.g. 'regression-gazole')
+            snapshot_id (str): Hash of the snapshot the model is trained on
+        Returns:
+            path (str): Path of the joblib file
+        """
+        return os.path.join(self.root, f'{name}-{snapshot_id[:16]}.joblib')
+
+    def _train(self, name, snapshot_path, snapshot_id):
+        """
+        Train a model, save it and keep it in memory
+        Args:
+            name (str): 'regression-{fuel}' or 'clusters-{k}'
+            snapshot_path (str): Path of the columnar snapshot
+            snapshot_id (str): Hash of the snapshot
+        Returns:
+            model (dict): Trained model
+        """
+        kind, _, parameter = name.partition('-')
+        if kind == 'regression':
+            data = load_snapshot(snapshot_path, columns=[f'{parameter}_maj', 'latitude', 'longitude', f'{parameter}_prix'])
+            model = train_regression(data, parameter)
+        else:
+            # The centroids are not tied to a snapshot: each new snapshot starts from those of the previous one
+            state_path = os.path.join(self.root, f'{name}.npz')
+            model = train_clusters(load_snapshot(snapshot_path, columns=CLUSTER_FEATURES), int(parameter), state_path)
+
+        path = self.path(name, snapshot_id)
+        write_atomic(path, lambda tmp_path: joblib.dump(model, tmp_path))
+
+        self.models[(name, snapshot_id)] = model
+        return model
+
+    def _done(self, key, future):
+        """
+        Forget the training of a model once it is finished: a trained model is in memory and on disk,
+        a failed one is trained again by the next call
+        Args:
+            key (tuple): Name of the model and hash of the snapshot
+            future (Future): Future of the training
+        Returns:
+            None
+        """
+        with self.lock:
+            if self.futures.get(key) is future:
+                del self.futures[key]
+
+    def submit(self, name, snapshot_path, snapshot_id):
+        """
+        Queue the training of a model in the background worker, unless it is trained or queued already
+        Args:
+            name (str): 'regression-{fuel}' or 'clusters-{k}'
+            snapshot_path (str): Path of the columnar snapshot
+            snapshot_id (str): Hash of the snapshot
+        Returns:
+            future (Future): Future of the training, or None if the model is already available
+        """
+        key = (name, snapshot_id)
+        with self.lock:
+            if key in self.models or os.path.exists(self.path(name, snapshot_id)):
+                return None
+            future = self.futures.get(key)
+            if future is None:
+                future = self.executor.submit(self._train, name, snapshot_path, snapshot_id)
+                self.futures[key] = future
+                future.add_done_callback(lambda done: self._done(key, done))
+            return future
+
+    def schedule(self, snapshot_path, snapshot_id, k=6):
+        """
+        Queue the training of all the models of a snapshot, and forget the models of the snapshots scheduled
+        before the last ones kept
+        Args:
+            snapshot_path (str): Path of the columnar snapshot
+            snapshot_id (str): Hash of the snapshot
+            k (int): Number of clusters
+        Returns:
+            None
+        """
+        with self.lock:
+            # A rerun still reading the previous snapshot does not make it the most recent one again
+            if snapshot_id not in self.snapshots:
+                self.snapshots.append(snapshot_id)
+                del self.snapshots[:-self.keep]
+                kept = {kept_id[:16] for kept_id in self.snapshots}
+                for file_name in os.listdir(self.root):
+                    if file_name.endswith('.joblib') and file_name[:-len('.joblib')].rpartition('-')[2] not in kept:
+                        os.remove(os.path.join(self.root, file_name))
+                for key in [key for key in self.models if key[1][:16] not in kept]:
+                    del self.models[key]
+
+        for fuel in FUELS:
+            self.submit(f'regression-{fuel}', snapshot_path, snapshot_id)
+        self.submit(f'clusters-{k}', snapshot_path, snapshot_id)
+
+    def get(self, name, snapshot_path, snapshot_id):
+        """
+        Return a model, from memory, from disk, from the background worker or by training it now
+        (a model still waiting in the queue of the worker is trained now, in the thread of the caller)
+        Args:
+            name (str): 'regression-{fuel}' or 'clusters-{k}'
+            snapshot_path (str): Path of the columnar snapshot
+            snapshot_id (str): Hash of the snapshot
+        Returns:
+            model (dict): Trained model
+        """
+        key = (name, snapshot_id)
+        if key in self.models:
+            return self.models[key]
+
+        path = self.path(name, snapshot_id)
+        if os.path.exists(path):
+            self.models[key] = joblib.load(path)
+            return self.models[key]
+
+        future = self.submit(name, snapshot_path, snapshot_id)
+        if future is None:
+            return self.get(name, snapshot_path, snapshot_id)
+
+        # The requested model jumps the queue: a page does not wait for the trainings scheduled before it
+        if future.cancel():
+            future = Future()
+            with self.lock:
+                current = self.futures.setdefault(key, future)
+            if current is future:
+                try:
+                    future.set_result(self._train(name, snapshot_path, snapshot_id))
+                except Exception as error:
+                    future.set_exception(error)
+                finally:
+                    self._done(key, future)
+            future = current
+
+        # Wait for the training in progress rather than training the same model twice
+        return future.result()
+
+    def predict(self, fuel, snapshot_path, snapshot_id, timestamp, latitude, longitude):
+        """
+        Predict the price of a fuel at a date and a position
+        Args:
+            fuel (str): Fuel in lowercase
+            snapshot_path (str): Path of the columnar snapshot
+            snapshot_id (str): Hash of the snapshot
+            timestamp (float): POSIX timestamp of the prediction
+            latitude (float): Latitude (same unit as the snapshot)
+            longitude (float): Longitude (same unit as the snapshot)
+        Returns:
+            price (float): Predicted price
+        """
+        pipeline = self.get(f'regression-{fuel}', snapshot_path, snapshot_id)['pipeline']
+        nouvelles_donnees = pd.DataFrame({
+            f'{fuel}_maj': [timestamp],
+            'latitude': [latitude],
+            'longitude': [longitude]
+        })
+        return float(np.asarray(pipeline.predict(nouvelles_donnees))[0])
@@ -0,0 +1,325 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the instrumentation of the dashboard: spans
+# timing the stages of a rerun, optional cProfile capture, and the export of the
+# traces in the Chrome trace format (chrome://tracing, Perfetto)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import io
+import os
+import time
+import pstats
+import cProfile
+import threading
+import functools
+import contextvars
+from collections import deque
+
+# Environment variable enabling the traces of every rerun ('1'), with a cProfile capture ('cprofile')
+PROFILE_ENV = 'PETRODASH_PROFILE'
+
+# Trace of the rerun running in the current thread (None when the instrumentation is disabled)
+_current = contextvars.ContextVar('petrodash_trace', default=None)
+
+
+def profile_mode():
+    """
+    Read the instrumentation requested by the environment
+    Args:
+        None
+    Returns:
+        enabled (bool): True if every rerun is traced
+        profile (bool): True if every rerun is also captured with cProfile
+    """
+    value = os.environ.get(PROFILE_ENV, '').strip().lower()
+    return value not in ('', '0', 'false', 'no'), value == 'cprofile'
+
+
+class Span():
+    """
+    Timed stage of a trace, used as a context manager
+    """
+    __slots__ = ('trace', 'name', 'args', 'start', 'depth')
+
+    def __init__(self, trace, name, args):
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.depth = self.trace.depth
+        self.trace.depth += 1
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        self.trace.depth -= 1
+        self.trace.spans.append({
+            'name': self.name,
+            'start': self.start - self.trace.start,
+            'duration': end - self.start,
+            'depth': self.depth,
+            'args': self.args,
+        })
+        return False
+
+
+class NullSpan():
+    """
+    Span doing nothing, returned when the instrumentation is disabled
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name, **args):
+    """
+    Time a stage of the current rerun
+    Args:
+        name (str): Name of the stage
+        **args: Values displayed with the stage (page, fuel, number of rows...)
+    Returns:
+        span (Span): Context manager recording the stage (NULL_SPAN if the rerun is not traced)
+    """
+    trace = _current.get()
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name, args)
+
+
+def traced(name=None):
+    """
+    Decorator timing each call of a function in the current rerun
+    Args:
+        name (str): Name of the stage (qualified name of the function if None)
+    Returns:
+        decorator (function): Decorator of the function
+    """
+    def decorator(function):
+        stage = name or f'{function.__module__}.{function.__qualname__}'
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return function(*args, **kwargs)
+            with Span(trace, stage, {}):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class Trace():
+    """
+    Spans of one rerun, recorded between start_recording() and stop_recording() in the thread running the script.
+    The functions called in other threads (model training, API requests) are not traced.
+    """
+    def __init__(self, name='rerun', profile=False):
+        """
+        Create the trace
+        Args:
+            name (str): Name of the trace (title of the page)
+            profile (bool): True to also capture the rerun with cProfile
+        """
+        self.name = name
+        self.spans = []
+        self.depth = 0
+        self.start = None
+        self.duration = None
+        self.timestamp = None
+        self.profiler = cProfile.Profile() if profile else None
+
+    def __enter__(self):
+        return self.start_recording()
+
+    def __exit__(self, *exc_info):
+        self.stop_recording()
+        return False
+
+    def start_recording(self):
+        """
+        Make the trace the current trace of the thread
+        Args:
+            None
+        Returns:
+            trace (Trace): The trace itself
+        """
+        self.timestamp = time.time()
+        self.start = time.perf_counter_ns()
+        _current.set(self)
+        if self.profiler is not None:
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another session is being profiled (a single profiler at a time since Python 3.12)
+                self.profiler = None
+        return self
+
+    def stop_recording(self):
+        """
+        Stop recording the spans of the thread
+        Args:
+            None
+        Returns:
+            None
+        """
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.duration = time.perf_counter_ns() - self.start
+        _current.set(None)
+
+    def profile_text(self, sort='cumulative', limit=40):
+        """
+        Format the cProfile capture of the rerun
+        Args:
+            sort (str): Sort key of pstats ('cumulative', 'tottime', 'ncalls')
+            limit (int): Number of functions displayed
+        Returns:
+            text (str): Statistics of the functions ('' if the rerun was not profiled)
+        """
+        if self.profiler is None:
+            return ''
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+
+class TraceLog():
+    """
+    Last traces of all the sessions, shared by the process
+    """
+    def __init__(self, max_traces=50):
+        """
+        Create an empty log
+        Args:
+            max_traces (int): Number of traces kept, the oldest being dropped
+        """
+        self.entries = deque(maxlen=max_traces)
+        self.lock = threading.Lock()
+
+    def add(self, trace):
+        """
+        Add a finished trace
+        Args:
+            trace (Trace): Trace of a rerun
+        Returns:
+            None
+        """
+        with self.lock:
+            self.entries.append(trace)
+
+    def clear(self):
+        """
+        Drop every trace
+        Args:
+            None
+        Returns:
+            None
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def traces(self):
+        """
+        Return the traces, the most recent first
+        Args:
+            None
+        Returns:
+            traces (list): Traces of the log
+        """
+        with self.lock:
+            return list(reversed(self.entries))
+
+    def summary(self):
+        """
+        Aggregate the spans of all the traces by name
+        Args:
+            None
+        Returns:
+            summary (list): One dict per span name with the keys 'span', 'calls', 'total_ms', 'mean_ms' and 'max_ms',
+                the slowest in total first
+        """
+        stats = {}
+        for trace in self.traces():
+            for item in trace.spans:
+                calls, total, longest = stats.get(item['name'], (0, 0, 0))
+                stats[item['name']] = (calls + 1, total + item['duration'], max(longest, item['duration']))
+
+        summary = [
+            {'span': name, 'calls': calls, 'total_ms': total / 1e6, 'mean_ms': total / calls / 1e6, 'max_ms': longest / 1e6}
+            for name, (calls, total, longest) in stats.items()
+        ]
+        return sorted(summary, key=lambda row: row['total_ms'], reverse=True)
+
+    def chrome_trace(self):
+        """
+        Export the traces in the Chrome trace event format, one row (thread) per rerun
+        Args:
+            None
+        Returns:
+            trace (dict): Trace events, to be saved as JSON and opened in chrome://tracing or Perfetto
+        """
+        events = []
+        for tid, trace in enumerate(reversed(self.traces()), start=1):
+            # Microseconds since the epoch, so that the reruns are placed on a common time axis
+            origin = trace.timestamp * 1e6
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': trace.name}})
+            events.append({'name': trace.name, 'cat': 'rerun', 'ph': 'X', 'pid': 1, 'tid': tid, 'ts': origin, 'dur': trace.duration / 1e3})
+            for item in trace.spans:
+                events.append({
+                    'name': item['name'], 'cat': 'span', 'ph': 'X', 'pid': 1, 'tid': tid,
+                    'ts': origin + item['start'] / 1e3, 'dur': item['duration'] / 1e3,
+                    'args': {key: str(value) for key, value in item['args'].items()},
+                })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+# Traces of the process, shown by the Diagnostics page
+TRACE_LOG = TraceLog()
+
+
+def begin_trace(enabled=False, profile=False):
+    """
+    Start the trace of a rerun in the current thread, stopping the trace of a rerun that was interrupted
+    (a widget changed while the script was running) without keeping it
+    Args:
+        enabled (bool): True to trace the rerun
+        profile (bool): True to also capture the rerun with cProfile
+    Returns:
+        trace (Trace): Trace of the rerun (None if disabled)
+    """
+    interrupted = _current.get()
+    if interrupted is not None:
+        interrupted.stop_recording()
+    if not enabled:
+        return None
+    return Trace(profile=profile).start_recording()
+
+
+def end_trace(name, log=TRACE_LOG):
+    """
+    Stop the trace of the rerun of the current thread and keep it
+    Args:
+        name (str): Name of the trace (title of the page)
+        log (TraceLog): Log keeping the trace
+    Returns:
+        trace (Trace): Finished trace (None if the rerun was not traced)
+    """
+    trace = _current.get()
+    if trace is None:
+        return None
+    trace.stop_recording()
+    trace.name = name
+    log.add(trace)
+    return trace
@@ -0,0 +1,253 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the static report of the dashboard: the charts
+# of the summary pages, the prices per city and the clusters of the stations are
+# rendered to files in one pass over the snapshot, in a pool of processes
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import re
+import html
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import altair as alt
+import pandas as pd
+
+from .store import PRICE_COLUMNS, load_snapshot
+from .aggregates import CUBE_NAME, LEVELS, FUEL_LABELS, build_cube, load_cube, save_cube
+from .brands import ensure_brand_table, load_brand_table, join_brands
+from .cities import CityIndex, city_key
+from .charts import stations_per_fuel_chart, price_per_fuel_chart, per_region_chart, stations_per_brand_chart
+from .models import ModelRegistry
+from .profiling import traced
+
+
+def city_prices(cube, cities):
+    """
+    Compute the average price of each fuel in each city, the spellings of a city being merged
+    Args:
+        cube (dataframe): Aggregate cube of the snapshot
+        cities (CityIndex): Index of the cities of the snapshot
+    Returns:
+        prices (dataframe): One row per city with the columns 'Ville', 'Region' and one column per fuel label
+    """
+    positions = {key: position for position, key in enumerate(cities.keys)}
+    keys = {ville: positions.get(city_key(ville), -1) for ville in cube['ville'].dropna().unique()}
+    cube = cube.assign(city=cube['ville'].astype(object).map(keys).fillna(-1).astype(int))
+    cube = cube[cube['city'] >= 0]
+
+    summary = cube.groupby(['city', 'fuel'], observed=True)[['count', 'sum']].sum()
+    table = (summary['sum'] / summary['count']).unstack('fuel')
+    table = table.reindex(columns=list(FUEL_LABELS)).rename(columns=FUEL_LABELS)
+    table.columns.name = None
+
+    # Region of the most stations of the city
+    region = cube.groupby(['city', 'region'], observed=True)['count'].sum().sort_values().groupby(level='city').tail(1)
+    region = region.reset_index(level='region')['region']
+
+    labels = pd.Series(cities.labels, dtype=object)
+    table.insert(0, 'Region', region.reindex(table.index).astype(object))
+    table.insert(0, 'Ville', labels.iloc[table.index].to_numpy())
+    return table.sort_values('Ville').reset_index(drop=True)
+
+
+def chart_task(output_dir, name, build, *args):
+    """
+    Render a chart to a standalone HTML page and to its Vega-Lite spec, in a worker process
+    Args:
+        output_dir (str): Directory of the report
+        name (str): Name of the files
+        build (function): Builder of app/utils/charts.py
+        *args: Arguments of the builder
+    Returns:
+        files (list): Names of the written files
+        seconds (float): Time of the render
+    """
+    start = time.perf_counter()
+    # The data of the charts is aggregated: the row limit of Altair only protects the browser from raw data
+    with alt.data_transformers.enable('default', max_rows=None):
+        chart = build(*args)
+        chart.save(os.path.join(output_dir, f'{name}.html'))
+        chart.save(os.path.join(output_dir, f'{name}.vl.json'))
+    return [f'{name}.html', f'{name}.vl.json'], time.perf_counter() - start
+
+
+def table_task(output_dir, name, table):
+    """
+    Write a table to CSV and to an HTML page, in a worker process
+    Args:
+        output_dir (str): Directory of the report
+        name (str): Name of the files
+        table (dataframe): Table to write
+    Returns:
+        files (list): Names of the written files
+        seconds (float): Time of the render
+    """
+    start = time.perf_counter()
+    table.to_csv(os.path.join(output_dir, f'{name}.csv'), index=False)
+    with open(os.path.join(output_dir, f'{name}.html'), 'w', encoding='utf-8') as file:
+        file.write(table.to_html(index=False, float_format='{:.3f}'.format, na_rep=''))
+    return [f'{name}.html', f'{name}.csv'], time.perf_counter() - start
+
+
+def clusters_task(output_dir, name, latitude, longitude, labels, k):
+    """
+    Plot the clusters of the stations to a PNG image, in a worker process
+    Args:
+        output_dir (str): Directory of the report
+        name (str): Name of the file
+        latitude (array): Latitude of each station
+        longitude (array): Longitude of each station
+        labels (array): Cluster of each station
+        k (int): Number of clusters
+    Returns:
+        files (list): Names of the written files
+        seconds (float): Time of the render
+    """
+    start = time.perf_counter()
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 8))
+    # The colors are reused beyond 20 clusters
+    colors = plt.get_cmap('tab20' if k > 10 else 'tab10').colors
+    for cluster_id in range(k):
+        rows = labels == cluster_id
+        ax.scatter(longitude[rows], latitude[rows], s=4, color=colors[cluster_id % len(colors)], label=f'Cluster {cluster_id} ({rows.sum()} stations)')
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+    ax.legend(markerscale=3)
+    fig.savefig(os.path.join(output_dir, f'{name}.png'), dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    return [f'{name}.png'], time.perf_counter() - start
+
+
+def run_task(task):
+    """
+    Run a task of the report
+    Args:
+        task (tuple): Function and arguments of the task
+    Returns:
+        result: Result of the function
+    """
+    function, *args = task
+    return function(*args)
+
+
+@traced()
+def report_tasks(snapshot_path, snapshot_id, data_dir, output_dir, villes=(), k=6):
+    """
+    Read the snapshot once, compute the data of every view and list their renders
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+        data_dir (str): Data directory (cube, brands, models)
+        output_dir (str): Directory of the report
+        villes (list): Cities with their own chart of the average price per fuel
+        k (int): Number of clusters
+    Returns:
+        tasks (list): (title, task) of each view, the task being a function and its arguments
+    """
+    df = load_snapshot(snapshot_path, columns=['id', 'latitude', 'longitude', 'carburants_disponibles'] + LEVELS + PRICE_COLUMNS)
+
+    # Same data as the pages: saved cube of the snapshot, brands keyed by station id, index of the cities
+    cube_path = os.path.join(data_dir, CUBE_NAME)
+    cube = load_cube(cube_path, snapshot_id)
+    if cube is None:
+        cube = build_cube(df[LEVELS + PRICE_COLUMNS])
+        save_cube(cube, cube_path, snapshot_id)
+    try:
+        brands = join_brands(df['id'], load_brand_table(ensure_brand_table(data_dir)))
+    except ValueError:
+        # Without brands keyed by station id, the report leaves out the brand chart rather than matching them by position
+        brands = None
+    cities = CityIndex(df['ville'])
+    carburants = df['carburants_disponibles'].str.split(',').explode().dropna().unique()
+
+    tasks = [
+        ('Number of stations per fuel', (chart_task, output_dir, 'stations_per_fuel', stations_per_fuel_chart, cube)),
+        ('Average price per fuel', (chart_task, output_dir, 'price_per_fuel', price_per_fuel_chart, cube, carburants)),
+        ('Number of stations per fuel per region', (chart_task, output_dir, 'stations_per_region', per_region_chart, cube, 'count', 'Number stations')),
+        ('Average price per fuel per region', (chart_task, output_dir, 'price_per_region', per_region_chart, cube, 'mean', 'Average price')),
+        ('Average price per fuel per city', (table_task, output_dir, 'price_per_city', city_prices(cube, cities))),
+    ]
+    if brands is not None:
+        tasks.insert(4, ('Number of stations per brand', (chart_task, output_dir, 'stations_per_brand', stations_per_brand_chart, brands)))
+
+    for ville in villes:
+        spellings = cities.spellings(ville)
+        if not spellings:
+            raise ValueError(f'Unknown city: {ville}')
+        label = cities.labels[cities.position(ville)]
+        tasks.append((
+            f'Average price per fuel in the city of {label}',
+            (chart_task, output_dir, 'price_per_fuel_' + re.sub(r'\W+', '_', city_key(ville)), price_per_fuel_chart,
+             cube[cube['ville'].isin(spellings)], carburants),
+        ))
+
+    # Clusters of the models of the dashboard, trained now if the dashboard did not train them for this snapshot
+    model = ModelRegistry(os.path.join(data_dir, 'models')).get(f'clusters-{k}', snapshot_path, snapshot_id)
+    tasks.append((
+        f'Clustering of gas stations (k={k})',
+        (clusters_task, output_dir, f'clusters_{k}', df['latitude'].to_numpy(), df['longitude'].to_numpy(), model['labels'], k),
+    ))
+    return tasks
+
+
+def write_index(output_dir, entries, snapshot_id):
+    """
+    Write the index page of the report
+    Args:
+        output_dir (str): Directory of the report
+        entries (list): (title, files) of each view
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        path (str): Path of the index page
+    """
+    items = []
+    for title, files in entries:
+        links = ', '.join(f'<a href="{html.escape(file)}">{html.escape(os.path.splitext(file)[1][1:] or file)}</a>' for file in files)
+        items.append(f'<li><a href="{html.escape(files[0])}">{html.escape(title)}</a> ({links})</li>')
+
+    path = os.path.join(output_dir, 'index.html')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(
+            '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>PetroDash report</title></head><body>\n'
+            '<h1>PetroDash - Price of fuels in France</h1>\n'
+            f'<p>Snapshot {html.escape(snapshot_id[:16])}, report generated on {pd.Timestamp.now():%Y-%m-%d %H:%M}</p>\n'
+            '<ul>\n' + '\n'.join(items) + '\n</ul>\n</body></html>\n'
+        )
+    return path
+
+
+def build_report(snapshot_path, snapshot_id, data_dir, output_dir, villes=(), k=6, max_workers=None):
+    """
+    Render every view of the report to static files
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+        data_dir (str): Data directory (cube, brands, models)
+        output_dir (str): Directory of the report, created if missing
+        villes (list): Cities with their own chart of the average price per fuel
+        k (int): Number of clusters
+        max_workers (int): Number of processes rendering the views (number of cores if None, 1 to render in this process)
+    Returns:
+        results (dataframe): One row per view with the columns 'view', 'files' and 'seconds'
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = report_tasks(snapshot_path, snapshot_id, data_dir, output_dir, villes, k)
+
+    if (max_workers or os.cpu_count()) == 1:
+        outputs = [run_task(task) for _, task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            outputs = list(pool.map(run_task, [task for _, task in tasks]))
+
+    write_index(output_dir, [(title, files) for (title, _), (files, _) in zip(tasks, outputs)], snapshot_id)
+    return pd.DataFrame({
+        'view': [title for title, _ in tasks],
+        'files': [', '.join(files) for files, _ in outputs],
+        'seconds': [seconds for _, seconds in outputs],
+    })
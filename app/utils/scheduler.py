@@ -0,0 +1,307 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the background refresh of the data: a thread
+# downloads the new snapshots on the update cadence of the dataset, builds their
+# derived data off the request path, then swaps the live snapshot in one step
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import shutil
+import threading
+import time
+
+import requests
+
+from .store import SNAPSHOT_NAME, ensure_snapshot, load_snapshot, snapshot_hash, write_atomic
+from .fetcher import DATA_URL, update_snapshot
+from .brands import update_brand_table
+from .history import ingest, compact
+from .locks import data_lock
+from .dataset import Dataset
+from .profiling import traced
+
+# Environment variable with the number of seconds between two refreshes (0 to disable the background refresh)
+REFRESH_ENV = 'PETRODASH_REFRESH'
+
+# Environment variable enabling the fetch of the brands of the new stations from the station API (see brands.py)
+BRANDS_ENV = 'PETRODASH_FETCH_BRANDS'
+
+# The instantaneous flux of the prices is updated every 10 minutes
+REFRESH_INTERVAL = 600
+
+# Directory of the published snapshots, in the data directory
+SNAPSHOTS_DIR = 'snapshots'
+
+
+def refresh_interval():
+    """
+    Read the refresh interval requested by the environment
+    Args:
+        None
+    Returns:
+        interval (float): Number of seconds between two refreshes (0 if the background refresh is disabled)
+    """
+    value = os.environ.get(REFRESH_ENV, '').strip()
+    try:
+        return max(float(value), 0) if value else REFRESH_INTERVAL
+    except ValueError:
+        return REFRESH_INTERVAL
+
+
+def fetch_brands_enabled():
+    """
+    Read whether the environment enables the fetch of the brands from the station API
+    Args:
+        None
+    Returns:
+        enabled (bool): True if PETRODASH_FETCH_BRANDS is set to 1, true or yes
+    """
+    return os.environ.get(BRANDS_ENV, '').strip().lower() in ('1', 'true', 'yes')
+
+
+def refresh_data(data_dir, url=DATA_URL, fetch_brands=False):
+    """
+    Download the CSV if it changed, rebuild the snapshot, append the new prices to the history
+    and, on request, fetch the brands of some new stations
+    Args:
+        data_dir (str): Data directory
+        url (str): Url of the CSV export
+        fetch_brands (bool): True to fetch the brands of the new stations from the station API (see update_brand_table)
+    Returns:
+        changes (dataframe): Stations that changed (see diff_snapshots), None if the file did not change
+        nb_records (int): Number of prices appended to the history
+        nb_brands (int): Number of stations whose brand was fetched
+    """
+    # One refresh at a time, whether it runs in the scheduler of the dashboard or in get_data.py: the download,
+    # the statistics of the validation and the history are updated once per new file
+    with data_lock(data_dir):
+        changes = update_snapshot(url, data_dir)
+        nb_records = 0
+        if changes is not None:
+            # Append the new prices of the changed stations to the history
+            history_dir = os.path.join(data_dir, 'history')
+            snapshot = load_snapshot(os.path.join(data_dir, SNAPSHOT_NAME))
+            nb_records = ingest(snapshot, history_dir, ids=changes.loc[changes['change'] != 'removed', 'id'])
+            compact(history_dir)
+
+    # Also retries the stations whose brand could not be fetched by a previous refresh, once their delay is over
+    nb_brands = 0
+    if fetch_brands:
+        nb_brands, _ = update_brand_table(data_dir, load_snapshot(ensure_snapshot(data_dir), columns=['id'])['id'])
+    return changes, nb_records, nb_brands
+
+
+def publish_snapshot(snapshot_path, snapshot_id, data_dir):
+    """
+    Give a snapshot a path of its own, so that its file is never replaced while pages read it
+    Args:
+        snapshot_path (str): Path of the snapshot rebuilt by each download
+        snapshot_id (str): Hash of the snapshot
+        data_dir (str): Data directory
+    Returns:
+        published_path (str): Path of the snapshot in the directory of the published snapshots
+    """
+    published_dir = os.path.join(data_dir, SNAPSHOTS_DIR)
+    os.makedirs(published_dir, exist_ok=True)
+    published_path = os.path.join(published_dir, f'{snapshot_id[:16]}.arrow')
+    if not os.path.exists(published_path):
+        def write(tmp_path):
+            # A hard link costs no copy, the file is copied on the file systems without links
+            os.remove(tmp_path)
+            try:
+                os.link(snapshot_path, tmp_path)
+            except OSError:
+                shutil.copyfile(snapshot_path, tmp_path)
+
+        write_atomic(published_path, write)
+    return published_path
+
+
+class RefreshScheduler():
+    """
+    Live snapshot of the dashboard, refreshed by a background thread.
+    A new snapshot is published under its own path and its dataset is warmed (names, cube, indexes...) before it
+    replaces the live one: the reruns keep reading the previous snapshot in the meantime, so they never wait for a
+    refresh nor see a partially built snapshot. The previous dataset is kept for the reruns that started before the swap.
+    """
+    def __init__(self, data_dir, interval=REFRESH_INTERVAL, url=DATA_URL, warm=None, fetch_brands=False):
+        """
+        Create the scheduler, without starting it
+        Args:
+            data_dir (str): Data directory
+            interval (float): Number of seconds between two refreshes
+            url (str): Url of the CSV export
+            warm (function): Function building the derived data of a dataset before it goes live
+            fetch_brands (bool): True to fetch the brands of the new stations at each refresh
+        """
+        self.data_dir = data_dir
+        self.interval = interval
+        self.url = url
+        self.fetch_brands = fetch_brands
+        self.warm = warm
+        # (snapshot path, snapshot id, dataset) of the live and of the previous snapshot, replaced as a whole
+        self.live = None
+        self.previous = None
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_check = None
+        self.last_swap = None
+        self.last_error = None
+        self.nb_swaps = 0
+
+    def current(self):
+        """
+        Return the live snapshot, checking the snapshot file first when the background refresh is not running
+        Args:
+            None
+        Returns:
+            snapshot_path (str): Path of the published snapshot
+            snapshot_id (str): Hash of the snapshot
+        """
+        if self.live is None or not self.running():
+            # Without the thread, a snapshot updated by get_data.py goes live at the next rerun, unwarmed
+            self.check(warm=False)
+        snapshot_path, snapshot_id, _ = self.live
+        return snapshot_path, snapshot_id
+
+    def dataset(self, snapshot_path, snapshot_id):
+        """
+        Return the dataset of a snapshot, the warmed one if the snapshot is live
+        Args:
+            snapshot_path (str): Path of the published snapshot
+            snapshot_id (str): Hash of the snapshot
+        Returns:
+            dataset (Dataset): Dataset of the snapshot
+        """
+        with self.lock:
+            for state in (self.live, self.previous):
+                if state is not None and state[1] == snapshot_id:
+                    return state[2]
+        # Snapshot neither live nor previous (e.g. a rerun that started two swaps ago)
+        return Dataset(snapshot_path, snapshot_id, self.data_dir)
+
+    @traced()
+    def check(self, warm=True):
+        """
+        Publish the snapshot of the data directory if it is not the live one, and make it live
+        Args:
+            warm (bool): True to build the derived data of the new dataset before the swap
+        Returns:
+            swapped (bool): True if a new snapshot went live
+        """
+        with self.refresh_lock:
+            snapshot_path = ensure_snapshot(self.data_dir)
+            snapshot_id = snapshot_hash(snapshot_path)
+            self.last_check = time.time()
+            if self.live is not None and self.live[1] == snapshot_id:
+                # The snapshot live since the start of the app is warmed by the first refresh (a no-op afterwards)
+                if warm and self.warm is not None:
+                    self.warm(self.live[2])
+                return False
+
+            published_path = publish_snapshot(snapshot_path, snapshot_id, self.data_dir)
+            dataset = Dataset(published_path, snapshot_id, self.data_dir)
+            if warm and self.warm is not None:
+                self.warm(dataset)
+
+            with self.lock:
+                self.previous, self.live = self.live, (published_path, snapshot_id, dataset)
+                self.last_swap = time.time()
+                self.nb_swaps += 1
+            self.remove_old_snapshots()
+            return True
+
+    def remove_old_snapshots(self):
+        """
+        Delete the published snapshots that are neither live nor previous
+        Args:
+            None
+        Returns:
+            None
+        """
+        kept = {os.path.basename(state[0]) for state in (self.live, self.previous) if state is not None}
+        published_dir = os.path.join(self.data_dir, SNAPSHOTS_DIR)
+        for file_name in os.listdir(published_dir):
+            if file_name.endswith('.arrow') and file_name not in kept:
+                # The datasets still reading the file keep its data until they are dropped
+                try:
+                    os.remove(os.path.join(published_dir, file_name))
+                except OSError:
+                    # File still open on a system that forbids it: removed at a later swap
+                    pass
+
+    def refresh(self):
+        """
+        Download a new snapshot if there is one, then make the snapshot of the data directory live
+        (also picking up the snapshots written by get_data.py)
+        Args:
+            None
+        Returns:
+            swapped (bool): True if a new snapshot went live
+        """
+        try:
+            refresh_data(self.data_dir, self.url, self.fetch_brands)
+            self.last_error = None
+        except requests.RequestException as error:
+            # Network errors are retried at the next refresh, the live snapshot stays as it is
+            self.last_error = f'{type(error).__name__}: {error}'
+        return self.check()
+
+    def run(self):
+        """
+        Refresh the data until the scheduler is stopped (body of the background thread)
+        Args:
+            None
+        Returns:
+            None
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as error:
+                # The thread must survive a bad download: the error is shown by the Diagnostics page
+                self.last_error = f'{type(error).__name__}: {error}'
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        """
+        Make the current snapshot live, then start the background refresh unless it is disabled (interval of 0)
+        or already running
+        Args:
+            None
+        Returns:
+            scheduler (RefreshScheduler): The scheduler itself
+        """
+        # The first reruns use the current snapshot right away, its derived data being built by the first refresh
+        if self.live is None:
+            self.check(warm=False)
+        if self.interval > 0 and not self.running():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name='refresh-scheduler', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the background refresh after the refresh in progress
+        Args:
+            None
+        Returns:
+            None
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def running(self):
+        """
+        Tell whether the background refresh is running
+        Args:
+            None
+        Returns:
+            running (bool): True if the thread is alive
+        """
+        return self.thread is not None and self.thread.is_alive()
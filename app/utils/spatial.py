@@ -0,0 +1,106 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the spatial index of the stations
+# (nearest / cheapest stations around a point and bounding-box queries)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import numpy as np
+from sklearn.neighbors import BallTree
+
+# Mean radius of the Earth in kilometers
+EARTH_RADIUS_KM = 6371.0088
+
+
+class SpatialIndex():
+    """
+    Index of the positions of the stations, built once per snapshot.
+    Queries return row positions in the arrays the index was built from.
+    """
+    def __init__(self, latitude, longitude):
+        """
+        Build the index
+        Args:
+            latitude (array): Latitude of the stations in degrees (NaN if unknown)
+            longitude (array): Longitude of the stations in degrees (NaN if unknown)
+        """
+        latitude = np.asarray(latitude, dtype='float64')
+        longitude = np.asarray(longitude, dtype='float64')
+
+        # Stations without coordinates are left out of the index
+        self.positions = np.flatnonzero(~np.isnan(latitude) & ~np.isnan(longitude))
+        self.tree = BallTree(np.radians(np.c_[latitude[self.positions], longitude[self.positions]]), metric='haversine')
+
+        # Stations sorted by latitude for the bounding-box queries
+        order = np.argsort(latitude[self.positions], kind='stable')
+        self.sorted_positions = self.positions[order]
+        self.sorted_latitude = latitude[self.sorted_positions]
+        self.sorted_longitude = longitude[self.sorted_positions]
+
+    def within(self, latitude, longitude, radius_km):
+        """
+        Find the stations within a radius of a point
+        Args:
+            latitude (float): Latitude of the point in degrees
+            longitude (float): Longitude of the point in degrees
+            radius_km (float): Radius in kilometers
+        Returns:
+            positions (array): Row positions of the stations, sorted by distance
+            distances (array): Distances to the point in kilometers
+        """
+        point = np.radians([[latitude, longitude]])
+        indices, distances = self.tree.query_radius(point, r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True)
+        return self.positions[indices[0]], distances[0] * EARTH_RADIUS_KM
+
+    def nearest(self, latitude, longitude, k=5):
+        """
+        Find the k nearest stations of a point
+        Args:
+            latitude (float): Latitude of the point in degrees
+            longitude (float): Longitude of the point in degrees
+            k (int): Number of stations
+        Returns:
+            positions (array): Row positions of the stations, sorted by distance
+            distances (array): Distances to the point in kilometers
+        """
+        k = min(k, len(self.positions))
+        distances, indices = self.tree.query(np.radians([[latitude, longitude]]), k=k)
+        return self.positions[indices[0]], distances[0] * EARTH_RADIUS_KM
+
+    def cheapest(self, latitude, longitude, prices, radius_km=10, k=5):
+        """
+        Find the k cheapest stations selling a fuel within a radius of a point
+        Args:
+            latitude (float): Latitude of the point in degrees
+            longitude (float): Longitude of the point in degrees
+            prices (array): Price of the fuel for every station (NaN if not sold)
+            radius_km (float): Radius in kilometers
+            k (int): Number of stations
+        Returns:
+            positions (array): Row positions of the stations, sorted by price then distance
+            distances (array): Distances to the point in kilometers
+        """
+        positions, distances = self.within(latitude, longitude, radius_km)
+        candidate_prices = np.asarray(prices, dtype='float64')[positions]
+
+        sold = ~np.isnan(candidate_prices)
+        positions, distances, candidate_prices = positions[sold], distances[sold], candidate_prices[sold]
+
+        # The candidates are sorted by distance, so a stable sort on the price breaks ties by distance
+        order = np.argsort(candidate_prices, kind='stable')[:k]
+        return positions[order], distances[order]
+
+    def bbox(self, south, west, north, east):
+        """
+        Find the stations inside a bounding box
+        Args:
+            south (float): Minimum latitude in degrees
+            west (float): Minimum longitude in degrees
+            north (float): Maximum latitude in degrees
+            east (float): Maximum longitude in degrees
+        Returns:
+            positions (array): Row positions of the stations
+        """
+        start = np.searchsorted(self.sorted_latitude, south, side='left')
+        stop = np.searchsorted(self.sorted_latitude, north, side='right')
+        longitude = self.sorted_longitude[start:stop]
+        return self.sorted_positions[start:stop][(longitude >= west) & (longitude <= east)]
@@ -0,0 +1,97 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the compact table of the stations used by the
+# map (numeric prices, fuel bitmask, scaled coordinates, categorical names)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import numpy as np
+import pandas as pd
+
+from .store import FUELS, PRICE_COLUMNS, DATE_COLUMNS
+from .cities import city_keys
+from .profiling import traced
+
+# Coordinates are stored in 1e-5 degrees, as in the dataset
+COORDINATE_SCALE = 100000
+
+# Value of a missing coordinate in the int32 columns
+MISSING_COORDINATE = np.iinfo('int32').min
+
+# Bit of each fuel in the 'fuels' column
+FUEL_BITS = {fuel: 1 << bit for bit, fuel in enumerate(FUELS)}
+
+
+def scale_coordinates(values):
+    """
+    Convert coordinates in 1e-5 degrees to int32, missing values becoming MISSING_COORDINATE
+    Args:
+        values (series): Coordinates in 1e-5 degrees (NaN if unknown)
+    Returns:
+        coordinates (array): int32 coordinates
+    """
+    values = np.asarray(values, dtype='float64')
+    return np.where(np.isnan(values), MISSING_COORDINATE, np.round(np.nan_to_num(values))).astype('int32')
+
+
+def degrees(values):
+    """
+    Convert coordinates in 1e-5 degrees (int32 or float) to degrees
+    Args:
+        values (series): Coordinates in 1e-5 degrees
+    Returns:
+        degrees (array): float64 coordinates in degrees (NaN if unknown)
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu':
+        return np.where(values == MISSING_COORDINATE, np.nan, values / COORDINATE_SCALE)
+    return values.astype('float64') / COORDINATE_SCALE
+
+
+def fuel_mask(fuels):
+    """
+    Return the bitmask of a list of fuels
+    Args:
+        fuels (list): Fuels in lowercase
+    Returns:
+        mask (int): Bits of the fuels
+    """
+    mask = 0
+    for fuel in fuels:
+        mask |= FUEL_BITS[fuel]
+    return mask
+
+
+@traced()
+def build_stations(df, brand):
+    """
+    Build the compact table of the stations
+    Args:
+        df (dataframe): Snapshot (coordinates in 1e-5 degrees, float32 prices, datetime *_maj columns)
+        brand (series): Brand of each station, in the order of the rows of df
+    Returns:
+        stations (dataframe): Table with int32 coordinates, float32 prices (NaN if not sold), the uint8 bitmask
+            of the fuels sold ('fuels'), categorical names and canonical city keys ('city'), the display strings being built by enrich() on demand
+    """
+    fuels = np.zeros(len(df), dtype='uint8')
+    for fuel in FUELS:
+        fuels |= np.where(df[f'{fuel}_prix'].notna().to_numpy(), FUEL_BITS[fuel], 0).astype('uint8')
+
+    stations = pd.DataFrame({
+        'id': df['id'].to_numpy(dtype='int32'),
+        'latitude': scale_coordinates(df['latitude']),
+        'longitude': scale_coordinates(df['longitude']),
+        'adresse': df['adresse'].to_numpy(),
+        'cp': df['cp'].array,
+        'ville': df['ville'].astype('category').array,
+        'city': city_keys(df['ville']),
+        'region': df['region'].astype('category').array,
+        'pop': df['pop'].astype('category').array,
+        'brand': pd.Series(brand).astype('category').array,
+        'fuels': fuels,
+    })
+    for column in PRICE_COLUMNS:
+        stations[column] = df[column].to_numpy(dtype='float32')
+    for column in DATE_COLUMNS:
+        stations[column] = df[column].array
+
+    return stations
@@ -0,0 +1,237 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the functions to build and load the columnar
+# snapshot of the fuel prices (typed Arrow file read with memory-mapping)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import hashlib
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .profiling import traced
+from .locks import data_lock
+
+# Names of the files in the data directory
+CSV_NAME = 'prix-des-carburants-en-france-flux-instantane-v2.csv'
+SNAPSHOT_NAME = 'prix-des-carburants-en-france-flux-instantane-v2.arrow'
+
+# Fuels available in the dataset
+FUELS = ['gazole', 'sp95', 'sp98', 'e10', 'e85', 'gplc']
+
+# Columns with few distinct values, stored as dictionaries (categorical in pandas)
+CATEGORICAL_COLUMNS = ['pop', 'ville', 'departement', 'code_departement', 'region', 'code_region', 'brand']
+
+# Columns read as float32 / datetime
+PRICE_COLUMNS = [f'{fuel}_prix' for fuel in FUELS]
+DATE_COLUMNS = [f'{fuel}_maj' for fuel in FUELS]
+
+# Key of the schema metadata holding the hash identifying the snapshot: the hash of the source CSV,
+# mixed with the validation of the prices so that a screened and an unscreened snapshot never share it
+HASH_KEY = b'petrodash.source_sha1'
+
+# Key of the schema metadata holding the name and version of the validation of the prices ('' if none)
+VALIDATION_KEY = b'petrodash.validation'
+
+
+def default_data_dir():
+    """
+    Return the data directory of the project
+    Args:
+        None
+    Returns:
+        data_dir (str): Path of the data directory
+    """
+    return os.path.join(os.getcwd(), 'data')
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    """
+    Compute the SHA1 of a file by chunks
+    Args:
+        path (str): Path of the file
+        chunk_size (int): Number of bytes read at a time
+    Returns:
+        digest (str): Hexadecimal SHA1 of the file
+    """
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def write_atomic(path, write):
+    """
+    Write a file in a temporary file of its own then rename it, so that readers never see a partial file and
+    two writers (the scheduler of the dashboard and get_data.py) never write the same temporary file
+    Args:
+        path (str): Path of the file
+        write (function): Function writing the file at the path it receives
+    Returns:
+        path (str): Path of the written file
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+@traced()
+def read_csv_typed(csv_path):
+    """
+    Read the CSV of the prices with compact types
+    Args:
+        csv_path (str): Path of the semicolon-separated CSV
+    Returns:
+        df (dataframe): Dataframe with categorical, float32 and datetime columns
+    """
+    header = pd.read_csv(csv_path, sep=';', nrows=0).columns
+
+    dtype = {column: 'category' for column in CATEGORICAL_COLUMNS if column in header}
+    dtype.update({column: 'float32' for column in PRICE_COLUMNS if column in header})
+    # Keep the postal code as text to preserve the leading zeros
+    if 'cp' in header:
+        dtype['cp'] = 'string'
+
+    df = pd.read_csv(csv_path, sep=';', dtype=dtype)
+
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], utc=True, errors='coerce')
+
+    return df
+
+
+def source_hash(csv_sha1, validation=''):
+    """
+    Compute the hash identifying a snapshot from the hash of its CSV and its validation
+    Args:
+        csv_sha1 (str): Hexadecimal SHA1 of the source CSV
+        validation (str): Name and version of the validation of the prices ('' if none)
+    Returns:
+        digest (str): Hexadecimal hash of the snapshot (the hash of the CSV if there is no validation)
+    """
+    if not validation:
+        return csv_sha1
+    return hashlib.sha1(f'{csv_sha1}:{validation}'.encode()).hexdigest()
+
+
+def build_snapshot(csv_path, snapshot_path=None, validate=None, validation=''):
+    """
+    Convert a downloaded CSV into a typed, uncompressed Arrow snapshot
+    (the app only reads screened snapshots, see ensure_snapshot and anomalies.build_screened_snapshot)
+    Args:
+        csv_path (str): Path of the semicolon-separated CSV
+        snapshot_path (str): Path of the snapshot to write (next to the CSV by default)
+        validate (function): Function screening the typed dataframe before it is written (e.g. AnomalyDetector.screen)
+        validation (str): Name and version of the validation, stored in the snapshot and mixed in its hash
+    Returns:
+        snapshot_path (str): Path of the written snapshot
+    """
+    if snapshot_path is None:
+        snapshot_path = os.path.join(os.path.dirname(csv_path), SNAPSHOT_NAME)
+
+    df = read_csv_typed(csv_path)
+    if validate is not None:
+        df = validate(df)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[HASH_KEY] = source_hash(file_sha1(csv_path), validation if validate is not None else '').encode()
+    metadata[VALIDATION_KEY] = (validation if validate is not None else '').encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Write in a temporary file then rename, so readers never see a partial snapshot
+    return write_atomic(snapshot_path, lambda tmp_path: feather.write_feather(table, tmp_path, compression='uncompressed'))
+
+
+def ensure_snapshot(data_dir=None):
+    """
+    Return the path of the snapshot, building it without the suspicious prices (see AnomalyDetector)
+    if it is missing, older than the CSV or not screened by the current validation
+    Args:
+        data_dir (str): Data directory (default: ./data)
+    Returns:
+        snapshot_path (str): Path of the snapshot
+    """
+    data_dir = data_dir or default_data_dir()
+    csv_path = os.path.join(data_dir, CSV_NAME)
+    snapshot_path = os.path.join(data_dir, SNAPSHOT_NAME)
+
+    # The validation imports this module
+    from .anomalies import VALIDATION, build_screened_snapshot
+
+    def outdated():
+        return not os.path.exists(snapshot_path) or os.path.exists(csv_path) and (
+            os.path.getmtime(csv_path) > os.path.getmtime(snapshot_path) or snapshot_validation(snapshot_path) != VALIDATION
+        )
+
+    if outdated():
+        with data_lock(data_dir):
+            # Checked again: another process may have built the snapshot in the meantime
+            if outdated():
+                build_screened_snapshot(csv_path, snapshot_path)
+
+    return snapshot_path
+
+
+def snapshot_metadata(snapshot_path):
+    """
+    Read the schema metadata of the snapshot, without loading the data
+    Args:
+        snapshot_path (str): Path of the snapshot
+    Returns:
+        metadata (dict): Metadata of the schema (bytes keys and values)
+    """
+    with pa.memory_map(snapshot_path) as source:
+        schema = pa.ipc.open_file(source).schema
+    return schema.metadata or {}
+
+
+def snapshot_hash(snapshot_path):
+    """
+    Read the hash identifying the snapshot (source CSV and validation), without loading the data
+    Args:
+        snapshot_path (str): Path of the snapshot
+    Returns:
+        digest (str): Hash identifying the snapshot
+    """
+    return snapshot_metadata(snapshot_path).get(HASH_KEY, b'').decode()
+
+
+def snapshot_validation(snapshot_path):
+    """
+    Read the name and version of the validation of the snapshot, without loading the data
+    Args:
+        snapshot_path (str): Path of the snapshot
+    Returns:
+        validation (str): Validation of the prices ('' if the snapshot was not screened)
+    """
+    return snapshot_metadata(snapshot_path).get(VALIDATION_KEY, b'').decode()
+
+
+@traced()
+def load_snapshot(snapshot_path=None, columns=None):
+    """
+    Load the snapshot with memory-mapping, reading only the requested columns
+    (numeric columns are backed by the file and read-only: copy before assigning into them)
+    Args:
+        snapshot_path (str): Path of the snapshot (built from ./data if None)
+        columns (list): Columns to read (all columns if None)
+    Returns:
+        df (dataframe): Dataframe with the data
+    """
+    if snapshot_path is None:
+        snapshot_path = ensure_snapshot()
+
+    table = feather.read_table(snapshot_path, columns=columns, memory_map=True)
+    return table.to_pandas(split_blocks=True)
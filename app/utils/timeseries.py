@@ -0,0 +1,154 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the time series of the price-evolution charts:
+# the price records are bucketed per hour, day, week or month (min, mean and max
+# of each bucket) on a real datetime axis, then downsampled with LTTB so that a
+# chart never sends more than a fixed number of points to the browser
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import numpy as np
+import pandas as pd
+
+# Time zone of the buckets: a day starts at midnight in France
+TIMEZONE = 'Europe/Paris'
+
+# Pandas frequency of each bucket, from the finest to the coarsest
+BUCKETS = {
+    'Hourly': 'h',
+    'Daily': 'D',
+    'Weekly': 'W-MON',
+    'Monthly': 'MS',
+}
+
+# Approximate length of each bucket, to choose the finest one fitting in the points of a chart
+BUCKET_LENGTHS = {
+    'Hourly': pd.Timedelta(hours=1),
+    'Daily': pd.Timedelta(days=1),
+    'Weekly': pd.Timedelta(days=7),
+    'Monthly': pd.Timedelta(days=31),
+}
+
+# Bucket chosen from the range of the dates
+AUTO = 'Auto'
+
+# Maximum number of points of a chart
+MAX_POINTS = 1000
+
+
+def choose_bucket(dates, max_points=MAX_POINTS):
+    """
+    Choose the finest bucket giving at most max_points points over the range of the dates
+    Args:
+        dates (series): Datetime column
+        max_points (int): Maximum number of points of the chart
+    Returns:
+        bucket (str): Key of BUCKETS (the coarsest one if none fits, the series being downsampled)
+    """
+    if dates.empty:
+        return 'Daily'
+    span = dates.max() - dates.min()
+    for bucket, length in BUCKET_LENGTHS.items():
+        if span / length < max_points:
+            return bucket
+    return list(BUCKETS)[-1]
+
+
+def resample_prices(dates, prices, bucket):
+    """
+    Compute the minimum, mean and maximum price of each bucket, the empty buckets being dropped
+    Args:
+        dates (series): Datetime of each price (naive dates are read as UTC)
+        prices (series): Prices
+        bucket (str): Key of BUCKETS
+    Returns:
+        series (dataframe): One row per bucket with the columns 'date' (start of the bucket), 'min', 'mean', 'max' and 'count'
+    """
+    index = pd.DatetimeIndex(dates)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    values = pd.Series(np.asarray(prices, dtype='float64'), index=index.tz_convert(TIMEZONE))
+    values = values[values.notna().to_numpy() & values.index.notna()]
+
+    # Buckets closed and labelled on their start, so that a week starts on Monday and a month on its first day
+    series = values.resample(BUCKETS[bucket], closed='left', label='left').agg(['min', 'mean', 'max', 'count'])
+    series = series[series['count'] > 0]
+    series.index.name = 'date'
+    return series.reset_index().astype({'count': 'int64'})
+
+
+def lttb(x, y, nb_points):
+    """
+    Select the points of a line keeping its shape, with the Largest-Triangle-Three-Buckets algorithm
+    Args:
+        x (array): Abscissa of the points, sorted
+        y (array): Ordinate of the points
+        nb_points (int): Number of points to keep
+    Returns:
+        positions (array): Sorted positions of the kept points (all of them if there are at most nb_points)
+    """
+    nb_rows = len(x)
+    if nb_points >= nb_rows or nb_points < 3:
+        return np.arange(nb_rows)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+
+    # The first and the last points are kept, the others are split in nb_points - 2 buckets
+    edges = np.append(np.linspace(1, nb_rows - 1, nb_points - 1).astype(np.int64), nb_rows)
+    sum_x = np.concatenate([[0], np.cumsum(x)])
+    sum_y = np.concatenate([[0], np.cumsum(y)])
+
+    positions = np.empty(nb_points, dtype=np.int64)
+    positions[0], positions[-1] = 0, nb_rows - 1
+    previous = 0
+    for bucket in range(nb_points - 2):
+        start, end, next_end = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+        # Third vertex of the triangles: the mean point of the next bucket
+        mean_x = (sum_x[next_end] - sum_x[end]) / (next_end - end)
+        mean_y = (sum_y[next_end] - sum_y[end]) / (next_end - end)
+        areas = np.abs((x[previous] - mean_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        positions[bucket + 1] = previous
+    return positions
+
+
+def downsample(series, max_points=MAX_POINTS):
+    """
+    Reduce a bucketed series to at most max_points points, the band of each kept point covering the buckets
+    skipped after it so that the extremes stay visible
+    Args:
+        series (dataframe): Bucketed series (see resample_prices)
+        max_points (int): Maximum number of points
+    Returns:
+        series (dataframe): Downsampled series, with the same columns
+    """
+    if len(series) <= max_points:
+        return series
+
+    # The line keeps the mean of the buckets chosen by LTTB, the band the extremes of all the buckets
+    seconds = (series['date'] - series['date'].iloc[0]).dt.total_seconds().to_numpy()
+    positions = lttb(seconds, series['mean'].to_numpy(), max_points)
+    return pd.DataFrame({
+        'date': series['date'].iloc[positions].to_numpy(),
+        'min': np.minimum.reduceat(series['min'].to_numpy(), positions),
+        'mean': series['mean'].to_numpy()[positions],
+        'max': np.maximum.reduceat(series['max'].to_numpy(), positions),
+        'count': np.add.reduceat(series['count'].to_numpy(), positions),
+    })
+
+
+def price_series(dates, prices, bucket=AUTO, max_points=MAX_POINTS):
+    """
+    Build the series of a price-evolution chart
+    Args:
+        dates (series): Datetime of each price
+        prices (series): Prices
+        bucket (str): Key of BUCKETS, or AUTO to choose it from the range of the dates
+        max_points (int): Maximum number of points
+    Returns:
+        series (dataframe): One row per point with the columns 'date', 'min', 'mean', 'max' and 'count'
+        bucket (str): Key of BUCKETS used
+    """
+    if bucket == AUTO:
+        bucket = choose_bucket(dates, max_points)
+    return downsample(resample_prices(dates, prices, bucket), max_points), bucket
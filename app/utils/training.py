@@ -0,0 +1,152 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the training of the regressions of all the fuels
+# (and optionally of each region) in parallel: the feature matrix is written once
+# in shared memory and each worker process of the pool reads it without a copy
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .store import FUELS
+from .models import MIN_PRICES, fit_regression
+from .profiling import traced
+
+# Columns of the feature matrix: position and region of the stations, then the update timestamp and the price of each fuel
+POSITION_COLUMNS = ['latitude', 'longitude', 'region']
+FEATURE_COLUMNS = POSITION_COLUMNS + [f'{fuel}_{kind}' for fuel in FUELS for kind in ('maj', 'prix')]
+
+# Region of the models trained on the whole country
+ALL_REGIONS = 'France'
+
+# Feature matrix of a worker process, attached once by init_worker
+_features = None
+_segment = None
+
+
+def build_features(df):
+    """
+    Build the feature matrix of the regressions
+    Args:
+        df (dataframe): Snapshot with the columns 'latitude', 'longitude', 'region' and the *_maj / *_prix columns
+    Returns:
+        features (array): float64 matrix with the columns of FEATURE_COLUMNS (code of the region, -1 if unknown;
+            timestamps in seconds, NaN if the fuel is not sold)
+        regions (list): Name of each region code
+    """
+    region = df['region'].astype('category')
+    features = np.empty((len(df), len(FEATURE_COLUMNS)), dtype='float64')
+    features[:, 0] = df['latitude'].to_numpy(dtype='float64', na_value=np.nan)
+    features[:, 1] = df['longitude'].to_numpy(dtype='float64', na_value=np.nan)
+    features[:, 2] = region.cat.codes.to_numpy()
+
+    for position, fuel in enumerate(FUELS):
+        dates = pd.DatetimeIndex(df[f'{fuel}_maj'])
+        features[:, 3 + 2 * position] = np.where(dates.isna(), np.nan, dates.as_unit('s').asi8)
+        features[:, 4 + 2 * position] = df[f'{fuel}_prix'].to_numpy(dtype='float64', na_value=np.nan)
+
+    return features, list(region.cat.categories)
+
+
+def init_worker(name, shape):
+    """
+    Attach the feature matrix in shared memory, once per worker process
+    Args:
+        name (str): Name of the shared memory segment
+        shape (tuple): Shape of the matrix
+    Returns:
+        None
+    """
+    global _features, _segment
+    # The segment is destroyed by the parent process (the workers share its resource tracker)
+    _segment = shared_memory.SharedMemory(name=name)
+    _features = np.ndarray(shape, dtype='float64', buffer=_segment.buf)
+
+
+def fit_task(fuel, region, timestamp):
+    """
+    Fit the regression of a fuel on the stations of a region, in a worker process
+    Args:
+        fuel (str): Fuel in lowercase
+        region (int): Code of the region (-1 for every region)
+        timestamp (float): POSIX timestamp of the predicted prices
+    Returns:
+        result (dict): Number of prices, mean square error, mean actual price, predicted price at the mean position
+            of the stations, fitted pipeline and time of the fit in seconds (None for the metrics below MIN_PRICES prices)
+    """
+    start = time.perf_counter()
+    column = 3 + 2 * FUELS.index(fuel)
+
+    # Prices of the fuel with a date and a position, in the region
+    rows = ~np.isnan(_features[:, column + 1]) & ~np.isnan(_features[:, column]) & ~np.isnan(_features[:, 0]) & ~np.isnan(_features[:, 1])
+    if region >= 0:
+        rows &= _features[:, 2] == region
+    rows = np.flatnonzero(rows)
+    X = _features[np.ix_(rows, [column, 0, 1])]
+    y = _features[rows, column + 1]
+
+    result = {'fuel': fuel, 'region': region, 'prices': len(y), 'mse': None, 'mean': None, 'predicted': None, 'pipeline': None}
+    if len(y) >= MIN_PRICES:
+        model = fit_regression(X, y)
+        point = np.array([[timestamp, X[:, 1].mean(), X[:, 2].mean()]])
+        result.update({
+            'mse': model['mse'],
+            'mean': float(y.mean()),
+            'predicted': float(model['pipeline'].predict(point)[0]),
+            'pipeline': model['pipeline'],
+        })
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+@traced()
+def train_all(df, per_region=False, max_workers=None, timestamp=None):
+    """
+    Fit the regression of every fuel, and of every fuel in every region, in a pool of processes
+    Args:
+        df (dataframe): Snapshot with the columns 'latitude', 'longitude', 'region' and the *_maj / *_prix columns
+        per_region (bool): True to also fit one regression per fuel and region
+        max_workers (int): Number of processes (number of cores if None)
+        timestamp (float): POSIX timestamp of the predicted prices (now if None)
+    Returns:
+        comparison (dataframe): One row per fuel and region with the columns 'fuel', 'region', 'prices', 'mse',
+            'mean' (actual price), 'predicted' (price predicted at the mean position) and 'seconds' (time of the fit)
+        pipelines (dict): Fitted pipeline of each (fuel, region)
+    """
+    timestamp = time.time() if timestamp is None else timestamp
+    features, regions = build_features(df)
+
+    tasks = [(fuel, -1) for fuel in FUELS]
+    if per_region:
+        tasks += [(fuel, region) for fuel in FUELS for region in range(len(regions))]
+
+    # The matrix is copied once into shared memory instead of being pickled to each task
+    segment = shared_memory.SharedMemory(create=True, size=max(features.nbytes, 1))
+    try:
+        np.ndarray(features.shape, dtype='float64', buffer=segment.buf)[:] = features
+
+        # Worker processes are spawned: forking the threads of the server is not safe
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(segment.name, features.shape),
+        ) as pool:
+            futures = [pool.submit(fit_task, fuel, region, timestamp) for fuel, region in tasks]
+            results = [future.result() for future in futures]
+    finally:
+        segment.close()
+        segment.unlink()
+
+    pipelines = {}
+    for result in results:
+        result['region'] = ALL_REGIONS if result['region'] < 0 else regions[result['region']]
+        pipelines[(result['fuel'], result['region'])] = result.pop('pipeline')
+
+    return pd.DataFrame(results, columns=['fuel', 'region', 'prices', 'mse', 'mean', 'predicted', 'seconds']), pipelines
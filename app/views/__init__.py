@@ -0,0 +1,86 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the registry of the pages of the dashboard.
+# Each page lives in its own module, imported (with its heavy dependencies) only
+# when the page is selected, and the refresh scheduler of the data they read
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import importlib
+import streamlit as st
+
+# Module and function rendering each page, in the order of the navigation
+PAGES = {
+    'Home': ('home', 'render'),
+    'Number of stations per fuel': ('summary', 'render_stations_per_fuel'),
+    'Average price per fuel': ('summary', 'render_price_per_fuel'),
+    'Number of stations per fuel per region': ('summary', 'render_stations_per_region'),
+    'Average price per fuel per region': ('summary', 'render_price_per_region'),
+    'Number of stations per brand': ('summary', 'render_stations_per_brand'),
+    'Search city': ('search', 'render_city'),
+    'Search region': ('search', 'render_region'),
+    'Gas Station Map': ('station_map', 'render'),
+    'Machine Learning': ('machine_learning', 'render'),
+    'Reinforcement learning': ('reinforcement', 'render'),
+}
+
+# Pages left out of the navigation, listed when the url has the query parameter of the same name in lowercase (?diagnostics)
+HIDDEN_PAGES = {
+    'Diagnostics': ('diagnostics', 'render'),
+}
+
+# Derived data of a new snapshot built before it goes live: name in the dataset, module and function building it
+DERIVED_DATA = [
+    ('names', 'common', 'build_names'),
+    ('cities', 'common', 'build_city_index'),
+    ('cube', 'common', 'build_cube_df'),
+    ('brands', 'common', 'build_brands'),
+    ('stations', 'station_map', 'build_stations_df'),
+    ('filter_index', 'station_map', 'build_filter_index'),
+    ('spatial_index', 'station_map', 'build_spatial_index'),
+]
+
+
+def warm(dataset):
+    """
+    Build the derived data of a dataset and queue the training of its models, in the thread of the refresh scheduler
+    Args:
+        dataset (Dataset): Dataset of a new snapshot
+    Returns:
+        None
+    """
+    for name, module_name, function_name in DERIVED_DATA:
+        module = importlib.import_module(f'{__name__}.{module_name}')
+        dataset.derive(name, getattr(module, function_name))
+
+    # The models of the Machine Learning page are retrained as soon as the snapshot lands, in their own worker
+    machine_learning = importlib.import_module(f'{__name__}.machine_learning')
+    machine_learning.load_model_registry().schedule(dataset.snapshot_path, dataset.snapshot_id)
+
+
+@st.cache_resource
+def load_scheduler(data_dir):
+    """
+    Start the refresh of the data in background, once for all the sessions
+    Args:
+        data_dir (str): Data directory
+    Returns:
+        scheduler (RefreshScheduler): Scheduler of the live snapshot
+    """
+    # Imported here, so that importing the registry of the pages loads no data library
+    from utils.scheduler import RefreshScheduler, refresh_interval, fetch_brands_enabled
+    return RefreshScheduler(data_dir, refresh_interval(), warm=warm, fetch_brands=fetch_brands_enabled()).start()
+
+
+def render(page, snapshot_path, snapshot_id):
+    """
+    Import the module of a page and render it
+    Args:
+        page (str): Title of the page, key of PAGES or HIDDEN_PAGES
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    module_name, function_name = PAGES[page] if page in PAGES else HIDDEN_PAGES[page]
+    module = importlib.import_module(f'{__name__}.{module_name}')
+    getattr(module, function_name)(snapshot_path, snapshot_id)
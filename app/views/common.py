@@ -0,0 +1,234 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the data shared by several pages, built once
+# per snapshot for all the sessions and only when a page asks for it
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import streamlit as st
+import pandas as pd
+
+from utils.store import load_snapshot, PRICE_COLUMNS
+from utils.history import query as query_history, snapshot_to_records
+from utils.aggregates import CUBE_NAME, LEVELS, build_cube, load_cube, save_cube
+from utils.brands import station_brands, load_brand_table, join_brands
+from utils.http_cache import HttpCache
+from utils.cities import CityIndex
+from utils.charts import ChartCache
+from utils.profiling import span
+from . import load_scheduler
+
+# Get the current working directory
+cwd = os.getcwd()
+
+
+def load_dataset(snapshot_path, snapshot_id):
+    """
+    Return the dataset of a snapshot, shared by all the sessions
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        dataset (Dataset): Read-only data of the snapshot, warmed by the refresh scheduler before it went live
+    """
+    return load_scheduler(cwd + '/data').dataset(snapshot_path, snapshot_id)
+
+def build_names(dataset):
+    """
+    Build the names proposed by the select boxes
+    Args:
+        dataset (Dataset): Dataset of the snapshot
+    Returns:
+        names (dict): Sorted names of the regions ('regions') and of the cities ('villes', sorted by key), names of the fuels ('carburants')
+    """
+    df_price = dataset.frame(['region', 'carburants_disponibles'])
+
+    # Array containing all the names of the regions
+    name_regions = df_price['region'].unique()
+    name_regions = name_regions[~pd.isna(name_regions)]
+
+    # Array containing one name per city, whatever its spellings in the dataset
+    name_villes = dataset.derive('cities', build_city_index).labels
+
+    # Array containing all the names of the fuels
+    name_carburants = df_price['carburants_disponibles'].str.split(',').explode().unique()
+    name_carburants = name_carburants[~pd.isna(name_carburants)]
+
+    return {'regions': sorted(name_regions), 'villes': name_villes, 'carburants': name_carburants}
+
+def build_city_index(dataset):
+    """
+    Build the index of the cities
+    Args:
+        dataset (Dataset): Dataset of the snapshot
+    Returns:
+        cities (CityIndex): Canonical key, spellings and label of each city
+    """
+    return CityIndex(dataset.frame(['ville'])['ville'])
+
+def build_cube_df(dataset):
+    """
+    Load the aggregate cube of the snapshot, building it if it is missing or out of date
+    Args:
+        dataset (Dataset): Dataset of the snapshot
+    Returns:
+        cube (dataframe): Count, sum, min and max of the prices per region, departement, city and fuel
+    """
+    cube_path = dataset.data_dir + '/' + CUBE_NAME
+    cube = load_cube(cube_path, dataset.snapshot_id)
+    if cube is None:
+        cube = build_cube(dataset.frame(LEVELS + PRICE_COLUMNS))
+        save_cube(cube, cube_path, dataset.snapshot_id)
+    return cube
+
+def build_brands(dataset):
+    """
+    Join the brand of each station of the snapshot on the station id
+    Args:
+        dataset (Dataset): Dataset of the snapshot
+    Returns:
+        brands (series): Brand of each station, in the order of the rows of the snapshot
+    """
+    ids = dataset.frame(['id'])['id']
+    try:
+        brands, _ = station_brands(dataset.data_dir, ids)
+    except ValueError:
+        # No brand file at all: the map shows the stations without brand, the brand page tells why
+        brands = join_brands(ids, load_brand_table(None))
+    return brands
+
+def load_data_df(snapshot_path, snapshot_id, columns=None):
+    """
+    Return a view of the snapshot, shared by all the sessions
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+        columns (tuple): Columns to read (all columns if None)
+    Returns:
+        df_price (dataframe): View of the data, copied only if the page modifies it
+    """
+    return load_dataset(snapshot_path, snapshot_id).frame(columns)
+
+def load_names(snapshot_path, snapshot_id):
+    """
+    Return the names proposed by the select boxes
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        names (dict): Names built by build_names
+    """
+    return load_dataset(snapshot_path, snapshot_id).derive('names', build_names)
+
+def load_cities(snapshot_path, snapshot_id):
+    """
+    Return the index of the cities
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        cities (CityIndex): Index built by build_city_index
+    """
+    return load_dataset(snapshot_path, snapshot_id).derive('cities', build_city_index)
+
+def select_city(snapshot_path, snapshot_id, label, key=None):
+    """
+    Display a text input narrowing the cities with a prefix lookup, and the select box of the cities
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+        label (str): Label of the select box
+        key (str): Key of the select box in the session (the text input uses it with the suffix '_search')
+    Returns:
+        ville (str): Label of the selected city
+    """
+    cities = load_cities(snapshot_path, snapshot_id)
+    query = st.text_input("Type the beginning of the name of the city (accents and case are ignored)", key=f'{key or label}_search')
+    # Every city is proposed when nothing matches the query
+    options = cities.search(query, limit=len(cities.keys)) or cities.labels
+    return st.selectbox(label, options, key=key)
+
+def load_cube_df(snapshot_path, snapshot_id):
+    """
+    Return the aggregate cube of the snapshot
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        cube (dataframe): View of the cube built by build_cube_df
+    """
+    return load_dataset(snapshot_path, snapshot_id).derive('cube', build_cube_df)
+
+def load_brands(snapshot_path, snapshot_id):
+    """
+    Return the brand of each station of the snapshot
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        brands (series): View of the brands built by build_brands
+    """
+    return load_dataset(snapshot_path, snapshot_id).derive('brands', build_brands)
+
+@st.cache_data
+def load_price_evolution(snapshot_path, fuel, date_start, date_finish, ids, snapshot_id):
+    """
+    Load the history of the prices of a fuel for some stations
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        fuel (str): Fuel in lowercase
+        date_start (date): First day of the range
+        date_finish (date): Last day of the range
+        ids (array): Ids of the stations
+        snapshot_id (str): Hash of the snapshot, so that a new snapshot invalidates the cache
+    Returns:
+        df_evolution (dataframe): Dataframe with the columns '{fuel}_maj' and '{fuel}_prix'
+    """
+    history_dir = cwd + '/data/history'
+
+    if os.path.isdir(history_dir):
+        df_evolution = query_history(fuel, date_start, date_finish, ids=ids, history_dir=history_dir)
+    else:
+        # No history yet: only the prices of the current snapshot are known
+        df_evolution = snapshot_to_records(load_snapshot(snapshot_path, columns=['id', f'{fuel}_maj', f'{fuel}_prix']), ids)
+        df_evolution = df_evolution[(df_evolution['maj'].dt.date >= date_start) & (df_evolution['maj'].dt.date <= date_finish)]
+
+    return df_evolution.rename(columns={'maj': f'{fuel}_maj', 'prix': f'{fuel}_prix'})[[f'{fuel}_maj', f'{fuel}_prix']]
+
+@st.cache_resource
+def load_http_cache():
+    """
+    Create the cache of the external API responses, shared by all the sessions
+    Args:
+        None
+    Returns:
+        http_cache (HttpCache): Cache of the responses
+    """
+    return HttpCache()
+
+@st.cache_resource
+def load_chart_cache():
+    """
+    Create the cache of the chart specs, shared by all the sessions
+    Args:
+        None
+    Returns:
+        chart_cache (ChartCache): Cache of the Vega-Lite specs
+    """
+    return ChartCache()
+
+def show_chart(page, params, snapshot_id, build):
+    """
+    Display a chart from the cache of the chart specs, building it only on a miss
+    Args:
+        page (str): Name of the chart
+        params (tuple): Hashable parameters of the chart (selected fuel, region, dates...)
+        snapshot_id (str): Hash of the snapshot the chart is built on
+        build (function): Function without arguments returning the Altair chart
+    Returns:
+        None
+    """
+    with span('chart spec', page=page):
+        spec = load_chart_cache().get(page, params, snapshot_id, build)
+    with span('altair chart'):
+        st.vega_lite_chart(spec, use_container_width=True)
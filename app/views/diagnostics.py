@@ -0,0 +1,127 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the hidden diagnostics page (spans and cProfile
+# captures of the last reruns, export of the traces in the Chrome trace format)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import json
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+
+from utils.profiling import TRACE_LOG, PROFILE_ENV, profile_mode
+from utils.scheduler import REFRESH_ENV
+from .common import cwd, load_chart_cache
+from . import load_scheduler
+
+
+def render(snapshot_path, snapshot_id):
+    """
+    Display the diagnostics page
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Diagnostics')
+
+    st.write(f"Each rerun of a traced session records the time spent in each stage (snapshot load, pre-processing, model training, chart and map serialization). Every rerun of every session is traced when the environment variable {PROFILE_ENV} is set to 1 (or to cprofile to also capture the reruns with cProfile). Only the stages run by the script are timed: the models trained in the background appear as the time spent waiting for them.")
+
+    trace_env, profile_env = profile_mode()
+
+    # The options are kept outside of the widget state, so that they still apply on the other pages
+    st.session_state['trace_reruns'] = st.checkbox(
+        "Trace the reruns of this session", value=trace_env or st.session_state.get('trace_reruns', False), disabled=trace_env,
+    )
+    st.session_state['profile_reruns'] = st.checkbox(
+        "Capture the reruns of this session with cProfile", value=profile_env or st.session_state.get('profile_reruns', False), disabled=profile_env,
+    )
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Cache of the chart specs
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.title('Chart cache')
+
+    chart_cache = load_chart_cache()
+    pages, entries, size = chart_cache.stats()
+    st.write(f"{chart_cache.hits} hits, {chart_cache.misses} misses, {entries} cached charts ({size / 2 ** 20:.1f} MB of data). A miss builds the chart and serializes its data, a hit sends the cached spec as is.")
+    if pages:
+        st.dataframe(pd.DataFrame(pages).round(2), hide_index=True, use_container_width=True)
+    if st.button("Clear the chart cache"):
+        chart_cache.clear()
+        st.rerun()
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Background refresh of the data
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.title('Data refresh')
+
+    scheduler = load_scheduler(cwd + '/data')
+    if scheduler.running():
+        st.write(f"The data is downloaded every {scheduler.interval:.0f} seconds by a background thread (environment variable {REFRESH_ENV}, 0 to disable it). A new snapshot goes live once its derived data is built, the reruns in progress keep the previous one.")
+    else:
+        st.write(f"The background refresh is disabled ({REFRESH_ENV}=0): the snapshot written by get_data.py goes live at the next rerun.")
+
+    def format_time(timestamp):
+        return f"{datetime.fromtimestamp(timestamp):%Y-%m-%d %H:%M:%S}" if timestamp is not None else '-'
+
+    st.dataframe(pd.DataFrame({
+        'Live snapshot': [snapshot_id[:16]],
+        'Last check': [format_time(scheduler.last_check)],
+        'Last swap': [format_time(scheduler.last_swap)],
+        'Swaps': [scheduler.nb_swaps],
+        'Last error': [scheduler.last_error or '-'],
+    }), hide_index=True, use_container_width=True)
+
+    traces = [trace for trace in TRACE_LOG.traces() if trace.duration is not None]
+
+    if not traces:
+        st.write("No rerun has been traced yet: enable the traces, then open the page to measure.")
+        return
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Time per stage over all the traces
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.title('Time per stage')
+
+    st.dataframe(pd.DataFrame(TRACE_LOG.summary()).round(2), hide_index=True, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "Download the Chrome trace",
+            json.dumps(TRACE_LOG.chrome_trace()),
+            file_name=f"petrodash-trace-{datetime.now():%Y%m%d-%H%M%S}.json",
+            mime="application/json",
+        )
+    with col2:
+        if st.button("Clear the traces"):
+            TRACE_LOG.clear()
+            st.rerun()
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Stages of one rerun
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.title('Reruns')
+
+    labels = [f"{datetime.fromtimestamp(trace.timestamp):%H:%M:%S} - {trace.name} ({trace.duration / 1e6:.0f} ms)" for trace in traces]
+    position = st.selectbox("Choose a rerun", range(len(traces)), format_func=lambda position: labels[position])
+    trace = traces[position]
+
+    st.dataframe(pd.DataFrame({
+        'Stage': ['    ' * item['depth'] + item['name'] for item in trace.spans],
+        'Start (ms)': [item['start'] / 1e6 for item in trace.spans],
+        'Duration (ms)': [item['duration'] / 1e6 for item in trace.spans],
+        'Details': [', '.join(f'{key}={value}' for key, value in item['args'].items()) for item in trace.spans],
+    }).sort_values('Start (ms)').round(2), hide_index=True, use_container_width=True)
+
+    if trace.profiler is not None:
+        sort = st.selectbox("Sort the functions by", ['cumulative', 'tottime', 'ncalls'])
+        st.code(trace.profile_text(sort), language=None)
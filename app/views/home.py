@@ -0,0 +1,23 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the home page of the dashboard
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import streamlit as st
+
+
+def render(snapshot_path, snapshot_id):
+    """
+    Display the home page
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    st.write('<br><br>', unsafe_allow_html=True)
+    st.write('This application allows you to visualize the price of fuels in France.')
+    st.write('First, i have analyzed the data in the entire dataset. To see, the number of stations per fuel, the average price per fuel, the number of stations per fuel per region and the average price per fuel per region.')
+    st.write('Then, you can filter the data by city or by region. You can also filter by fuel. Finally, you can see the evolution of the price of a fuel over time in a city or a region.')
+    st.write('I have also added a map that allows you to see the location of the stations in France. You can filter the data by city or by region. You can also filter by fuel.')
+    st.write('<strong>Warning:</strong> The data is updated every 15 minutes. The data is not updated in real time.', unsafe_allow_html=True)
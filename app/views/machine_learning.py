@@ -0,0 +1,191 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the machine learning page (prediction of the price
+# of a fuel and clustering of the gas stations)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import streamlit as st
+import pandas as pd
+import matplotlib.pyplot as plt
+from datetime import datetime
+
+from utils.store import FUELS, load_snapshot
+from utils.models import ModelRegistry
+from utils.training import train_all
+from utils.aggregates import FUEL_LABELS
+from utils.profiling import span
+from .common import cwd, load_data_df, load_names, load_cities, select_city
+
+
+@st.cache_resource
+def load_model_registry():
+    """
+    Create the registry of the machine learning models, shared by all the sessions
+    Args:
+        None
+    Returns:
+        registry (ModelRegistry): Registry of the models saved in data/models
+    """
+    return ModelRegistry(cwd + '/data/models')
+
+
+@st.cache_data
+def load_model_comparison(snapshot_path, snapshot_id, per_region):
+    """
+    Train the regressions of all the fuels in parallel and compare them
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot, used as cache key
+        per_region (bool): True to also train one regression per fuel and region
+    Returns:
+        comparison (dataframe): Prices, mean square error, actual and predicted prices of each fuel and region
+    """
+    columns = ['latitude', 'longitude', 'region'] + [f'{fuel}_{kind}' for fuel in FUELS for kind in ('maj', 'prix')]
+    comparison, _ = train_all(load_snapshot(snapshot_path, columns=columns), per_region=per_region)
+    return comparison
+
+
+def render(snapshot_path, snapshot_id):
+    """
+    Display the machine learning page
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    names = load_names(snapshot_path, snapshot_id)
+    name_carburants = names['carburants']
+    cities = load_cities(snapshot_path, snapshot_id)
+    df_price = load_data_df(snapshot_path, snapshot_id, ('latitude', 'longitude'))
+
+
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Machine Learning')
+
+    st.markdown('''
+    In the 'Predict the price of fuel' section, we are using machine learning techniques to predict the price of a specific type of fuel in a chosen city in France. Here's how it works:
+
+    1. **Select Your Preferences**: You can choose the type of fuel (e.g., diesel, e10, sp98) and the city for which you want to predict the fuel price. 
+    2. **Data Preparation**: We extract relevant data, including the timestamp, latitude, longitude, and the price of the selected fuel type. We remove any missing values from the dataset.
+    3. **Training the Model**: We split the data into training and test sets. Then, we create a machine learning pipeline that standardizes the data and uses linear regression to build a predictive model.
+    4. **Model Evaluation**: We evaluate the model's performance by calculating the Mean Square Error (MSE) on the test set, which provides an indication of how well the model predicts fuel prices.
+    5. **Making Predictions**: We use the trained model to make predictions for the selected city's coordinates and the current timestamp. This allows us to estimate the fuel price for the chosen location and type.
+    6. **Visualization**: We create a scatter plot to compare actual prices against predicted prices, providing a visual representation of the model's accuracy.
+                
+    In the 'Clustering of gas stations' section, we use clustering techniques to group gas stations based on their geographical location and fuel prices. Here's a summary of this section:
+    1. **Data Selection**: We use the latitude, longitude, and prices of different fuel types for the clustering task.
+    2. **Data Preprocessing**: The data is standardized, and the prices of the fuels a station does not sell are ignored rather than replaced with zeros.
+    3. **K-Means Clustering**: We apply a mini-batch K-Means to group gas stations into clusters, starting from the clusters of the previous update of the prices. You can choose the number of clusters to create.
+    4. **Cluster Visualization**: We create a scatter plot on a map, with each cluster represented by a different color. You can see the distribution of gas stations in France and how they are grouped based on their attributes.
+                
+    These sections allow you to explore fuel price predictions and the clustering of gas stations in France, providing valuable insights into the fuel market across different regions.''')
+
+    st.write('<br>', unsafe_allow_html=True)
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Linear regression
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.title('Predict the price of fuel')
+
+    type_carburant = st.selectbox("Write or choose the carburant for you want to see",name_carburants, key="carburant_selectbox")
+
+    ville = select_city(snapshot_path, snapshot_id, "Write or choose the city for which you want to see the average price")
+
+    # Models of the snapshot, trained once in the background and saved on disk (queued by the refresh scheduler
+    # when the snapshot went live, or here when the background refresh is disabled). The model displayed below
+    # does not wait for the others: get trains it at once if it is still in the queue
+    registry = load_model_registry()
+    registry.schedule(snapshot_path, snapshot_id)
+
+    try:
+        with span('model', model=f'regression-{type_carburant.lower()}'):
+            model = registry.get(f'regression-{type_carburant.lower()}', snapshot_path, snapshot_id)
+    except ValueError:
+        # No station of the snapshot sells the fuel (or too few): the other sections are still displayed
+        model = None
+        st.warning(f'Not enough {type_carburant} prices in the last update to train the model')
+
+    if model is not None:
+        # Evaluate the model
+        st.write(f'{type_carburant} mean square error : {model["mse"]}')
+
+        # Recover the city coordinates
+        df_ville = df_price[cities.mask(ville)]
+        latitude = df_ville['latitude'].iloc[0]
+        longitude = df_ville['longitude'].iloc[0]
+
+        # Make predictions on new data
+        prix_predits = registry.predict(type_carburant.lower(), snapshot_path, snapshot_id, datetime.now().timestamp(), latitude, longitude)
+        # round the price
+        prix_predits = round(prix_predits, 3)
+        st.write(f'Predicted {type_carburant} prices in {ville}: {prix_predits}')
+
+        # Plot the predictions
+        fig, ax = plt.subplots()
+        ax.scatter(model['y_test'], model['y_pred'])
+        ax.set_xlabel('Actual')
+        ax.set_ylabel('Predicted')
+        st.pyplot(fig)
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Comparison of the fuels
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.title('Compare the models of all the fuels')
+
+    st.write("The regressions of the six fuels (and, if you want, of each fuel in each region) are trained at once, in parallel on the cores of the server. The table compares their mean square error, the average actual price and the price predicted today at the average position of the stations.")
+
+    if st.checkbox("Train the models of all the fuels", False):
+        per_region = st.checkbox("Also train one model per region", False)
+        comparison = load_model_comparison(snapshot_path, snapshot_id, per_region)
+        st.dataframe(pd.DataFrame({
+            'Carburant': comparison['fuel'].map(FUEL_LABELS),
+            'Region': comparison['region'],
+            'Prices': comparison['prices'],
+            'Mean square error': comparison['mse'],
+            'Average price': comparison['mean'],
+            'Predicted price': comparison['predicted'],
+        }).round(4), hide_index=True, use_container_width=True)
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Clustering
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.title('Clustering of gas stations')
+
+    k = st.slider("Number of clusters", 2, 12, 6)
+
+    # Apply K-Means clustering to group gas stations (trained once per snapshot, from the centroids of the previous one)
+    data = df_price[['latitude', 'longitude']].copy()
+    with span('model', model=f'clusters-{k}'):
+        model = registry.get(f'clusters-{k}', snapshot_path, snapshot_id)
+    data["cluster"] = model['labels']
+
+    # Create a scatter plot for each cluster
+    fig, ax = plt.subplots()
+    colors = plt.get_cmap('tab20' if k > 10 else 'tab10').colors  # Define colors for clusters
+
+    col1, col2 = st.columns(2)
+
+    # Display the number of stations in each cluster
+    for cluster_id in range(k):
+        cluster_data = data[data["cluster"] == cluster_id]
+        with col1 if cluster_id < (k + 1) // 2 else col2:
+            st.write(f"Cluster {cluster_id}: {len(cluster_data)} stations-service")
+        ax.scatter(cluster_data["longitude"], cluster_data["latitude"], color=colors[cluster_id], label=f"Cluster {cluster_id}")
+
+    ax.set_xlabel('Latitude')
+    ax.set_ylabel('Longitude')
+    ax.legend()
+
+    # Display the scatter plot in the Streamlit app
+    st.pyplot(fig)
+
+    # Average position and prices of each cluster
+    if model.get('centers') is not None:
+        st.write("Centroids of the clusters (the prices of a cluster are averaged over the stations selling the fuel):")
+        centers = model['centers'].rename(columns={f'{fuel}_prix': FUEL_LABELS[fuel] for fuel in FUELS})
+        st.dataframe(centers.rename_axis('Cluster').round(3), use_container_width=True)
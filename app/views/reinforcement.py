@@ -0,0 +1,127 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the reinforcement learning page (epsilon-greedy
+# on the price of the gazole)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import streamlit as st
+import matplotlib.pyplot as plt
+
+from utils.store import load_snapshot
+from utils.bandit import simulate, EPSILON_VALUES
+
+
+@st.cache_data
+def load_bandit_simulation(snapshot_path, snapshot_id, epsilons, steps, runs, noise):
+    """
+    Simulate epsilon-greedy on the gazole prices (one arm per station)
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot, used as cache key
+        epsilons (tuple): Epsilon values to compare
+        steps (int): Number of steps of each run
+        runs (int): Number of runs per epsilon
+        noise (float): Standard deviation of the noise added to the rewards
+    Returns:
+        result (dict): Regret curves and mean action counts / values of each epsilon
+    """
+    rewards = load_snapshot(snapshot_path, columns=['gazole_prix'])['gazole_prix'].to_numpy()
+    return simulate(rewards, epsilons, steps=steps, runs=runs, noise=noise)
+
+
+def render(snapshot_path, snapshot_id):
+    """
+    Display the reinforcement learning page
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Reinforcement learning')
+
+    st.markdown('''
+    Reinforcement Learning for Fuel Price Optimization
+
+    In this section, we utilize the epsilon-greedy algorithm to optimize fuel prices effectively.
+
+    The epsilon-greedy algorithm explores and exploits different fuel pricing strategies. Here's a brief overview:
+
+    - We use the epsilon-greedy algorithm with incremental updates.
+    - The algorithm dynamically adjusts its strategy to find the best fuel price.
+    - We analyze the algorithm's performance with varying epsilon values (0.1, 0.5, and 1 by default), averaged over several runs.
+    - Every epsilon and every run are simulated together, so the parameters can be changed interactively.
+    ''')
+
+    st.write('<br>', unsafe_allow_html=True)
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Epsilon-greedy algorithm
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.title('Epsilon-greedy algorithm')
+
+    epsilons = st.multiselect('Epsilon values', EPSILON_VALUES, default=[0.1, 0.5, 1.0])
+    steps = st.select_slider('Number of steps', options=[1000, 10000, 100000], value=1000)
+    runs = st.slider('Number of runs per epsilon', 1, 20, 1)
+    noise = st.slider('Noise of the rewards (standard deviation)', 0.0, 0.2, 0.0, step=0.01)
+
+    if not epsilons:
+        st.warning('Choose at least one epsilon value')
+        st.stop()
+
+    try:
+        result = load_bandit_simulation(snapshot_path, snapshot_id, tuple(sorted(epsilons)), steps, runs, noise)
+    except ValueError:
+        st.warning('No Gazole price in the last update to simulate')
+        st.stop()
+    labels = [f'epsilon={epsilon:g}' for epsilon in result['epsilons']]
+
+    # Plot the cumulative regret of each epsilon
+    fig0, ax0 = plt.subplots()
+    for label, regret in zip(labels, result['regret']):
+        ax0.plot(regret, label=label)
+    ax0.set_xlabel('Step')
+    ax0.set_ylabel('Cumulative regret')
+    ax0.legend()
+    st.pyplot(fig0)
+
+    # Plot the results for Number of times action was selected
+    fig1, ax1 = plt.subplots()
+    for label, counts in zip(labels, result['counts']):
+        ax1.plot(counts, label=label)
+    ax1.set_xlabel('Action')
+    ax1.set_ylabel('Number of times action was selected')
+    ax1.legend()
+    st.pyplot(fig1)
+
+    # Plot the results for Value of the action
+    fig2, ax2 = plt.subplots()
+    for label, values in zip(labels, result['values']):
+        ax2.plot(values, label=label)
+    ax2.set_xlabel('Action')
+    ax2.set_ylabel('Value of the action')
+    ax2.legend()
+    st.pyplot(fig2)
+
+    # Log scale plot of epsilon greedy
+    fig3, ax3 = plt.subplots()
+    for label, counts, values in zip(labels, result['counts'], result['values']):
+        ax3.plot(counts * values, label=label)
+    ax3.legend()
+    ax3.set_xscale('log')
+    ax3.set_xlabel('Action')
+    ax3.set_ylabel('Value of the action')
+    st.pyplot(fig3)
+
+    # Plot moving average ctr
+    fig4, ax4 = plt.subplots()
+    for label, counts, values in zip(labels, result['counts'], result['values']):
+        ax4.plot(counts * values, label=label)
+    ax4.legend()
+    ax4.set_xlabel('Action')
+    ax4.set_ylabel('Value of the action')
+    st.pyplot(fig4)
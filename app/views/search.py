@@ -0,0 +1,123 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the search pages (prices of a city or of a region
+# and evolution of the price of a fuel over time)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+
+from utils.charts import price_per_fuel_chart, price_evolution_chart
+from utils.http_cache import city_url
+from utils.timeseries import AUTO, BUCKETS
+from .common import load_data_df, load_names, load_cities, select_city, load_cube_df, load_price_evolution, load_http_cache, show_chart
+
+
+def render_city(snapshot_path, snapshot_id):
+    """
+    Display the prices of a city
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    names = load_names(snapshot_path, snapshot_id)
+    name_carburants = names['carburants']
+    cities = load_cities(snapshot_path, snapshot_id)
+    cube = load_cube_df(snapshot_path, snapshot_id)
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Search city
+    # Display graphics on a city by a call API
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Search city')
+
+    st.write("Now, you have the ability to narrow down your analysis to a specific city using the parameters of your choice. You can explore the average fuel prices in a selected city and track the evolution of fuel prices over time within that city. To begin, then choose a city from the dropdown menu. This will display the average fuel prices for different fuel types in your selected city. Additionally, you can further refine your analysis by specifying a fuel type and a date range to examine how the fuel prices have changed over time. The line chart will show you the average price of each hour, day, week or month for your chosen fuel type in the selected city, over the band of its minimum and maximum prices.")
+
+    st.write('<br>', unsafe_allow_html=True)
+
+    ville = select_city(snapshot_path, snapshot_id, "Write or choose the city for which you want to see the average price")
+
+    # Stations of the city listed by the API, requested in the background and cached for all the sessions:
+    # the rerun never waits for the API, the stations are shown once they arrived
+    stations_api = load_http_cache().get(city_url(ville))
+    with st.expander(f'Stations of {ville} listed by the API'):
+        if isinstance(stations_api, (list, dict)) and len(stations_api):
+            st.dataframe(pd.json_normalize(stations_api), hide_index=True, use_container_width=True)
+        else:
+            st.write("The stations of the city are being requested from the API: they are shown at the next interaction.")
+
+    st.title(f'Average price per fuel in the city of {ville}')
+
+    # Prices of every spelling of the city ('PARIS', 'Paris') merged per fuel
+    show_chart('price_per_fuel_city', (ville, tuple(name_carburants)), snapshot_id,
+               lambda: price_per_fuel_chart(cube[cube['ville'].isin(cities.spellings(ville))], name_carburants))
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Display the evolution of the price of fuel per city
+    # ---------------------------------------------------------------------------------------------------------------
+
+    type_carburant = st.selectbox("Write or choose the carburant for you want to see",name_carburants)
+    date_start = st.date_input("Date de début de recherche", datetime(2023, 1, 1))
+    current_date = datetime.now().date()
+    date_finish = st.date_input("Date de fin de recherche", current_date)
+    bucket = st.selectbox("Choose the time step of the chart", [AUTO] + list(BUCKETS))
+
+    def build_evolution():
+        # Read the history of the prices of the stations of the city
+        ids = load_data_df(snapshot_path, snapshot_id, ('id',)).loc[cities.mask(ville), 'id'].to_numpy()
+        df_price_ = load_price_evolution(snapshot_path, type_carburant.lower(), date_start, date_finish, ids, snapshot_id)
+        return price_evolution_chart(df_price_, type_carburant.lower(), bucket)
+
+    st.title(f'Evolution of the price of {type_carburant} according to time on {ville}')
+
+    show_chart('price_evolution_city', (ville, type_carburant, date_start, date_finish, bucket), snapshot_id, build_evolution)
+
+
+def render_region(snapshot_path, snapshot_id):
+    """
+    Display the prices of a region
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    names = load_names(snapshot_path, snapshot_id)
+    name_regions, name_carburants = names['regions'], names['carburants']
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Search region
+    # Display graphics on a region by filtering the dataframe
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Search region')
+
+    st.write("In this section, you can focus your analysis on a specific region by filtering the data accordingly. First, select a region from the dropdown menu, and then choose a fuel type that you want to investigate. You can further refine your analysis by specifying a date range to observe how fuel prices have evolved over time in the selected region. The line chart will visualize the average price of each hour, day, week or month for the chosen fuel type in the chosen region, over the band of its minimum and maximum prices, allowing you to gain insights into the price fluctuations in that area.")
+
+    st.write('<br>', unsafe_allow_html=True)
+
+    region = st.selectbox("Write or choose the region for which you want to see",name_regions, key="region_selectbox")
+    type_carburant = st.selectbox("Write or choose the carburant for you want to see",name_carburants, key="carburant_selectbox")
+    date_start = st.date_input("Date de début de recherche", datetime(2023, 1, 1), key="date_start_selectbox")
+    current_date = datetime.now().date()
+    date_finish = st.date_input("Date de fin de recherche", current_date, key="date_finish_selectbox")
+    bucket = st.selectbox("Choose the time step of the chart", [AUTO] + list(BUCKETS), key="bucket_selectbox")
+
+    def build_evolution():
+        # Read the history of the prices of the stations of the region
+        df_price = load_data_df(snapshot_path, snapshot_id, ('id', 'region'))
+        ids = df_price.loc[df_price['region'] == region, 'id'].to_numpy()
+        df_price_ = load_price_evolution(snapshot_path, type_carburant.lower(), date_start, date_finish, ids, snapshot_id)
+        return price_evolution_chart(df_price_, type_carburant.lower(), bucket)
+
+    st.title(f'Evolution of the price of {type_carburant} according to time on {region}')
+
+    show_chart('price_evolution_region', (region, type_carburant, date_start, date_finish, bucket), snapshot_id, build_evolution)
@@ -0,0 +1,156 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the map of the gas stations (filters by fuel, city
+# or region and cheapest stations around a point)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+from utils.map import generate_map, MAX_POINTS
+from utils.spatial import SpatialIndex
+from utils.stations import build_stations, degrees
+from utils.filters import FilterIndex
+from utils.cities import city_key
+from utils.profiling import span
+from .common import load_dataset, load_names, select_city, build_brands
+
+
+def build_stations_df(dataset):
+    """
+    Build the compact table of the stations displayed by the map
+    Args:
+        dataset (Dataset): Dataset of the snapshot
+    Returns:
+        stations (dataframe): Table returned by build_stations
+    """
+    return build_stations(dataset.frame(), dataset.derive('brands', build_brands))
+
+def build_filter_index(dataset):
+    """
+    Build the filter engine of the map
+    Args:
+        dataset (Dataset): Dataset of the snapshot
+    Returns:
+        filter_index (FilterIndex): Fuel bitsets and location row lists of the stations
+    """
+    return FilterIndex(dataset.derive('stations', build_stations_df))
+
+def build_spatial_index(dataset):
+    """
+    Build the spatial index of the stations
+    Args:
+        dataset (Dataset): Dataset of the snapshot
+    Returns:
+        spatial_index (SpatialIndex): Index of the positions of the stations
+    """
+    df_coordinates = dataset.frame(['latitude', 'longitude'])
+    return SpatialIndex(df_coordinates['latitude'] / 100000, df_coordinates['longitude'] / 100000)
+
+
+def render(snapshot_path, snapshot_id):
+    """
+    Display the map of the gas stations
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    dataset = load_dataset(snapshot_path, snapshot_id)
+    names = load_names(snapshot_path, snapshot_id)
+    name_regions, name_carburants = names['regions'], names['carburants']
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Map
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Gas Station Map')
+
+    # Compact table of the stations, built once per snapshot and shared by all the sessions
+    df_price = dataset.derive('stations', build_stations_df)
+
+    st.write("In the 'Gas Station Map' section, you can visualize the location of fuel stations across France on a map. You have the option to filter the stations based on your preferences. You can filter by fuel type(s), and choose whether you want to filter by city or region. This interactive map allows you to explore the geographic distribution of fuel stations and their availability based on the selected filters. You can focus on specific areas and discover the locations that match your fuel preferences.")
+
+    st.write('<br>', unsafe_allow_html=True)
+
+    # Create a checkbox to find the cheapest stations around a point
+
+    if st.checkbox("Find the cheapest stations around a point",False):
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            latitude = st.number_input("Latitude", value=48.8566, format="%.4f")
+            longitude = st.number_input("Longitude", value=2.3522, format="%.4f")
+        with col2:
+            type_carburant = st.selectbox("Write or choose the carburant for you want to see",name_carburants, key="carburant_nearby_selectbox")
+            radius = st.slider("Radius (km)", 1, 50, 10)
+            k = st.slider("Number of stations", 1, 20, 5)
+
+        # Query the spatial index with the numeric prices of the snapshot
+        spatial_index = dataset.derive('spatial_index', build_spatial_index)
+        prices = df_price[f'{type_carburant.lower()}_prix'].to_numpy()
+        positions, distances = spatial_index.cheapest(latitude, longitude, prices, radius_km=radius, k=k)
+
+        df_price_ = df_price.iloc[positions]
+
+        st.dataframe(pd.DataFrame({
+            'Address': df_price_['adresse'].to_numpy(),
+            'City': df_price_['ville'].to_numpy(),
+            f'Price {type_carburant}': prices[positions],
+            'Distance (km)': distances.round(2),
+        }), hide_index=True)
+
+    # Create a checkbox to filter the map
+
+    elif st.checkbox("Filter",False):
+
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            gazole = st.checkbox("Gazole",False)
+            sp98 = st.checkbox("SP98",False)
+            sp95 = st.checkbox("SP95",False)
+        with col2:
+            e10 = st.checkbox("E10",False)
+            e85 = st.checkbox("E85",False)
+            gplc = st.checkbox("GPLc",False)
+        
+        # Fuels that the stations must all sell, resolved with the filter engine in a single selection of rows
+        filter_index = dataset.derive('filter_index', build_filter_index)
+        fuels = [fuel for fuel, checked in zip(['gazole', 'sp98', 'sp95', 'e10', 'e85', 'gplc'], [gazole, sp98, sp95, e10, e85, gplc]) if checked]
+
+        if st.checkbox("If you want to filter by City (if not, it will be by Region)",False):
+
+            ville = select_city(snapshot_path, snapshot_id, "Write or choose the city for which you want to see", key="ville_map_selectbox")
+            df_price_ = df_price.iloc[filter_index.select(fuels, 'city', city_key(ville))]
+
+        else:
+            region = st.selectbox("Write or choose the region for which you want to see",name_regions, key="region_map_selectbox")
+            df_price_ = df_price.iloc[filter_index.select(fuels, 'region', region)]
+    else:
+        df_price_ = df_price
+
+    # View of the map: clusters of stations when zoomed out, stations of the viewport when zoomed in
+    st.write('<br>', unsafe_allow_html=True)
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        zoom = st.slider("Zoom", 4, 15, 4 if len(df_price_) > MAX_POINTS else 8)
+    with col2:
+        latitude_view = st.number_input("Center latitude", value=float(np.nanmean(degrees(df_price_['latitude']))) if len(df_price_) else 48.8566, format="%.4f")
+    with col3:
+        longitude_view = st.number_input("Center longitude", value=float(np.nanmean(degrees(df_price_['longitude']))) if len(df_price_) else 2.3522, format="%.4f")
+
+    # Generate the map (the spatial index of the snapshot finds the stations of the viewport, unless they are filtered)
+    spatial_index = dataset.derive('spatial_index', build_spatial_index) if df_price_ is df_price else None
+    map_ = generate_map(df_price_, latitude_view, longitude_view, zoom, spatial_index)
+
+    # Display the map
+    with span('pydeck chart'):
+        st.pydeck_chart(map_)
@@ -0,0 +1,136 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the summary pages (number of stations and average
+# price per fuel, per region and per brand), read from the aggregate cube
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import streamlit as st
+
+from utils.charts import stations_per_fuel_chart, price_per_fuel_chart, per_region_chart, stations_per_brand_chart
+from utils.brands import station_brands
+from .common import cwd, load_names, load_cube_df, load_brands, show_chart
+
+
+def render_stations_per_fuel(snapshot_path, snapshot_id):
+    """
+    Display the number of stations per fuel
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    # ---------------------------------------------------------------------------------------------------------------
+    # Display the number of stations per fuel
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Number of stations per fuel')
+
+    # Number of stations per fuel, read from the aggregate cube (the chart is built once per snapshot)
+    show_chart('stations_per_fuel', (), snapshot_id, lambda: stations_per_fuel_chart(load_cube_df(snapshot_path, snapshot_id)))
+
+    st.write("The bar chart above displays the number of fuel stations for each type of fuel in France. It offers a visual representation of the availability of different fuel options across the country. This information can be valuable for understanding the distribution of fuel options and their accessibility to consumers in different regions.")
+
+
+def render_price_per_fuel(snapshot_path, snapshot_id):
+    """
+    Display the average price per fuel
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    name_carburants = load_names(snapshot_path, snapshot_id)['carburants']
+
+    # ---------------------------------------------------------------------------------------------------------------
+    # Display the average price per fuel
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Average price per fuel')
+
+    show_chart('price_per_fuel', tuple(name_carburants), snapshot_id,
+               lambda: price_per_fuel_chart(load_cube_df(snapshot_path, snapshot_id), name_carburants))
+
+    st.write("The bar chart above illustrates the average prices for different types of fuels in France. It provides valuable insights into the cost of different fuels, helping consumers make informed decisions about their fuel choices. This data can also be useful for tracking price trends and comparing fuel prices between regions and cities.")
+
+
+def render_stations_per_region(snapshot_path, snapshot_id):
+    """
+    Display the number of stations per fuel per region
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    # ---------------------------------------------------------------------------------------------------------------
+    # Display the number of stations per fuel per region
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Number of stations per fuel per region')
+
+    show_chart('stations_per_region', (), snapshot_id,
+               lambda: per_region_chart(load_cube_df(snapshot_path, snapshot_id), 'count', 'Number stations'))
+
+    st.write("The bar chart above presents the number of fuel stations for each type of fuel in various regions of France. It allows you to compare the availability of different fuel options across different regions. This information can be helpful for residents or travelers looking for specific fuel types in particular areas. The chart provides a clear visual representation of the regional distribution of fuel stations for each fuel type.")
+
+
+def render_price_per_region(snapshot_path, snapshot_id):
+    """
+    Display the average price per fuel per region
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    # ---------------------------------------------------------------------------------------------------------------
+    # Display the average price per fuel per region
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Average price per fuel per region')
+
+    show_chart('price_per_region', (), snapshot_id,
+               lambda: per_region_chart(load_cube_df(snapshot_path, snapshot_id), 'mean', 'Average price'))
+
+    st.write("The bar chart above provides insights into the average prices of different fuels in different regions of France. It allows you to compare the cost of various fuels within specific regions. This information can be valuable for budget-conscious consumers or businesses looking to optimize their fuel expenses. By visualizing the regional price differences, users can make more informed decisions about where to refuel based on their fuel preferences and budget.")
+
+
+def render_stations_per_brand(snapshot_path, snapshot_id):
+    """
+    Display the number of stations per brand
+    Args:
+        snapshot_path (str): Path of the columnar snapshot
+        snapshot_id (str): Hash of the snapshot
+    Returns:
+        None
+    """
+    # ---------------------------------------------------------------------------------------------------------------
+    # Display the number of stations per brand
+    # ---------------------------------------------------------------------------------------------------------------
+
+    st.write('<br><br>', unsafe_allow_html=True)
+
+    st.title('Number of stations per brand')
+
+    try:
+        _, keyed = station_brands(cwd + '/data', [])
+    except ValueError as error:
+        st.error(str(error))
+        return
+    if not keyed:
+        st.info("The brands come from the brand.csv bundled with the project, matched to the stations by position: run python get_data.py --brands to fetch the brand of each station by its id.")
+
+    # Number of stations per brand, counted on the stations of the current snapshot
+    show_chart('stations_per_brand', (), snapshot_id, lambda: stations_per_brand_chart(load_brands(snapshot_path, snapshot_id)))
+
+    st.write("The bar chart above presents the number of fuel stations for different brands in France. It provides insights into the distribution of fuel stations among various brands, helping consumers identify popular and widely available brands. This information can be valuable for consumers looking for fuel stations associated with specific brands or for businesses considering brand partnerships for their fleet's fueling needs.")
@@ -0,0 +1,113 @@
+# ------------------------------------------------------------------------------
+# Description: This script measures the throughput of the validation stage of
+# app/utils/anomalies.py on successive synthetic snapshots with injected anomalies
+# Run it from the root of the project: python -m benchmarks.bench_anomalies [nb_stations]
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from app.utils.store import FUELS
+from app.utils.anomalies import AnomalyDetector
+from benchmarks.synthetic import FUELS as SYNTHETIC_FUELS
+
+# Number of stations and of successive snapshots
+NB_STATIONS = 1000000
+NB_SNAPSHOTS = 6
+
+# Share of the prices of the last snapshot replaced by each kind of anomaly
+ANOMALY_SHARE = 0.001
+
+# Time of the first snapshot, and time between two snapshots
+START = pd.Timestamp('2024-01-01', tz='UTC')
+PERIOD = pd.Timedelta(days=1)
+
+
+def generate_snapshot(prices, available, now, rng):
+    """
+    Generate the typed price columns of a snapshot, each station updating about half of its prices
+    Args:
+        prices (dict): Current price of each fuel, updated in place
+        available (dict): Stations selling each fuel
+        now (timestamp): Time of the snapshot
+        rng (Generator): Random generator
+    Returns:
+        df (dataframe): Dataframe with the columns 'id', '*_prix' (float32) and '*_maj' (datetime)
+    """
+    n = len(next(iter(prices.values())))
+    df = pd.DataFrame({'id': np.arange(1000000, 1000000 + n)})
+    for fuel in FUELS:
+        updated = rng.random(n) < 0.5
+        prices[fuel] = np.where(updated, prices[fuel] + rng.normal(0, 0.01, n), prices[fuel]).round(3).astype('float32')
+        dates = now - pd.to_timedelta(rng.integers(0, 86400, n), unit='s')
+        df[f'{fuel}_prix'] = np.where(available[fuel], prices[fuel], np.nan).astype('float32')
+        df[f'{fuel}_maj'] = pd.Series(dates).where(available[fuel])
+    return df
+
+
+def inject_anomalies(df, now, rng):
+    """
+    Replace some prices by zeros, typos (price x 10 or / 10), sudden jumps and stale dates
+    Args:
+        df (dataframe): Dataframe returned by generate_snapshot, modified in place
+        now (timestamp): Time of the snapshot
+        rng (Generator): Random generator
+    Returns:
+        injected (dict): Number of injected anomalies per kind
+    """
+    injected = {'zero': 0, 'typo': 0, 'jump': 0, 'stale': 0}
+    for fuel in FUELS:
+        price = df[f'{fuel}_prix'].to_numpy().copy()
+        maj = df[f'{fuel}_maj'].copy()
+        sold = np.flatnonzero(~np.isnan(price))
+        chosen = rng.choice(sold, 4 * int(len(sold) * ANOMALY_SHARE), replace=False).reshape(4, -1)
+
+        price[chosen[0]] = 0
+        price[chosen[1]] *= np.where(rng.random(chosen.shape[1]) < 0.5, 10, 0.1)
+        price[chosen[2]] *= 1.3
+        maj.iloc[chosen[3]] = now - pd.Timedelta(days=400)
+
+        df[f'{fuel}_prix'] = price
+        df[f'{fuel}_maj'] = maj
+        for kind, rows in zip(injected, chosen):
+            injected[kind] += len(rows)
+    return injected
+
+
+def main(nb_stations=NB_STATIONS):
+    """
+    Run the benchmark and print the throughput and the detected anomalies
+    Args:
+        nb_stations (int): Number of synthetic stations
+    Returns:
+        None
+    """
+    rng = np.random.default_rng(0)
+    available = {fuel: rng.random(nb_stations) < SYNTHETIC_FUELS[fuel][1] for fuel in FUELS}
+    prices = {fuel: rng.normal(SYNTHETIC_FUELS[fuel][2], 0.08, nb_stations) for fuel in FUELS}
+    detector = AnomalyDetector()
+
+    # The first snapshots fill the statistics of the stations, the last one carries the anomalies
+    for snapshot in range(NB_SNAPSHOTS):
+        now = START + snapshot * PERIOD
+        df = generate_snapshot(prices, available, now, rng)
+        injected = inject_anomalies(df, now, rng) if snapshot == NB_SNAPSHOTS - 1 else {}
+        nb_records = int(sum(df[f'{fuel}_prix'].notna().sum() for fuel in FUELS))
+
+        start = time.perf_counter()
+        detector.screen(df, now=now)
+        seconds = time.perf_counter() - start
+
+        print(f'snapshot {snapshot}: {nb_records} prices in {seconds * 1000:8.1f} ms '
+              f'({nb_records / seconds / 1e6:5.1f} M prices/s), {len(detector.quarantine)} quarantined')
+
+    print(f'{nb_stations} stations, state of {detector.state.memory_usage(deep=True).sum() / 2 ** 20:.1f} MB')
+    print('injected    :', injected)
+    print('quarantined :', detector.quarantine['reason'].value_counts().to_dict())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_STATIONS)
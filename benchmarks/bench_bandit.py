@@ -0,0 +1,96 @@
+# ------------------------------------------------------------------------------
+# Description: This script compares the epsilon-greedy loops of app/app.py (one
+# object and one Python loop per epsilon) with the batched app/utils/bandit.py
+# Run it from the root of the project: python -m benchmarks.bench_bandit [steps]
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from app.utils.bandit import simulate
+from benchmarks.synthetic import generate_stations
+
+# Number of stations of the real dataset, epsilon values and runs per epsilon of the batched simulation
+NB_STATIONS = 11000
+EPSILONS = [0.1, 0.5, 1.0]
+RUNS = 10
+
+
+class LegacyEpsilonGreedy():
+    """
+    Epsilon Greedy as it was defined by app/app.py
+    """
+    def __init__(self, data, epsilon):
+        self.data = data
+        self.epsilon = epsilon
+        self.arm_count = len(data)
+        self.Q = np.zeros(self.arm_count)  # q-value of actions
+        self.N = np.zeros(self.arm_count)  # action count
+
+    def get_action(self):
+        if np.random.uniform(0, 1) > self.epsilon:
+            action = self.Q.argmax()
+        else:
+            action = np.random.randint(0, self.arm_count)
+        return action
+
+    def get_reward_regret(self, data):
+        reward = data['gazole_prix']  # reward is the price of the gazole
+        regret = self.data['gazole_prix'].max() - reward
+        return reward, regret
+
+    def _update_params(self, arm, reward):
+        self.N[arm] += 1  # increment action count
+        self.Q[arm] += 1 / self.N[arm] * (reward - self.Q[arm])  # inc. update rule
+
+
+def legacy_loops(data, steps):
+    """
+    Run one legacy object per epsilon, one step at a time
+    Args:
+        data (dataframe): Dataframe with the column 'gazole_prix'
+        steps (int): Number of steps per epsilon
+    Returns:
+        None
+    """
+    for epsilon in EPSILONS:
+        agent = LegacyEpsilonGreedy(data, epsilon)
+        for i in range(steps):
+            action = agent.get_action()
+            reward, regret = agent.get_reward_regret(data.iloc[i % len(data)])
+            agent._update_params(action, reward)
+
+
+def main(steps=1000):
+    """
+    Run the benchmark and print the times
+    Args:
+        steps (int): Number of steps per epsilon
+    Returns:
+        None
+    """
+    data = pd.DataFrame({'gazole_prix': generate_stations(NB_STATIONS)['gazole_prix']})
+    rewards = data['gazole_prix'].to_numpy()
+
+    start = time.perf_counter()
+    legacy_loops(data, steps)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    simulate(rewards, EPSILONS, steps=steps, runs=RUNS, noise=0.05)
+    batched = time.perf_counter() - start
+
+    legacy_step = legacy / (steps * len(EPSILONS))
+    batched_step = batched / (steps * len(EPSILONS) * RUNS)
+
+    print(f'{NB_STATIONS} arms, {steps} steps, epsilons {EPSILONS}')
+    print(f'{f"legacy loops ({len(EPSILONS)} runs)":<25} : {legacy * 1000:10.1f} ms ({legacy_step * 1e6:8.2f} us per run-step)')
+    print(f'{f"batched ({len(EPSILONS) * RUNS} runs)":<25} : {batched * 1000:10.1f} ms ({batched_step * 1e6:8.2f} us per run-step)')
+    print(f'{"speedup per run-step":<25} : {legacy_step / batched_step:10.1f} x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
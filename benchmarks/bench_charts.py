@@ -0,0 +1,78 @@
+# ------------------------------------------------------------------------------
+# Description: This script compares the display of the charts of the pages rebuilt
+# at each rerun with their display from the cache of the Vega-Lite specs of
+# app/utils/charts.py (the elements are built without a running dashboard)
+# Run it from the root of the project: python -m benchmarks.bench_charts [nb_stations]
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import sys
+import time
+import logging
+import tempfile
+import streamlit as st
+
+from app.utils.store import build_snapshot, load_snapshot
+from app.utils.aggregates import build_cube
+from app.utils.history import snapshot_to_records
+from app.utils.charts import ChartCache, stations_per_fuel_chart, per_region_chart, price_evolution_chart
+from benchmarks.synthetic import generate_stations, write_csv
+
+# Number of stations of the benchmark, and number of reruns of each chart
+NB_STATIONS = 100000
+REPEAT = 20
+
+
+def measure(function, repeat=REPEAT):
+    """
+    Return the mean time of a function
+    Args:
+        function (function): Function without arguments
+        repeat (int): Number of runs
+    Returns:
+        seconds (float): Mean time of a run
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(nb_stations=NB_STATIONS):
+    """
+    Run the benchmark and print the times
+    Args:
+        nb_stations (int): Number of synthetic stations
+    Returns:
+        None
+    """
+    # Without a running dashboard, Streamlit warns at each element
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'data.csv')
+        write_csv(generate_stations(nb_stations), csv_path)
+        df = load_snapshot(build_snapshot(csv_path, os.path.join(tmp_dir, 'data.arrow')))
+
+    cube = build_cube(df)
+    evolution = snapshot_to_records(df[['id', 'gazole_maj', 'gazole_prix']], df['id'].to_numpy())
+    evolution = evolution.rename(columns={'maj': 'gazole_maj', 'prix': 'gazole_prix'})[['gazole_maj', 'gazole_prix']]
+
+    charts = {
+        'stations_per_fuel': lambda: stations_per_fuel_chart(cube),
+        'price_per_region': lambda: per_region_chart(cube, 'mean', 'Average price'),
+        'price_evolution': lambda: price_evolution_chart(evolution, 'gazole'),
+    }
+
+    print(f'{nb_stations} stations ({len(evolution)} prices in the evolution chart)')
+    cache = ChartCache()
+    for name, build in charts.items():
+        rebuilt = measure(lambda: st.altair_chart(build(), use_container_width=True))
+        miss = measure(lambda: (cache.clear(), st.vega_lite_chart(cache.get(name, (), 'snapshot', build), use_container_width=True)))
+        hit = measure(lambda: st.vega_lite_chart(cache.get(name, (), 'snapshot', build), use_container_width=True))
+        print(f'{name:<18} rebuilt {rebuilt * 1000:8.2f} ms   miss {miss * 1000:8.2f} ms   hit {hit * 1000:8.2f} ms (x{rebuilt / hit:.0f})')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_STATIONS)
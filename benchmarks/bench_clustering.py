@@ -0,0 +1,76 @@
+# ------------------------------------------------------------------------------
+# Description: This script compares the full-batch K-Means of the stations (missing
+# prices replaced by 0) with the masked mini-batch K-Means of app/utils/clustering.py,
+# fitted from scratch and from the centroids of the previous snapshot
+# Run it from the root of the project: python -m benchmarks.bench_clustering [nb_stations]
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+from app.utils.clustering import CLUSTER_FEATURES
+from app.utils.models import train_clusters
+from benchmarks.synthetic import generate_stations
+
+# Number of stations of the benchmark, and number of clusters
+NB_STATIONS = 1000000
+K = 6
+
+
+def next_snapshot(df, seed=1):
+    """
+    Generate the next snapshot of the stations, about half of the prices changing by a few cents
+    Args:
+        df (dataframe): Stations with the columns of CLUSTER_FEATURES
+        seed (int): Seed of the random generator
+    Returns:
+        df (dataframe): Stations of the next snapshot
+    """
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    for column in CLUSTER_FEATURES[2:]:
+        updated = rng.random(len(df)) < 0.5
+        df[column] = np.where(updated, df[column] + rng.normal(0, 0.01, len(df)), df[column]).round(3)
+    return df
+
+
+def main(nb_stations=NB_STATIONS):
+    """
+    Run the benchmark and print the times
+    Args:
+        nb_stations (int): Number of synthetic stations
+    Returns:
+        None
+    """
+    df = generate_stations(nb_stations)[CLUSTER_FEATURES]
+    print(f'{nb_stations} stations, k={K}')
+
+    start = time.perf_counter()
+    KMeans(n_clusters=K, random_state=0).fit_predict(StandardScaler().fit_transform(df.astype('float64').fillna(0)))
+    full = time.perf_counter() - start
+    print(f'full-batch K-Means, prices filled with 0 : {full:8.2f} s')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state_path = os.path.join(tmp_dir, f'clusters-{K}.npz')
+
+        start = time.perf_counter()
+        cold = train_clusters(df, K, state_path)
+        seconds = time.perf_counter() - start
+        print(f'masked mini-batch, from scratch         : {seconds:8.2f} s (inertia {cold["inertia"]:.3f}, x{full / seconds:.1f})')
+
+        df = next_snapshot(df)
+        start = time.perf_counter()
+        warm = train_clusters(df, K, state_path)
+        seconds = time.perf_counter() - start
+        print(f'masked mini-batch, next snapshot        : {seconds:8.2f} s (inertia {warm["inertia"]:.3f}, x{full / seconds:.1f}, '
+              f'{(warm["labels"] == cold["labels"]).mean():.1%} of the stations in the same cluster)')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_STATIONS)
@@ -0,0 +1,135 @@
+# ------------------------------------------------------------------------------
+# Description: This script compares the map pre-processing of app/app.py before
+# the enrichment stage (row-wise apply, chained replaces) with app/utils/enrich.py
+# Run it from the root of the project: python -m benchmarks.bench_enrich
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import sys
+import time
+import tempfile
+import pandas as pd
+from datetime import datetime
+
+from app.utils.store import build_snapshot, load_snapshot
+from app.utils.enrich import enrich
+from benchmarks.synthetic import generate_stations, generate_brands, write_csv
+
+# Number of stations of the real dataset, and factor applied for the benchmark
+NB_STATIONS = 11000
+FACTOR = 10
+
+
+def legacy_preprocessing(df_price, df_brand):
+    """
+    Map pre-processing as it was run by app/app.py on every rerun
+    Args:
+        df_price (dataframe): Dataframe read with pd.read_csv
+        df_brand (dataframe): Dataframe read from data/brand.csv
+    Returns:
+        df_price (dataframe): Dataframe formatted for the map
+    """
+    df_price['latitude'] /= 100000
+    df_price['longitude'] /= 100000
+
+    columns_to_format = ['gazole_maj', 'sp95_maj', 'sp98_maj', 'e10_maj', 'e85_maj', 'gplc_maj']
+
+    for column in columns_to_format:
+        df_price[column] = pd.to_datetime(df_price[column]).dt.strftime('%d/%m %H:%M')
+
+    df_price = df_price.fillna({
+        "gazole_prix": "Not available in station",
+        "gazole_maj": "",
+        "sp95_prix": "Not available in station",
+        "sp95_maj": "",
+        "sp98_prix": "Not available in station",
+        "sp98_maj": "",
+        "e10_prix": "Not available in station",
+        "e10_maj": "",
+        "e85_prix": "Not available in station",
+        "e85_maj": "",
+        "gplc_prix": "Not available in station",
+        "gplc_maj": "",
+    })
+
+    for column in columns_to_format:
+        df_price[column] = df_price[column].astype(str)
+        df_price[column] = df_price[column].apply(lambda x: "{:%d/%m at %H:%M}".format(datetime.strptime(x, '%d/%m %H:%M')) if x else '')
+        df_price[column] = df_price[column].replace('', 'No Update')
+
+    df_price['brand'] = df_brand['brand']
+    df_price['brand'] = df_price['brand'].replace('Marque inconnue', 'No Brand')
+
+    df_price['brand_logo'] = df_price['brand']
+    df_price['brand_logo'] = df_price['brand_logo'].str.replace(' ', '')
+    df_price['brand_logo'] = df_price['brand_logo'].str.replace('à', 'a')
+    df_price['brand_logo'] = df_price['brand_logo'].str.replace('é', 'e')
+    df_price['brand_logo'] = df_price['brand_logo'].str.replace('è', 'e')
+    df_price['brand_logo'] = df_price['brand_logo'].str.lower()
+
+    df_price['brand_logo'] = df_price['brand_logo'].replace('nobrand', 'autre')
+    df_price['brand_logo'] = df_price['brand_logo'].replace('totalenergies', 'total')
+    df_price['brand_logo'] = df_price['brand_logo'].replace('totalenergiesaccess', 'totalaccess')
+    df_price['brand_logo'] = df_price['brand_logo'].replace('marqueinconnue', 'autre')
+    df_price['brand_logo'] = df_price['brand_logo'].replace('supermarchesspar', 'spar')
+    df_price['brand_logo'] = df_price['brand_logo'].replace('supercasino', 'supermarchecasino')
+    df_price['brand_logo'] = df_price['brand_logo'].replace('intermarchecontact', 'intermarche')
+    df_price['brand_logo'] = df_price['brand_logo'].replace('e.leclerc', 'eleclerc')
+
+    df_price['Autoroute'] = df_price['pop'].apply(lambda x: 'Yes' if x == 'A' else 'No')
+
+    return df_price
+
+
+def best_time(function, repeat=3):
+    """
+    Run a function several times and keep the best time
+    Args:
+        function (function): Function without argument
+        repeat (int): Number of runs
+    Returns:
+        seconds (float): Best time in seconds
+        result: Result of the last run
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(nb_stations=NB_STATIONS * FACTOR):
+    """
+    Run the benchmark and print the times
+    Args:
+        nb_stations (int): Number of synthetic stations
+    Returns:
+        None
+    """
+    df_brand = generate_brands(nb_stations)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'data.csv')
+        write_csv(generate_stations(nb_stations), csv_path)
+        snapshot_path = build_snapshot(csv_path, os.path.join(tmp_dir, 'data.arrow'))
+
+        df_csv = pd.read_csv(csv_path, sep=';')
+        df_snapshot = load_snapshot(snapshot_path)
+
+        legacy, df_legacy = best_time(lambda: legacy_preprocessing(df_csv.copy(), df_brand))
+        vectorized, df_map = best_time(lambda: enrich(df_snapshot, df_brand['brand']))
+
+    # Both stages must produce the same columns for the map
+    for column in ['gazole_maj', 'e85_maj', 'gazole_prix', 'brand', 'brand_logo', 'Autoroute']:
+        assert (df_legacy[column].astype(str).to_numpy() == df_map[column].astype(str).to_numpy()).all(), column
+
+    print(f'{nb_stations} stations')
+    print(f'legacy pre-processing     : {legacy * 1000:10.1f} ms')
+    print(f'vectorized enrichment     : {vectorized * 1000:10.1f} ms')
+    print(f'speedup                   : {legacy / vectorized:10.1f} x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_STATIONS * FACTOR)
@@ -0,0 +1,107 @@
+# ------------------------------------------------------------------------------
+# Description: This script measures the startup of the dashboard: for each page,
+# a fresh interpreter imports and renders the Home page, then opens the page
+# (first render of the page, its imports included)
+# Run it from the root of the project: python -m benchmarks.bench_startup [nb_stations]
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+
+# Root of the project and script of the dashboard
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'app', 'app.py')
+
+# Heavy modules reported as loaded or not after each render
+HEAVY_MODULES = ['altair', 'matplotlib', 'sklearn', 'pydeck']
+
+
+def loaded_modules():
+    """
+    List the heavy modules imported by the process
+    Args:
+        None
+    Returns:
+        modules (list): Names of the loaded modules of HEAVY_MODULES
+    """
+    return [module for module in HEAVY_MODULES if module in sys.modules]
+
+
+def measure(page, data_root):
+    """
+    Render the Home page then a page in a fresh interpreter
+    Args:
+        page (str): Title of the page
+        data_root (str): Directory containing data/ and image/, used as working directory
+    Returns:
+        result (dict): Times of the import of streamlit, of the Home render and of the page render, loaded modules
+    """
+    os.chdir(data_root)
+
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    import_time = time.perf_counter() - start
+
+    app = AppTest.from_file(APP_PATH, default_timeout=600)
+    start = time.perf_counter()
+    app.run()
+    home_time = time.perf_counter() - start
+    home_modules = loaded_modules()
+
+    start = time.perf_counter()
+    app.sidebar.selectbox[0].set_value(page).run()
+    page_time = time.perf_counter() - start
+
+    return {
+        'page': page,
+        'import': import_time,
+        'home': home_time,
+        'render': page_time,
+        'home_modules': home_modules,
+        'page_modules': loaded_modules(),
+        'exception': [exception.value[:80] for exception in app.exception][:1],
+    }
+
+
+def main(nb_stations=11000):
+    """
+    Run the benchmark and print the times
+    Args:
+        nb_stations (int): Number of synthetic stations
+    Returns:
+        None
+    """
+    # Imported here so that the interpreters measuring the pages do not load the app package (and pydeck) beforehand
+    from app.utils.store import CSV_NAME
+    from app.utils.brands import BRAND_CSV_NAME
+    from app.views import PAGES
+    from benchmarks.synthetic import generate_stations, generate_brands, write_csv
+
+    context = multiprocessing.get_context('spawn')
+
+    with tempfile.TemporaryDirectory() as data_root:
+        os.makedirs(os.path.join(data_root, 'data'))
+        os.symlink(os.path.join(ROOT, 'image'), os.path.join(data_root, 'image'))
+        write_csv(generate_stations(nb_stations), os.path.join(data_root, 'data', CSV_NAME))
+        generate_brands(nb_stations).to_csv(os.path.join(data_root, 'data', BRAND_CSV_NAME), index=False)
+
+        print(f'{nb_stations} stations')
+        print(f'{"page":<40} {"streamlit":>10} {"home":>10} {"first render":>13}  modules loaded by the page')
+        for page in PAGES:
+            with context.Pool(1) as pool:
+                result = pool.apply(measure, (page, data_root))
+            modules = ', '.join(module for module in result['page_modules'] if module not in result['home_modules']) or '-'
+            print(
+                f'{page:<40} {result["import"] * 1000:8.0f}ms {result["home"] * 1000:8.0f}ms {result["render"] * 1000:11.0f}ms'
+                f'  {modules}{"  (exception: " + result["exception"][0] + ")" if result["exception"] else ""}'
+            )
+
+        print(f'modules loaded by Home: {", ".join(result["home_modules"]) or "-"}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 11000)
@@ -0,0 +1,92 @@
+# ------------------------------------------------------------------------------
+# Description: This script compares the price-evolution chart sending every price
+# record on a month-name axis with the bucketed and downsampled series of
+# app/utils/timeseries.py (time to build the spec and size of its data)
+# Run it from the root of the project: python -m benchmarks.bench_timeseries [nb_records]
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import sys
+import time
+import numpy as np
+import pandas as pd
+import altair as alt
+
+from app.utils.charts import chart_spec, price_evolution_chart
+from app.utils.timeseries import AUTO, BUCKETS
+
+# Number of price records of the benchmark, and number of days they cover
+NB_RECORDS = 1000000
+NB_DAYS = 730
+
+
+def generate_history(nb_records, nb_days=NB_DAYS, seed=0):
+    """
+    Generate the price records of a fuel, a daily random walk plus the noise of the stations
+    Args:
+        nb_records (int): Number of records
+        nb_days (int): Number of days covered by the records
+        seed (int): Seed of the generator
+    Returns:
+        df_evolution (dataframe): Dataframe with the columns 'gazole_maj' (UTC datetime) and 'gazole_prix', sorted by date
+    """
+    rng = np.random.default_rng(seed)
+    seconds = np.sort(rng.integers(0, nb_days * 86400, nb_records))
+    trend = 1.8 + np.cumsum(rng.normal(0, 0.01, nb_days))
+    return pd.DataFrame({
+        'gazole_maj': pd.Timestamp('2023-01-01', tz='UTC') + pd.to_timedelta(seconds, unit='s'),
+        'gazole_prix': (trend[seconds // 86400] + rng.normal(0, 0.05, nb_records)).astype('float32'),
+    })
+
+
+def month_chart(df_evolution):
+    """
+    Build the chart as the pages did before the time series: every record on a month-name axis
+    Args:
+        df_evolution (dataframe): Dataframe with the columns 'gazole_maj' and 'gazole_prix'
+    Returns:
+        chart (Chart): Line chart of the prices
+    """
+    df_evolution = df_evolution.assign(gazole_maj=df_evolution['gazole_maj'].dt.strftime('%B'))
+    return alt.Chart(df_evolution).mark_line().encode(x='gazole_maj:N', y='gazole_prix:Q')
+
+
+def measure(build):
+    """
+    Build and serialize a chart
+    Args:
+        build (function): Function without arguments returning the chart
+    Returns:
+        seconds (float): Time of the build and of the serialization
+        nb_rows (int): Number of rows sent to the browser
+        size (int): Size of the data of the spec in bytes
+    """
+    start = time.perf_counter()
+    chart = build()
+    spec = chart_spec(chart)
+    seconds = time.perf_counter() - start
+    return seconds, len(chart.data), sum(len(data) for data in spec['datasets'].values())
+
+
+def main(nb_records=NB_RECORDS):
+    """
+    Run the benchmark and print the times
+    Args:
+        nb_records (int): Number of synthetic price records
+    Returns:
+        None
+    """
+    df_evolution = generate_history(nb_records)
+    print(f'{nb_records} price records over {NB_DAYS} days')
+
+    charts = {'month names (all rows)': lambda: month_chart(df_evolution)}
+    for bucket in [AUTO] + list(BUCKETS):
+        charts[bucket.lower()] = lambda bucket=bucket: price_evolution_chart(df_evolution, 'gazole', bucket)
+
+    for name, build in charts.items():
+        seconds, nb_rows, size = measure(build)
+        print(f'{name:<24} {seconds * 1000:9.1f} ms   {nb_rows:>8} points   {size / 2 ** 10:10.1f} KB')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_RECORDS)
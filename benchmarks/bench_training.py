@@ -0,0 +1,72 @@
+# ------------------------------------------------------------------------------
+# Description: This script compares the training of the regressions one fuel (and
+# one region) at a time with the process pool of app/utils/training.py, for an
+# increasing number of worker processes
+# Run it from the root of the project: python -m benchmarks.bench_training [nb_stations]
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import sys
+import time
+import tempfile
+
+from app.utils.store import FUELS, build_snapshot, load_snapshot
+from app.utils.models import train_regression
+from app.utils.training import train_all
+from benchmarks.synthetic import generate_stations, write_csv
+
+# Number of stations of the benchmark
+NB_STATIONS = 1000000
+
+
+def serial_training(df):
+    """
+    Train the regression of each fuel, then of each fuel in each region, one at a time
+    Args:
+        df (dataframe): Snapshot
+    Returns:
+        nb_models (int): Number of models trained
+    """
+    nb_models = 0
+    for fuel in FUELS:
+        train_regression(df, fuel)
+        nb_models += 1
+        for _, df_region in df.groupby('region', observed=True):
+            train_regression(df_region, fuel)
+            nb_models += 1
+    return nb_models
+
+
+def main(nb_stations=NB_STATIONS):
+    """
+    Run the benchmark and print the times
+    Args:
+        nb_stations (int): Number of synthetic stations
+    Returns:
+        None
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'data.csv')
+        write_csv(generate_stations(nb_stations), csv_path)
+        df = load_snapshot(build_snapshot(csv_path, os.path.join(tmp_dir, 'data.arrow')))
+
+    print(f'{nb_stations} stations, {os.cpu_count()} cores')
+
+    start = time.perf_counter()
+    nb_models = serial_training(df)
+    serial = time.perf_counter() - start
+    print(f'one model at a time        : {serial:8.2f} s ({nb_models} models)')
+
+    workers = 1
+    while workers <= os.cpu_count():
+        start = time.perf_counter()
+        comparison, _ = train_all(df, per_region=True, max_workers=workers)
+        parallel = time.perf_counter() - start
+        print(f'process pool, {workers:2d} workers   : {parallel:8.2f} s ({len(comparison)} models, '
+              f'{comparison["seconds"].sum():.2f} s of fits, speedup x{serial / parallel:.1f})')
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_STATIONS)
@@ -0,0 +1,250 @@
+# ------------------------------------------------------------------------------
+# Description: This script runs the benchmark suite of the data pipeline and of the
+# page computations at several sizes, and saves the times and peak memories in a
+# JSON file to compare two commits
+# Run it from the root of the project: python -m benchmarks.run [--sizes 10000 100000 1000000]
+# [--output results.json] [--compare previous.json]
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import argparse
+import subprocess
+import tracemalloc
+import pandas as pd
+
+from app.utils.store import PRICE_COLUMNS, DATE_COLUMNS, build_snapshot, load_snapshot
+from app.utils.aggregates import build_cube, rollup, pivot
+from app.utils.stations import build_stations, degrees
+from app.utils.filters import FilterIndex
+from app.utils.map import generate_map
+from app.utils.spatial import SpatialIndex
+from app.utils.anomalies import AnomalyDetector
+from app.utils.models import train_regression, train_clusters
+from benchmarks.synthetic import generate_stations, generate_brands, write_csv
+
+# Root of the project
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Numbers of stations of the suite (the real dataset has about 11000 stations)
+SIZES = [10000, 100000, 1000000]
+
+# Number of timed runs of each stage, the best one being kept
+REPEAT = 3
+
+# A stage is reported as a regression when it is this much slower than in the compared file
+REGRESSION_RATIO = 1.2
+
+
+def stages(csv_path, tmp_dir, brand):
+    """
+    List the stages of the suite, each one building on the data of the previous ones
+    Args:
+        csv_path (str): Path of the synthetic CSV
+        tmp_dir (str): Directory of the files written by the stages
+        brand (series): Brand of each station
+    Returns:
+        stages (list): (name, function) of each stage, the function taking and returning the shared data
+    """
+    snapshot_path = os.path.join(tmp_dir, 'data.arrow')
+
+    def csv_to_snapshot(data):
+        data['snapshot_path'] = build_snapshot(csv_path, snapshot_path)
+        return data
+
+    def load_data_df(data):
+        data['df'] = load_snapshot(data['snapshot_path'])
+        return data
+
+    def anomalies(data):
+        # The snapshot is screened at the time of its most recent update, so that the synthetic dates are not all stale
+        now = max(data['df'][column].max() for column in DATE_COLUMNS)
+        AnomalyDetector().screen(data['df'][['id'] + PRICE_COLUMNS + DATE_COLUMNS], now=now)
+        return data
+
+    def summary(data):
+        data['cube'] = build_cube(data['df'])
+        rollup(data['cube'])
+        rollup(data['cube'], 'region')
+        pivot(data['cube'], 'region', 'mean')
+        return data
+
+    def map_preprocessing(data):
+        data['stations'] = build_stations(data['df'], brand)
+        data['filter_index'] = FilterIndex(data['stations'])
+        data['filter_index'].select(['gazole', 'e10'], 'region', 'Bretagne')
+        data['spatial_index'] = SpatialIndex(degrees(data['stations']['latitude']), degrees(data['stations']['longitude']))
+        return data
+
+    def map_clusters(data):
+        generate_map(data['stations'], zoom=4).to_json()
+        return data
+
+    def map_viewport(data):
+        generate_map(data['stations'], zoom=11, index=data['spatial_index']).to_json()
+        return data
+
+    def regression(data):
+        train_regression(data['df'], 'gazole')
+        return data
+
+    def clusters(data):
+        train_clusters(data['df'])
+        return data
+
+    return [
+        ('csv_to_snapshot', csv_to_snapshot),
+        ('load_data_df', load_data_df),
+        ('anomalies', anomalies),
+        ('summary', summary),
+        ('map_preprocessing', map_preprocessing),
+        ('map_clusters', map_clusters),
+        ('map_viewport', map_viewport),
+        ('train_regression', regression),
+        ('train_clusters', clusters),
+    ]
+
+
+def measure(function, data, repeat=REPEAT):
+    """
+    Time a stage and measure its peak memory
+    Args:
+        function (function): Stage taking and returning the shared data
+        data (dict): Shared data
+        repeat (int): Number of timed runs
+    Returns:
+        data (dict): Shared data returned by the stage
+        seconds (float): Best time of the runs
+        peak_mb (float): Peak of the memory allocated by the stage in MB, measured in a separate run
+            (tracemalloc sees the Python and NumPy allocations, not the Arrow buffers)
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = function(data)
+        best = min(best, time.perf_counter() - start)
+
+    # The memory is traced in its own run, tracing slowing down the allocations
+    tracemalloc.start()
+    try:
+        data = function(data)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return data, best, peak / 2 ** 20
+
+
+def run_size(nb_stations, repeat=REPEAT):
+    """
+    Run every stage on synthetic stations
+    Args:
+        nb_stations (int): Number of synthetic stations
+        repeat (int): Number of timed runs of each stage
+    Returns:
+        results (list): One dict per stage with the keys 'stage', 'stations', 'seconds' and 'peak_mb'
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'data.csv')
+        write_csv(generate_stations(nb_stations), csv_path)
+        brand = generate_brands(nb_stations)['brand']
+
+        data = {}
+        for stage, function in stages(csv_path, tmp_dir, brand):
+            data, seconds, peak_mb = measure(function, data, repeat)
+            results.append({'stage': stage, 'stations': nb_stations, 'seconds': seconds, 'peak_mb': peak_mb})
+            print(f'{stage:<20} {nb_stations:>9} {seconds * 1000:12.1f} ms {peak_mb:10.1f} MB', flush=True)
+
+    return results
+
+
+def git_commit():
+    """
+    Return the commit of the working tree
+    Args:
+        None
+    Returns:
+        commit (str): Short hash of HEAD, with '-dirty' if the tree has changes ('unknown' outside of git)
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if dirty.strip() else '')
+
+
+def compare(results, previous):
+    """
+    Print the ratio of the times of each stage to those of a previous run
+    Args:
+        results (list): Results of this run
+        previous (dict): Content of the JSON file of a previous run
+    Returns:
+        regressions (int): Number of stages slower than REGRESSION_RATIO times the previous run
+    """
+    before = {(result['stage'], result['stations']): result for result in previous['results']}
+
+    print(f'\ncompared with {previous["commit"]} ({previous["date"]})')
+    regressions = 0
+    for result in results:
+        old = before.get((result['stage'], result['stations']))
+        if old is None:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        regression = ratio > REGRESSION_RATIO
+        regressions += regression
+        print(f'{result["stage"]:<20} {result["stations"]:>9} {old["seconds"] * 1000:10.1f} ms -> {result["seconds"] * 1000:10.1f} ms'
+              f' x{ratio:5.2f}  {old["peak_mb"]:8.1f} MB -> {result["peak_mb"]:8.1f} MB{"  REGRESSION" if regression else ""}')
+    return regressions
+
+
+def main(argv=None):
+    """
+    Run the suite, save the results and compare them with a previous run
+    Args:
+        argv (list): Command line arguments (sys.argv[1:] if None)
+    Returns:
+        status (int): 1 if a stage regressed against the compared file, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(description='Benchmark suite of the data pipeline and of the page computations')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='Numbers of synthetic stations')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='Number of timed runs of each stage')
+    parser.add_argument('--output', help='JSON file of the results (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='JSON file of a previous run to compare with')
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    print(f'{"stage":<20} {"stations":>9} {"best time":>15} {"peak memory":>13}')
+    results = []
+    for nb_stations in args.sizes:
+        results += run_size(nb_stations, args.repeat)
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump({
+            'commit': commit,
+            'date': pd.Timestamp.now(tz='UTC').isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+            'results': results,
+        }, file, indent=2)
+    print(f'\nresults saved in {output}')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            return int(compare(results, json.load(file)) > 0)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
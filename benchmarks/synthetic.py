@@ -0,0 +1,106 @@
+# ------------------------------------------------------------------------------
+# Description: This file generates synthetic station data with the schema of
+# prix-des-carburants-en-france-flux-instantane-v2.csv for the benchmarks
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import numpy as np
+import pandas as pd
+
+# Fuels with their label in 'carburants_disponibles', share of stations selling them and mean price
+FUELS = {
+    'gazole': ('Gazole', 0.95, 1.85),
+    'sp95': ('SP95', 0.55, 1.90),
+    'e85': ('E85', 0.30, 1.05),
+    'gplc': ('GPLc', 0.10, 1.00),
+    'e10': ('E10', 0.80, 1.88),
+    'sp98': ('SP98', 0.75, 1.97),
+}
+
+# Regions with a few departements and cities each
+LOCATIONS = {
+    'Île-de-France': {'Paris': ['Paris', 'PARIS'], 'Essonne': ['Évry-Courcouronnes', 'Massy']},
+    'Auvergne-Rhône-Alpes': {'Rhône': ['Lyon', 'Villeurbanne'], 'Loire': ['Saint-Étienne', 'St-Etienne']},
+    'Bretagne': {'Ille-et-Vilaine': ['Rennes', 'Saint-Malo'], 'Finistère': ['Brest', 'Quimper']},
+    'Corse': {'Corse-du-Sud': ['Ajaccio'], 'Haute-Corse': ['Bastia']},
+    'Occitanie': {'Haute-Garonne': ['Toulouse'], 'Hérault': ['Montpellier', 'Sète']},
+    'Normandie': {'Calvados': ['Caen'], 'Seine-Maritime': ['Rouen', 'Le Havre']},
+}
+
+# Brands of the stations (data/brand.csv)
+BRANDS = ['TotalEnergies', 'TotalEnergies Access', 'Carrefour Market', 'Intermarché', 'E.Leclerc', 'Avia', 'Marque inconnue', 'Système U']
+
+
+def generate_stations(n, seed=0):
+    """
+    Generate stations with the columns of the CSV, as read by pd.read_csv
+    Args:
+        n (int): Number of stations
+        seed (int): Seed of the random generator
+    Returns:
+        df (dataframe): Dataframe with one row per station
+    """
+    rng = np.random.default_rng(seed)
+
+    cities = [(region, departement, ville)
+              for region, departements in LOCATIONS.items()
+              for departement, villes in departements.items()
+              for ville in villes]
+    location = rng.integers(0, len(cities), n)
+
+    df = pd.DataFrame({
+        'id': np.arange(1000000, 1000000 + n),
+        'latitude': (rng.uniform(42.3, 51.0, n) * 100000).round(),
+        'longitude': (rng.uniform(-4.8, 8.2, n) * 100000).round(),
+        'cp': rng.integers(1000, 95999, n),
+        'pop': rng.choice(['R', 'A'], n, p=[0.93, 0.07]),
+        'adresse': [f'{number} route nationale' for number in rng.integers(1, 300, n)],
+        'ville': [cities[i][2] for i in location],
+        'horaires': '{"@automate-24-24": "1"}',
+        'services': '{"service": ["Station de gonflage", "Boutique alimentaire"]}',
+    })
+
+    # Price and update date of each fuel, missing when the station does not sell it
+    available = {}
+    start = pd.Timestamp('2023-01-01', tz='UTC').value // 10 ** 9
+    for fuel, (label, share, price) in FUELS.items():
+        available[fuel] = rng.random(n) < share
+        updated = pd.to_datetime(rng.integers(start, start + 300 * 86400, n), unit='s', utc=True)
+        df[f'{fuel}_maj'] = np.where(available[fuel], updated.strftime('%Y-%m-%dT%H:%M:%S+00:00'), None)
+        df[f'{fuel}_prix'] = np.where(available[fuel], rng.normal(price, 0.08, n).round(3), np.nan)
+
+    labels = np.array([label for label, _, _ in FUELS.values()])
+    matrix = np.column_stack(list(available.values()))
+    df['carburants_disponibles'] = [','.join(labels[row]) or None for row in matrix]
+    df['carburants_indisponibles'] = [','.join(labels[~row]) or None for row in matrix]
+    df['departement'] = [cities[i][1] for i in location]
+    df['code_departement'] = rng.integers(1, 96, n).astype(str)
+    df['region'] = [cities[i][0] for i in location]
+    df['code_region'] = rng.integers(11, 95, n)
+
+    return df
+
+
+def generate_brands(n, seed=0):
+    """
+    Generate the brand of each station of generate_stations, as in a data/brand.csv keyed by station id
+    Args:
+        n (int): Number of stations
+        seed (int): Seed of the random generator
+    Returns:
+        df_brand (dataframe): Dataframe with the columns 'id' and 'brand'
+    """
+    rng = np.random.default_rng(seed + 1)
+    return pd.DataFrame({'id': np.arange(1000000, 1000000 + n), 'brand': rng.choice(BRANDS, n)})
+
+
+def write_csv(df, path):
+    """
+    Write the stations as the semicolon-separated CSV of the dataset
+    Args:
+        df (dataframe): Dataframe returned by generate_stations
+        path (str): Path of the CSV
+    Returns:
+        None
+    """
+    df.to_csv(path, sep=';', index=False)
@@ -1,20 +1,47 @@
 # ------------------------------------------------------------------------------
 # Description : This script gets the data from the API and saves it locally.
+# Run it from the root of the project: python get_data.py [--brands]
 # ------------------------------------------------------------------------------
 
 # Import libraries
+import argparse
 import requests
 
+from app.utils.fetcher import DATA_URL
+from app.utils.scheduler import refresh_data
+from app.utils.anomalies import load_quarantine
+from app.utils.brands import MAX_BRAND_REQUESTS
+
+parser = argparse.ArgumentParser(description='Download the prices of the fuels in France')
+parser.add_argument('--brands', action='store_true',
+                    help=f'Also fetch the brand of up to {MAX_BRAND_REQUESTS} new stations from the station API (api.prix-carburants.2aaz.fr)')
+args = parser.parse_args()
+
 # Define the url and the name of the file
-url = "https://data.economie.gouv.fr/api/explore/v2.1/catalog/datasets/prix-des-carburants-en-france-flux-instantane-v2/exports/csv"
+url = DATA_URL
 nom_fichier_local = f"prix-des-carburants-en-france-flux-instantane-v2.csv"
 
-response = requests.get(url)
-
-# Check if the request was successful, and if so, write the file and if not, print the error code
-if response.status_code == 200:
-    with open("data/"+ nom_fichier_local, 'wb') as file:
-        file.write(response.content)
-        print(f"Le fichier a été téléchargé avec succès sous le nom : {nom_fichier_local}")
+# Download the file only if it changed since the last download, then rebuild the snapshot, append the new prices
+# to the history and, with --brands, fetch the brands of the new stations (the dashboard does the same in background,
+# see app/utils/scheduler.py)
+try:
+    changes, nb_records, nb_brands = refresh_data("data", url, fetch_brands=args.brands)
+except requests.RequestException as error:
+    print("Échec du téléchargement :", error)
 else:
-    print("Échec du téléchargement. Code de statut :", response.status_code)
\ No newline at end of file
+    if changes is None:
+        print(f"Le fichier {nom_fichier_local} est déjà à jour")
+    else:
+        print(f"Le fichier a été téléchargé avec succès sous le nom : {nom_fichier_local}")
+        print(f"Nombre de stations modifiées : {len(changes)}")
+
+        # Prices left out of the snapshot by the validation, and stale prices kept in it
+        quarantine = load_quarantine("data")
+        print(f"Nombre de prix en quarantaine ou signalés : {len(quarantine)}")
+        for reason, count in quarantine['reason'].value_counts().items():
+            print(f"  - {reason} : {count}")
+
+        print(f"Nombre de prix ajoutés à l'historique : {nb_records}")
+
+    if args.brands:
+        print(f"Nombre de marques de stations récupérées : {nb_brands}")
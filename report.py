@@ -0,0 +1,49 @@
+# ------------------------------------------------------------------------------
+# Description : This script renders the views of the dashboard to static files
+# (HTML charts and their Vega-Lite specs, CSV tables, PNG images) without Streamlit.
+# Run it from the root of the project: python report.py [--output report] [--cities Paris Lyon]
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import sys
+import time
+import argparse
+
+from app.utils.store import ensure_snapshot, snapshot_hash
+from app.utils.report import build_report
+
+
+def main(argv=None):
+    """
+    Render the report of the current snapshot
+    Args:
+        argv (list): Command line arguments (sys.argv[1:] if None)
+    Returns:
+        status (int): 0
+    """
+    parser = argparse.ArgumentParser(description='Static report of the price of fuels in France')
+    parser.add_argument('--data', default='data', help='Data directory (snapshot, cube, brands, models)')
+    parser.add_argument('--output', default='report', help='Directory of the report')
+    parser.add_argument('--cities', nargs='*', default=[], help='Cities with their own chart of the average price per fuel')
+    parser.add_argument('--clusters', type=int, default=6, help='Number of clusters of the stations')
+    parser.add_argument('--workers', type=int, help='Number of processes rendering the views (number of cores by default)')
+    args = parser.parse_args(argv)
+    if args.clusters < 2:
+        parser.error('--clusters must be at least 2')
+
+    start = time.perf_counter()
+    snapshot_path = ensure_snapshot(args.data)
+    snapshot_id = snapshot_hash(snapshot_path)
+    try:
+        results = build_report(snapshot_path, snapshot_id, args.data, args.output, args.cities, args.clusters, args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+
+    for result in results.itertuples():
+        print(f'{result.view:<60} {result.seconds * 1000:8.1f} ms  {result.files}')
+    print(f'\nRapport généré dans {args.output}/index.html en {time.perf_counter() - start:.1f} s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# ------------------------------------------------------------------------------
+# Description: This file contains the fixtures shared by the tests: the root of
+# the project on the import path (app.utils, benchmarks), small synthetic CSV
+# exports with the schema of the real dataset and a local HTTP server standing in
+# for the download and the APIs
+# Run the tests from the root of the project: python -m pytest
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.store import CSV_NAME
+from benchmarks.synthetic import generate_stations, write_csv
+
+
+@pytest.fixture
+def stations():
+    """
+    Synthetic stations, as read by pd.read_csv
+    """
+    return generate_stations(200)
+
+
+@pytest.fixture
+def data_dir(tmp_path, stations):
+    """
+    Data directory holding the CSV export of the synthetic stations
+    """
+    write_csv(stations, os.path.join(tmp_path, CSV_NAME))
+    return str(tmp_path)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answer each GET with the route of its path: a function of the request headers returning
+    (status, headers, body), the body being cut after 'Content-Length' is sent if the headers say so
+    """
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        route = self.server.routes.get(self.path.split('?')[0])
+        status, headers, body = route(self.headers) if route is not None else (404, {}, b'')
+        self.send_response(status)
+        headers = dict(headers)
+        sent = headers.pop('X-Truncate', None)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body[:int(sent)] if sent is not None else body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """
+    Local HTTP server: set server.routes[path] to a function of the request headers returning
+    (status, headers, body), server.url is its address and server.requests lists the (path, headers) received
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.routes = {}
+    server.requests = []
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
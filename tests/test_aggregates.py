@@ -0,0 +1,45 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the cube of the prices per location and fuel
+# (app/utils/aggregates.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import pandas as pd
+
+from app.utils.aggregates import LEVELS, build_cube, update_cube
+from app.utils.fetcher import diff_snapshots
+from benchmarks.synthetic import generate_stations
+
+
+def sorted_cube(cube):
+    """
+    Sort the rows of a cube, whose order depends on how it was built
+    Args:
+        cube (dataframe): Cube returned by build_cube or update_cube
+    Returns:
+        cube (dataframe): Cube sorted by location and fuel
+    """
+    return cube.sort_values(LEVELS + ['fuel'], na_position='first').reset_index(drop=True)
+
+
+def test_update_cube_matches_a_full_build():
+    """Updating the cube with the changed stations gives the cube built from the whole new snapshot"""
+    previous = generate_stations(300, seed=0)
+
+    # Removed, updated, moved and added stations
+    current = previous.drop(index=range(0, 300, 7)).copy()
+    current.loc[current.index[:40:3], 'gazole_prix'] += 0.05
+    current.loc[current.index[1:40:5], 'e85_prix'] = None
+    moved = current.index[50]
+    current.loc[moved, LEVELS] = current.loc[current.index[60], LEVELS].to_numpy()
+    current.loc[moved, 'sp98_prix'] = 1.999
+    added = generate_stations(20, seed=1)
+    added['id'] += 10000000
+    current = pd.concat([current, added], ignore_index=True)
+
+    changes = diff_snapshots(previous, current)
+    assert set(changes['change']) == {'added', 'removed', 'updated'}
+
+    updated = sorted_cube(update_cube(build_cube(previous), previous, current, changes['id']))
+    built = sorted_cube(build_cube(current))
+    pd.testing.assert_frame_equal(updated, built, check_exact=False)
@@ -0,0 +1,89 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the quarantine of the suspicious prices
+# (app/utils/anomalies.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import numpy as np
+import pandas as pd
+
+from app.utils.anomalies import AnomalyDetector, load_quarantine, STATE_NAME, QUARANTINE_NAME
+
+# Reference time of the screens
+NOW = pd.Timestamp('2024-06-01 12:00', tz='UTC')
+
+
+def snapshot(prices, dates=None):
+    """
+    Build a snapshot of the gazole prices of a few stations
+    Args:
+        prices (list): Price of each station
+        dates (list): Update of each price (one hour before NOW if None)
+    Returns:
+        df (dataframe): Dataframe with the columns 'id', 'gazole_prix' and 'gazole_maj'
+    """
+    dates = dates if dates is not None else [NOW - pd.Timedelta(hours=1)] * len(prices)
+    return pd.DataFrame({
+        'id': np.arange(len(prices), dtype='int64'),
+        'gazole_prix': np.array(prices, dtype='float32'),
+        'gazole_maj': pd.to_datetime(dates, utc=True),
+    })
+
+
+def test_bounds_and_dates_are_quarantined_and_stale_prices_flagged():
+    """Absurd prices and future dates are removed from the snapshot, old dates are kept, all of them in the quarantine"""
+    prices = [1.8] * 20 + [0.0, 18.5, 1.8, 1.8]
+    dates = [NOW - pd.Timedelta(hours=1)] * 22 + [NOW - pd.Timedelta(days=400), NOW + pd.Timedelta(days=5)]
+    df = snapshot(prices, dates)
+
+    detector = AnomalyDetector()
+    screened = detector.screen(df, now=NOW)
+
+    assert screened['gazole_prix'].isna().to_numpy().nonzero()[0].tolist() == [20, 21, 23]
+    assert screened['gazole_prix'].iloc[22] == np.float32(1.8)
+    assert dict(zip(detector.quarantine['id'], detector.quarantine['reason'])) == {20: 'bounds', 21: 'bounds', 22: 'stale', 23: 'date'}
+    # The dataframe of the caller is not modified
+    assert df['gazole_prix'].notna().all()
+
+
+def test_outlier_among_the_stations():
+    """A price far from all the other stations is an outlier"""
+    prices = list(1.8 + np.linspace(-0.05, 0.05, 50)) + [3.9]
+    detector = AnomalyDetector()
+    screened = detector.screen(snapshot(prices), now=NOW)
+    assert detector.quarantine['reason'].tolist() == ['outlier']
+    assert np.isnan(screened['gazole_prix'].iloc[-1])
+
+
+def test_jump_waits_for_a_confirmation(tmp_path):
+    """A sudden jump of a station is quarantined until a later update confirms it, the statistics being saved"""
+    state_path = os.path.join(tmp_path, STATE_NAME)
+    prices = np.full(30, 1.8)
+    for hour in range(5):
+        detector = AnomalyDetector(state_path)
+        detector.screen(snapshot(prices + 0.01 * (hour % 2), [NOW - pd.Timedelta(hours=10 - hour)] * 30), now=NOW)
+        detector.save(os.path.join(tmp_path, QUARANTINE_NAME))
+    assert load_quarantine(str(tmp_path)).empty
+
+    jumped = prices.copy()
+    jumped[0] = 2.6
+    detector = AnomalyDetector(state_path)
+    screened = detector.screen(snapshot(jumped, [NOW - pd.Timedelta(hours=4)] * 30), now=NOW)
+    detector.save(os.path.join(tmp_path, QUARANTINE_NAME))
+    assert np.isnan(screened['gazole_prix'].iloc[0])
+    assert load_quarantine(str(tmp_path))['reason'].tolist() == ['jump']
+
+    detector = AnomalyDetector(state_path)
+    screened = detector.screen(snapshot(jumped, [NOW - pd.Timedelta(hours=3)] * 30), now=NOW)
+    assert screened['gazole_prix'].iloc[0] == np.float32(2.6)
+    assert detector.quarantine.empty
+
+
+def test_stale_fuel_keeps_its_stations():
+    """A fuel whose prices are all stale keeps all its stations in the snapshot"""
+    prices = list(1.8 + np.linspace(-0.05, 0.05, 30))
+    detector = AnomalyDetector()
+    screened = detector.screen(snapshot(prices, [NOW - pd.Timedelta(days=90)] * 30), now=NOW)
+    assert screened['gazole_prix'].notna().all()
+    assert (detector.quarantine['reason'] == 'stale').all() and len(detector.quarantine) == 30
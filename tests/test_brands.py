@@ -0,0 +1,106 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the brands keyed by station id (app/utils/brands.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.brands import BRAND_CSV_NAME, BRAND_TABLE_NAME, BRAND_RETRY_NAME, ensure_brand_table, station_brands, load_brand_table, join_brands, brand_counts, update_brand_table
+
+
+def test_positional_brand_csv_is_refused(tmp_path):
+    """A brand.csv without ids is never matched by position, even with one row per station"""
+    pd.DataFrame({'brand': ['Avia', 'Total']}).to_csv(os.path.join(tmp_path, BRAND_CSV_NAME), index=False)
+    with pytest.raises(ValueError, match='get_data.py'):
+        ensure_brand_table(str(tmp_path))
+    assert not os.path.exists(os.path.join(tmp_path, BRAND_TABLE_NAME))
+
+
+def test_legacy_brand_csv_is_matched_by_position_until_the_table_exists(tmp_path):
+    """Without id-keyed table, the bundled brand.csv gives the brands by position, the table taking over once fetched"""
+    pd.DataFrame({'brand': ['Avia', 'Total']}).to_csv(os.path.join(tmp_path, BRAND_CSV_NAME), index=False)
+    brands, keyed = station_brands(str(tmp_path), [7, 8, 9])
+    assert not keyed
+    assert brands.iloc[:2].tolist() == ['Avia', 'Total'] and pd.isna(brands.iloc[2])
+
+    pd.DataFrame({'id': [9], 'brand': ['E.Leclerc']}).to_csv(os.path.join(tmp_path, BRAND_TABLE_NAME), index=False)
+    brands, keyed = station_brands(str(tmp_path), [7, 8, 9])
+    assert keyed
+    assert brands.iloc[2] == 'E.Leclerc' and brands.iloc[:2].isna().all()
+
+
+def test_no_brand_file(tmp_path):
+    """Without any brand file, the error tells how to get the brands"""
+    with pytest.raises(ValueError, match='get_data.py'):
+        station_brands(str(tmp_path), [1])
+
+
+def test_brand_join_on_the_station_id(tmp_path):
+    """The brands follow the ids of the stations, whatever their order, unknown stations having no brand"""
+    pd.DataFrame({'id': [3, 1, 2], 'brand': ['Avia', 'TotalEnergies', 'E.Leclerc']}).to_csv(os.path.join(tmp_path, BRAND_CSV_NAME), index=False)
+    table = load_brand_table(ensure_brand_table(str(tmp_path)))
+    brands = join_brands(np.array([2, 9, 3, 1]), table)
+
+    assert brands.iloc[[0, 2, 3]].tolist() == ['E.Leclerc', 'Avia', 'TotalEnergies']
+    assert pd.isna(brands.iloc[1])
+    assert os.path.exists(os.path.join(tmp_path, BRAND_TABLE_NAME))
+
+
+def test_brand_counts_skip_unknown_brands():
+    """The stations without a real brand are not counted"""
+    counts = brand_counts(pd.Series(['Avia', 'Avia', 'Marque inconnue', None, 'Total'], dtype='category'))
+    assert dict(zip(counts['Brand'], counts['Number of stations'])) == {'Avia': 2, 'Total': 1}
+
+
+def station(brand, status=200):
+    """
+    Route of the station API
+    Args:
+        brand (dict): Brand of the station (None if it has none)
+        status (int): Status of the response
+    Returns:
+        route (function): Route of the stand-in server
+    """
+    return lambda headers: (status, {'Content-Type': 'application/json'}, json.dumps({'Brand': brand}).encode())
+
+
+def test_update_brand_table_from_the_station_api(http_server, tmp_path):
+    """A station without brand is stored, the failed ones are retried after a delay doubled at each failure"""
+    url = http_server.url + '/station/'
+    now = pd.Timestamp('2024-01-01', tz='UTC')
+    http_server.routes['/station/1'] = station({'id': 1, 'name': 'TotalEnergies', 'short_name': 'total', 'nb_stations': 1614})
+    http_server.routes['/station/2'] = station(None)
+
+    # Station 3 is unknown to the API (404): it is not stored as a station without brand
+    assert update_brand_table(str(tmp_path), [1, 2, 3], url=url, now=now) == (2, 1)
+    assert load_brand_table(ensure_brand_table(str(tmp_path))).astype(object).to_dict() == {1: 'TotalEnergies', 2: 'Marque inconnue'}
+
+    # Not requested again before its delay, then requested again with a doubled delay
+    http_server.requests.clear()
+    assert update_brand_table(str(tmp_path), [1, 2, 3], url=url, now=now + pd.Timedelta(minutes=30)) == (0, 0)
+    assert update_brand_table(str(tmp_path), [1, 2, 3], url=url, now=now + pd.Timedelta(hours=1)) == (0, 1)
+    assert update_brand_table(str(tmp_path), [1, 2, 3], url=url, now=now + pd.Timedelta(hours=2, minutes=30)) == (0, 0)
+    http_server.routes['/station/3'] = station({'id': 10, 'name': 'Avia'})
+    assert update_brand_table(str(tmp_path), [1, 2, 3], url=url, now=now + pd.Timedelta(hours=3)) == (1, 0)
+    assert [path for path, _ in http_server.requests] == ['/station/3', '/station/3']
+    assert load_brand_table(ensure_brand_table(str(tmp_path)))[3] == 'Avia'
+    assert not os.path.exists(os.path.join(tmp_path, BRAND_RETRY_NAME))
+
+
+def test_update_brand_table_is_bounded_and_stops_when_the_api_is_overloaded(http_server, tmp_path):
+    """An update requests at most max_requests stations, and stops at the first 429 or 5xx"""
+    url = http_server.url + '/station/'
+    for station_id in range(1, 7):
+        http_server.routes[f'/station/{station_id}'] = station({'name': 'Avia'})
+
+    assert update_brand_table(str(tmp_path), range(1, 7), url=url, max_requests=2, max_workers=1) == (2, 0)
+    assert len(http_server.requests) == 2
+
+    http_server.routes['/station/3'] = station(None, status=503)
+    http_server.requests.clear()
+    assert update_brand_table(str(tmp_path), range(1, 7), url=url, max_workers=1) == (0, 1)
+    assert [path for path, _ in http_server.requests] == ['/station/3']
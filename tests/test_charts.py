@@ -0,0 +1,69 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the cache of the Vega-Lite specs of the charts
+# (app/utils/charts.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import pandas as pd
+
+from app.utils.charts import ChartCache, bar_chart
+
+
+class Builder():
+    """
+    Chart builder counting its calls, the heights of the bars changing with each snapshot
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, height):
+        """
+        Return the builder of the chart of a snapshot
+        Args:
+            height (float): Height of the first bar
+        Returns:
+            build (function): Function without arguments returning the chart
+        """
+        def build():
+            self.calls += 1
+            return bar_chart(pd.DataFrame({'Carburant': ['Gazole', 'E10'], 'Prix': [height, height + 0.1]}), 'Carburant:O', 'Prix:Q')
+        return build
+
+
+def test_chart_cache_hits_and_snapshots():
+    """A chart is built once per page, parameters and snapshot, a new snapshot building it again"""
+    cache, builder = ChartCache(), Builder()
+
+    spec = cache.get('price_per_fuel', ('Gazole',), 'a' * 64, builder(1.8))
+    assert cache.get('price_per_fuel', ('Gazole',), 'a' * 64, builder(1.8)) is spec
+    assert builder.calls == 1
+
+    # Other parameters and other snapshot: built again, the dataset named after the new data
+    cache.get('price_per_fuel', ('E10',), 'a' * 64, builder(1.8))
+    updated = cache.get('price_per_fuel', ('Gazole',), 'b' * 64, builder(1.9))
+    assert builder.calls == 3
+    assert list(updated['datasets']) != list(spec['datasets'])
+
+    # The specs of the previous snapshot stay until they are the least recently used
+    assert cache.get('price_per_fuel', ('Gazole',), 'a' * 64, builder(1.8)) is spec
+    rows, entries, size = cache.stats()
+    assert rows == [{'page': 'price_per_fuel', 'hits': 2, 'misses': 3, 'hit_rate': 0.4}]
+    assert entries == 3 and size > 0
+
+
+def test_chart_cache_drops_the_least_recently_used():
+    """Beyond its number of entries, the cache drops the least recently used spec"""
+    cache, builder = ChartCache(max_entries=2), Builder()
+    cache.get('price_per_fuel', (), 'a' * 64, builder(1.8))
+    cache.get('price_per_fuel', (), 'b' * 64, builder(1.9))
+    cache.get('price_per_fuel', (), 'a' * 64, builder(1.8))
+    cache.get('price_per_fuel', (), 'c' * 64, builder(2.0))
+    assert builder.calls == 3
+
+    cache.get('price_per_fuel', (), 'a' * 64, builder(1.8))
+    assert builder.calls == 3
+    cache.get('price_per_fuel', (), 'b' * 64, builder(1.9))
+    assert builder.calls == 4
+
+    cache.clear()
+    assert cache.stats() == ([], 0, 0)
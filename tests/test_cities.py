@@ -0,0 +1,49 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the canonical keys and the index of the cities
+# (app/utils/cities.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import numpy as np
+import pandas as pd
+
+from app.utils.cities import city_key, city_keys, CityIndex
+
+
+def test_city_key_folds_the_spellings():
+    """Accents, case, separators, abbreviations, ligatures and CEDEX share one key"""
+    assert city_key('Saint-Étienne') == 'saint etienne'
+    assert city_key('ST ETIENNE') == 'saint etienne'
+    assert city_key('St-Étienne Cedex 2') == 'saint etienne'
+    assert city_key('Cœuvres') == 'coeuvres'
+    assert city_key('PARIS') == city_key(' paris ') == 'paris'
+
+
+def test_city_keys_keep_unknown_cities():
+    """A missing city has no key"""
+    keys = city_keys(pd.Series(['Lyon', None, 'LYON']))
+    assert list(keys[[0, 2]]) == ['lyon', 'lyon']
+    assert pd.isna(keys[1])
+
+
+def test_city_index_lookup():
+    """Every spelling finds the stations of the city, labelled by its most frequent spelling"""
+    villes = pd.Series(['Paris', 'PARIS', 'Paris', 'Saint-Étienne', 'St-Etienne', None, 'Lyon'])
+    index = CityIndex(villes)
+
+    assert index.keys == ['lyon', 'paris', 'saint etienne']
+    assert index.labels[index.position('paris')] == 'Paris'
+    assert sorted(index.spellings('PARIS')) == ['PARIS', 'Paris']
+    assert np.array_equal(index.mask('st etienne'), [False, False, False, True, True, False, False])
+    assert index.position('Marseille') == -1
+    assert index.spellings('Marseille') == []
+    assert not index.mask('Marseille').any()
+
+
+def test_city_index_search():
+    """The prefix search matches the beginning of the key or of one of its words"""
+    index = CityIndex(pd.Series(['Saint-Étienne', 'Sainte-Maxime', 'Étampes', 'Lyon']))
+    assert index.search('eti') == ['Saint-Étienne']
+    assert index.search('sain') == ['Saint-Étienne', 'Sainte-Maxime']
+    assert index.search('') == index.labels
+    assert index.search('zzz') == []
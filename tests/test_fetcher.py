@@ -0,0 +1,121 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the conditional, retried download of the CSV and
+# the update of the snapshot (app/utils/fetcher.py) against a local HTTP server
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import pytest
+import requests
+
+from app.utils.store import CSV_NAME, SNAPSHOT_NAME, load_snapshot
+from app.utils.fetcher import CHANGES_NAME, fetch_file, diff_snapshots, update_snapshot
+from benchmarks.synthetic import generate_stations
+
+# Body of the served file
+BODY = b'id;gazole_prix\n1;1.8\n' * 1000
+
+
+def conditional(body=BODY, etag='"v1"'):
+    """
+    Route answering 304 when the client already has the ETag
+    Args:
+        body (bytes): Body of the file
+        etag (str): ETag of the file
+    Returns:
+        route (function): Route of the stand-in server
+    """
+    def route(headers):
+        if headers.get('If-None-Match') == etag:
+            return 304, {}, b''
+        return 200, {'ETag': etag}, body
+    return route
+
+
+def sequence(*responses):
+    """
+    Route answering the responses in order, the last one being repeated
+    Args:
+        *responses (tuple): (status, headers, body) of each request
+    Returns:
+        route (function): Route of the stand-in server
+    """
+    responses = list(responses)
+
+    def route(headers):
+        return responses.pop(0) if len(responses) > 1 else responses[0]
+    return route
+
+
+def leftovers(directory):
+    """List the temporary files left in a directory"""
+    return [name for name in os.listdir(directory) if name.endswith(('.part', '.tmp'))]
+
+
+def test_download_then_not_modified(http_server, tmp_path):
+    """The first download writes the file and its ETag, the next one sends it and gets a 304"""
+    http_server.routes['/data.csv'] = conditional()
+    dest_path = os.path.join(tmp_path, 'data.csv')
+
+    assert fetch_file(http_server.url + '/data.csv', dest_path) == 200
+    assert open(dest_path, 'rb').read() == BODY
+    assert fetch_file(http_server.url + '/data.csv', dest_path) == 304
+    assert http_server.requests[1][1]['If-None-Match'] == '"v1"'
+
+    # Without the file, the validators are not sent
+    os.remove(dest_path)
+    assert fetch_file(http_server.url + '/data.csv', dest_path) == 200
+    assert 'If-None-Match' not in http_server.requests[2][1]
+    assert leftovers(tmp_path) == []
+
+
+def test_retry_on_server_errors(http_server, tmp_path):
+    """429 and 5xx responses are retried, other errors are not"""
+    http_server.routes['/data.csv'] = sequence((503, {}, b''), (429, {}, b''), (200, {}, BODY))
+    dest_path = os.path.join(tmp_path, 'data.csv')
+    assert fetch_file(http_server.url + '/data.csv', dest_path, backoff=0) == 200
+    assert len(http_server.requests) == 3
+
+    http_server.routes['/missing.csv'] = sequence((404, {}, b''))
+    with pytest.raises(requests.HTTPError):
+        fetch_file(http_server.url + '/missing.csv', os.path.join(tmp_path, 'missing.csv'), backoff=0)
+    assert len(http_server.requests) == 4
+
+
+def test_retry_on_a_body_cut_in_the_middle(http_server, tmp_path):
+    """A connection dropped while the body streams is retried, and the partial file is removed"""
+    http_server.routes['/data.csv'] = sequence((200, {'X-Truncate': '100'}, BODY), (200, {}, BODY))
+    dest_path = os.path.join(tmp_path, 'data.csv')
+    assert fetch_file(http_server.url + '/data.csv', dest_path, backoff=0, chunk_size=64) == 200
+    assert open(dest_path, 'rb').read() == BODY
+    assert leftovers(tmp_path) == []
+
+    http_server.routes['/cut.csv'] = sequence((200, {'X-Truncate': '100'}, BODY))
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        fetch_file(http_server.url + '/cut.csv', os.path.join(tmp_path, 'cut.csv'), retries=1, backoff=0, chunk_size=64)
+    assert not os.path.exists(os.path.join(tmp_path, 'cut.csv'))
+    assert leftovers(tmp_path) == []
+
+
+def test_diff_snapshots():
+    """Added, removed and updated stations are listed, unchanged ones are not"""
+    previous = generate_stations(5)[['id', 'gazole_prix']]
+    current = previous.iloc[1:].copy()
+    current.loc[2, 'gazole_prix'] = 9.9
+    current.loc[5] = [2000000, 1.5]
+    changes = diff_snapshots(previous, current)
+    assert dict(zip(changes['id'], changes['change'])) == {1000000: 'removed', 1000002: 'updated', 2000000: 'added'}
+
+
+def test_update_snapshot(http_server, tmp_path, stations):
+    """A new CSV rebuilds the snapshot and lists the changes, an unchanged one does nothing"""
+    body = stations.to_csv(sep=';', index=False).encode()
+    http_server.routes['/export.csv'] = conditional(body)
+
+    changes = update_snapshot(http_server.url + '/export.csv', str(tmp_path))
+    assert (changes['change'] == 'added').sum() == len(stations)
+    assert os.path.exists(os.path.join(tmp_path, CSV_NAME))
+    assert os.path.exists(os.path.join(tmp_path, CHANGES_NAME))
+    assert len(load_snapshot(os.path.join(tmp_path, SNAPSHOT_NAME), columns=['id'])) == len(stations)
+
+    assert update_snapshot(http_server.url + '/export.csv', str(tmp_path)) is None
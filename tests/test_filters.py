@@ -0,0 +1,37 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the filter engine of the map
+# (app/utils/filters.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import itertools
+import numpy as np
+
+from app.utils.filters import FilterIndex
+from app.utils.stations import build_stations
+from app.utils.cities import city_key
+from app.utils.store import FUELS
+from benchmarks.synthetic import generate_stations
+
+
+def test_filter_index_matches_the_boolean_filter():
+    """Every combination of fuels and location selects the rows of the pandas boolean filter"""
+    df = generate_stations(500, seed=2)
+    df.loc[::37, 'region'] = None
+    df.loc[::41, 'ville'] = None
+    stations = build_stations(df, ['Marque'] * len(df))
+    index = FilterIndex(stations)
+
+    locations = [(None, None), ('region', 'Inconnue'), ('city', 'inconnue')]
+    locations += [('region', region) for region in df['region'].dropna().unique()]
+    locations += [('city', city_key(ville)) for ville in df['ville'].dropna().unique()[:5]]
+
+    for count in range(3):
+        for fuels in itertools.combinations(FUELS, count):
+            for column, value in locations:
+                mask = np.ones(len(df), dtype=bool)
+                for fuel in fuels:
+                    mask &= df[f'{fuel}_prix'].notna().to_numpy()
+                if column is not None:
+                    mask &= (stations[column] == value).to_numpy()
+                assert index.select(list(fuels), column, value).tolist() == np.flatnonzero(mask).tolist()
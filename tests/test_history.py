@@ -0,0 +1,107 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the history of the prices (app/utils/history.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import sys
+import threading
+import subprocess
+import numpy as np
+import pandas as pd
+
+from app.utils.history import history_lock, ingest, compact, query, _day_files
+
+# Day of the records
+DAY = '2023-10-01'
+
+
+def snapshot(nb_stations, hour):
+    """
+    Snapshot of stations that all updated their diesel price at the same time
+    Args:
+        nb_stations (int): Number of stations
+        hour (int): Hour of the update
+    Returns:
+        df (dataframe): Snapshot with the columns 'id', 'gazole_prix' and 'gazole_maj'
+    """
+    return pd.DataFrame({
+        'id': np.arange(nb_stations, dtype='int64'),
+        'gazole_prix': np.full(nb_stations, 1.8, dtype='float32'),
+        'gazole_maj': pd.Timestamp(f'{DAY} {hour:02d}:00', tz='UTC'),
+    })
+
+
+def test_ingest_skips_known_records_and_compact_merges_the_day(tmp_path):
+    """A record is written once, and the files of a past day are merged"""
+    history_dir = str(tmp_path)
+    assert ingest(snapshot(100, 8), history_dir) == 100
+    assert ingest(snapshot(100, 8), history_dir) == 0
+    assert ingest(snapshot(100, 9), history_dir) == 100
+    assert len(_day_files(history_dir, DAY)) == 2
+
+    assert compact(history_dir, before='2023-10-02') == 1
+    assert len(_day_files(history_dir, DAY)) == 1
+    assert len(query('gazole', DAY, DAY, ids=range(10), history_dir=history_dir)) == 20
+
+
+# Script splitting a day of the history in several files then compacting it, in a loop, until its stop file exists
+SPLITTER = '''
+import os, sys
+import numpy as np
+sys.path.insert(0, sys.argv[1])
+from app.utils.history import history_lock, compact, _day_files
+history_dir, day = sys.argv[2], sys.argv[3]
+print('started', flush=True)
+while not os.path.exists(os.path.join(history_dir, 'stop')):
+    # Split the day in several files again, as new ingests would, then compact it
+    with history_lock(history_dir):
+        files = _day_files(history_dir, day)
+        table = pq.read_table(files)
+        for position, part in enumerate(np.array_split(np.arange(table.num_rows), 4)):
+            pq.write_table(table.take(part), os.path.join(history_dir, f'day={day}', f'split-{position}.parquet'))
+        for path in files:
+            os.remove(path)
+    compact(history_dir, before='9999-12-31')
+'''
+
+
+def test_query_during_compactions_of_another_process(tmp_path):
+    """A query running while another process compacts the day returns each record once"""
+    history_dir = str(tmp_path)
+    for hour in range(10):
+        ingest(snapshot(500, hour), history_dir)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    splitter = subprocess.Popen([sys.executable, '-c', SPLITTER, root, history_dir, DAY], stdout=subprocess.PIPE, text=True)
+    try:
+        assert splitter.stdout.readline().strip() == 'started'
+        sizes = [len(query('gazole', DAY, DAY, history_dir=history_dir)) for _ in range(50)]
+    finally:
+        open(os.path.join(history_dir, 'stop'), 'w').close()
+        splitter.wait()
+    assert sizes == [5000] * 50
+
+
+def test_queries_share_the_lock(tmp_path):
+    """A query is not blocked by another query listing its files, but waits for a writer"""
+    history_dir = str(tmp_path)
+    ingest(snapshot(10, 8), history_dir)
+    results = []
+
+    def run_query():
+        results.append(len(query('gazole', DAY, DAY, history_dir=history_dir)))
+
+    with history_lock(history_dir, shared=True):
+        thread = threading.Thread(target=run_query)
+        thread.start()
+        thread.join(timeout=5)
+        assert results == [10]
+
+    with history_lock(history_dir):
+        thread = threading.Thread(target=run_query)
+        thread.start()
+        thread.join(timeout=0.3)
+        assert thread.is_alive()
+    thread.join()
+    assert results == [10, 10]
@@ -0,0 +1,82 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the cache of the external APIs
+# (app/utils/http_cache.py) against a local HTTP server
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import json
+import time
+
+from app.utils.http_cache import HttpCache, city_url
+
+
+def payload(value, delay=0):
+    """
+    Route answering a JSON value, after a delay
+    Args:
+        value: Value of the response
+        delay (float): Number of seconds before the response
+    Returns:
+        route (function): Route of the stand-in server
+    """
+    def route(headers):
+        time.sleep(delay)
+        return 200, {'Content-Type': 'application/json'}, json.dumps(value).encode()
+    return route
+
+
+def test_city_url_encodes_the_query():
+    """The name of the city is encoded in the query"""
+    assert city_url('Saint-Étienne', 'http://api/') == 'http://api/?opendata=v2&q=Saint-%C3%89tienne'
+
+
+def test_get_never_waits_and_shares_one_request(http_server):
+    """A missing response is fetched in the background once, whatever the number of calls"""
+    http_server.routes['/slow'] = payload([{'id': 1}], delay=0.3)
+    cache = HttpCache()
+    url = http_server.url + '/slow'
+
+    start = time.monotonic()
+    assert cache.get(url) is None
+    assert cache.get(url) is None
+    assert time.monotonic() - start < 0.2
+
+    assert cache.submit(url).result(timeout=5) == [{'id': 1}]
+    assert cache.get(url) == [{'id': 1}]
+    assert len(http_server.requests) == 1
+
+
+def test_expired_response_is_served_while_it_refreshes(http_server):
+    """An expired response is returned at once, the new one replacing it when it arrives"""
+    values = iter([{'version': 1}, {'version': 2}])
+    http_server.routes['/data'] = lambda headers: (200, {'Content-Type': 'application/json'}, json.dumps(next(values)).encode())
+    cache = HttpCache(ttl=0.05)
+    url = http_server.url + '/data'
+
+    assert cache.get(url, wait=5) == {'version': 1}
+    time.sleep(0.1)
+    assert cache.get(url) == {'version': 1}
+    assert cache.submit(url).result(timeout=5) == {'version': 2}
+
+
+def test_least_recently_used_responses_are_dropped(http_server):
+    """Only max_entries responses are kept"""
+    for path in ['/a', '/b', '/c']:
+        http_server.routes[path] = payload(path)
+    cache = HttpCache(max_entries=2)
+    for path in ['/a', '/b', '/c']:
+        cache.get(http_server.url + path, wait=5)
+    assert list(cache.entries) == [http_server.url + '/b', http_server.url + '/c']
+
+
+def test_errors_and_timeouts_return_none(http_server):
+    """A failed or too slow request gives no response, and is requested again by the next call"""
+    http_server.routes['/error'] = lambda headers: (500, {}, b'')
+    http_server.routes['/slow'] = payload('late', delay=1)
+    cache = HttpCache(timeout=(1, 0.2))
+
+    assert cache.get(http_server.url + '/error', wait=5) is None
+    assert cache.get(http_server.url + '/slow', wait=5) is None
+    assert cache.pending == {}
+    cache.get(http_server.url + '/error', wait=5)
+    assert [path for path, _ in http_server.requests].count('/error') == 2
@@ -0,0 +1,36 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the lock files of the data directory
+# (app/utils/locks.py) between processes
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import sys
+import time
+import subprocess
+
+from app.utils.locks import data_lock
+
+# Script holding the lock of a data directory for half a second
+HOLDER = '''
+import sys, time
+sys.path.insert(0, sys.argv[1])
+from app.utils.locks import data_lock
+with data_lock(sys.argv[2]):
+    print('locked', flush=True)
+    time.sleep(0.5)
+'''
+
+
+def test_data_lock_waits_for_another_process(tmp_path):
+    """A process waits until another process releases the lock of the data directory"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    holder = subprocess.Popen([sys.executable, '-c', HOLDER, root, str(tmp_path)], stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == 'locked'
+        start = time.monotonic()
+        with data_lock(str(tmp_path)):
+            waited = time.monotonic() - start
+        assert waited > 0.2
+    finally:
+        holder.wait()
@@ -0,0 +1,25 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the level of detail of the map
+# (app/utils/map.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import numpy as np
+
+from app.utils.map import viewport
+from app.utils.spatial import SpatialIndex
+from app.utils.stations import degrees
+from benchmarks.synthetic import generate_stations
+
+
+def test_viewport_with_the_spatial_index():
+    """The spatial index finds the same stations of the viewport as the scan of the coordinates, in the same order"""
+    data = generate_stations(3000, seed=1)
+    data.loc[[5, 17], 'latitude'] = np.nan
+    index = SpatialIndex(degrees(data['latitude']), degrees(data['longitude']))
+
+    for latitude, longitude, zoom in [(48.8566, 2.3522, 9), (45.76, 4.84, 11), (43.3, 5.4, 7)]:
+        scanned = viewport(data, latitude, longitude, zoom)
+        indexed = viewport(data, latitude, longitude, zoom, index)
+        assert len(scanned) > 0
+        assert indexed.index.tolist() == scanned.index.tolist()
@@ -0,0 +1,102 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the registry of the machine learning models
+# (app/utils/models.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import threading
+import pytest
+
+from app.utils.store import CSV_NAME, build_snapshot, snapshot_hash
+from app.utils.models import ModelRegistry
+from benchmarks.synthetic import generate_stations, write_csv
+
+
+def snapshot(directory, seed, missing=()):
+    """
+    Build the snapshot of synthetic stations
+    Args:
+        directory (str): Directory of the snapshot
+        seed (int): Seed of the stations
+        missing (tuple): Fuels sold by no station
+    Returns:
+        snapshot_path (str): Path of the snapshot
+        snapshot_id (str): Hash of the snapshot
+    """
+    os.makedirs(directory, exist_ok=True)
+    csv_path = os.path.join(directory, CSV_NAME)
+    stations = generate_stations(300, seed=seed)
+    for fuel in missing:
+        stations[f'{fuel}_prix'] = None
+    write_csv(stations, csv_path)
+    snapshot_path = build_snapshot(csv_path)
+    return snapshot_path, snapshot_hash(snapshot_path)
+
+
+def test_failed_training_is_retried(tmp_path):
+    """A training that failed is forgotten, so that the next call trains the model again"""
+    registry = ModelRegistry(os.path.join(tmp_path, 'models'))
+    snapshot_path, snapshot_id = snapshot(os.path.join(tmp_path, 'a'), 0)
+
+    with pytest.raises(Exception):
+        registry.get('regression-unknown', snapshot_path, snapshot_id)
+    registry.executor.submit(lambda: None).result()
+    assert registry.futures == {}
+
+    model = registry.get('regression-gazole', snapshot_path, snapshot_id)
+    assert 'pipeline' in model
+    registry.executor.submit(lambda: None).result()
+    assert registry.futures == {}
+
+
+def test_fuel_without_prices_is_refused(tmp_path):
+    """A fuel sold by no station raises a ValueError instead of failing in the split, the other fuels are trained"""
+    registry = ModelRegistry(os.path.join(tmp_path, 'models'))
+    snapshot_path, snapshot_id = snapshot(os.path.join(tmp_path, 'a'), 0, missing=('gplc',))
+
+    with pytest.raises(ValueError):
+        registry.get('regression-gplc', snapshot_path, snapshot_id)
+    assert 'pipeline' in registry.get('regression-gazole', snapshot_path, snapshot_id)
+
+
+def test_requested_model_jumps_the_queue(tmp_path):
+    """A model still queued behind the others is trained at once by get, without waiting for the worker"""
+    registry = ModelRegistry(os.path.join(tmp_path, 'models'))
+    snapshot_path, snapshot_id = snapshot(os.path.join(tmp_path, 'a'), 0)
+
+    # The worker is busy until the end of the test
+    busy = threading.Event()
+    registry.executor.submit(busy.wait)
+    registry.schedule(snapshot_path, snapshot_id)
+    try:
+        model = registry.get('regression-sp98', snapshot_path, snapshot_id)
+        assert 'pipeline' in model
+        assert ('regression-sp98', snapshot_id) not in registry.futures
+        assert ('regression-gazole', snapshot_id) in registry.futures
+    finally:
+        busy.set()
+    registry.executor.submit(lambda: None).result()
+    assert registry.futures == {}
+
+
+def test_models_of_the_last_snapshots_are_kept(tmp_path):
+    """Scheduling a snapshot keeps the models of the previous one, and drops the older ones"""
+    registry = ModelRegistry(os.path.join(tmp_path, 'models'), keep=2)
+    snapshots = [snapshot(os.path.join(tmp_path, name), seed) for seed, name in enumerate('abc')]
+
+    def saved():
+        registry.executor.submit(lambda: None).result()
+        return {file_name.rpartition('-')[2][:16] for file_name in os.listdir(registry.root) if file_name.endswith('.joblib')}
+
+    registry.schedule(*snapshots[0])
+    registry.schedule(*snapshots[1])
+    assert saved() == {snapshots[0][1][:16], snapshots[1][1][:16]}
+
+    # A rerun of the previous snapshot deletes nothing and trains nothing again
+    registry.schedule(*snapshots[0])
+    assert saved() == {snapshots[0][1][:16], snapshots[1][1][:16]}
+
+    registry.schedule(*snapshots[2])
+    assert saved() == {snapshots[1][1][:16], snapshots[2][1][:16]}
+    assert {key[1] for key in registry.models} == {snapshots[1][1], snapshots[2][1]}
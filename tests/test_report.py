@@ -0,0 +1,50 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the static report (app/utils/report.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import html
+import numpy as np
+import pytest
+
+from app.utils.store import ensure_snapshot, snapshot_hash
+from app.utils.report import build_report, clusters_task
+from report import main
+
+
+def test_clusters_beyond_the_colors(tmp_path):
+    """The clusters are plotted whatever their number, the colors being reused"""
+    rng = np.random.default_rng(0)
+    latitude, longitude = rng.uniform(42, 51, 500), rng.uniform(-5, 8, 500)
+    files, _ = clusters_task(str(tmp_path), 'clusters_25', latitude, longitude, np.arange(500) % 25, 25)
+    assert files == ['clusters_25.png']
+    assert os.path.getsize(os.path.join(tmp_path, 'clusters_25.png')) > 0
+
+
+def test_too_few_clusters_are_refused():
+    """The command line refuses less than 2 clusters"""
+    with pytest.raises(SystemExit):
+        main(['--clusters', '1'])
+
+
+def test_report_of_the_synthetic_stations(data_dir, stations, tmp_path):
+    """Every view of the report is rendered in this process, the brand chart being left out without a brand table"""
+    snapshot_path = ensure_snapshot(data_dir)
+    output_dir = os.path.join(tmp_path, 'report')
+    ville = stations['ville'].iloc[0]
+
+    results = build_report(snapshot_path, snapshot_hash(snapshot_path), data_dir, output_dir, [ville], k=4, max_workers=1)
+
+    assert 'Number of stations per brand' not in results['view'].tolist()
+    assert len(results) == 7
+    files = [file for row in results['files'] for file in row.split(', ')]
+    for file in files:
+        assert os.path.getsize(os.path.join(output_dir, file)) > 0
+    assert 'clusters_4.png' in files
+
+    with open(os.path.join(output_dir, 'index.html'), encoding='utf-8') as index:
+        page = index.read()
+    for view, row in zip(results['view'], results['files']):
+        assert html.escape(view) in page
+        assert f'href="{html.escape(row.split(", ")[0])}"' in page
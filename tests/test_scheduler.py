@@ -0,0 +1,79 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the swap of the live snapshot by the background
+# refresh (app/utils/scheduler.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import time
+
+from app.utils.store import CSV_NAME, load_snapshot
+from app.utils.scheduler import SNAPSHOTS_DIR, RefreshScheduler
+from benchmarks.synthetic import write_csv
+
+
+def new_download(data_dir, stations):
+    """
+    Replace the CSV of the data directory, as a new download would
+    Args:
+        data_dir (str): Data directory
+        stations (dataframe): Stations of the new CSV
+    Returns:
+        None
+    """
+    csv_path = os.path.join(data_dir, CSV_NAME)
+    write_csv(stations, csv_path)
+    # Newer than the snapshot built from the previous CSV, whatever the resolution of the clock
+    modified = time.time() + 10 * len(os.listdir(data_dir))
+    os.utime(csv_path, (modified, modified))
+
+
+def test_swap_keeps_the_previous_snapshot(data_dir, stations):
+    """A new snapshot goes live warmed, the previous one stays readable and the older ones are deleted"""
+    warmed = []
+    scheduler = RefreshScheduler(data_dir, interval=0, warm=warmed.append).start()
+    assert not scheduler.running()
+    first_path, first_id = scheduler.current()
+    first_dataset = scheduler.dataset(first_path, first_id)
+    assert warmed == []
+
+    # Same snapshot: no swap, the live dataset is warmed
+    assert not scheduler.check()
+    assert warmed == [first_dataset]
+
+    new_download(data_dir, stations.iloc[:-20])
+    assert scheduler.check()
+    second_path, second_id = scheduler.live[:2]
+    assert second_id != first_id
+    assert warmed[-1] is scheduler.dataset(second_path, second_id)
+    assert len(load_snapshot(second_path, columns=['id'])) == len(stations) - 20
+
+    # The reruns that started before the swap keep the dataset of the previous snapshot and its file
+    assert scheduler.previous[1] == first_id
+    assert scheduler.dataset(first_path, first_id) is first_dataset
+    assert len(load_snapshot(first_path, columns=['id'])) == len(stations)
+
+    new_download(data_dir, stations.iloc[:-40])
+    assert scheduler.check()
+    third_path, third_id = scheduler.live[:2]
+    assert scheduler.nb_swaps == 3
+    assert scheduler.previous[1] == second_id
+    # The file of the first snapshot is deleted, a rerun still holding its dataset keeps reading it
+    assert len(first_dataset.frame(['id'])) == len(stations)
+    assert sorted(os.listdir(os.path.join(data_dir, SNAPSHOTS_DIR))) == sorted(
+        os.path.basename(path) for path in (second_path, third_path)
+    )
+
+
+def test_remove_old_snapshots_keeps_live_and_previous(data_dir):
+    """Only the published snapshots that are neither live nor previous are deleted"""
+    scheduler = RefreshScheduler(data_dir, interval=0).start()
+    live_path, _ = scheduler.current()
+    published_dir = os.path.join(data_dir, SNAPSHOTS_DIR)
+    for file_name in ('0123456789abcdef.arrow', 'fedcba9876543210.arrow', 'notes.txt'):
+        with open(os.path.join(published_dir, file_name), 'w') as file:
+            file.write('')
+    scheduler.previous = (os.path.join(published_dir, 'fedcba9876543210.arrow'), 'fedcba9876543210', None)
+
+    scheduler.remove_old_snapshots()
+    assert sorted(os.listdir(published_dir)) == sorted([os.path.basename(live_path), 'fedcba9876543210.arrow', 'notes.txt'])
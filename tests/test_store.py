@@ -0,0 +1,117 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the columnar snapshot (app/utils/store.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+from app.utils.store import CSV_NAME, SNAPSHOT_NAME, PRICE_COLUMNS, DATE_COLUMNS, build_snapshot, ensure_snapshot, load_snapshot, snapshot_hash, snapshot_validation, write_atomic
+from app.utils.anomalies import VALIDATION, STALE_DAYS, load_quarantine
+
+
+def test_snapshot_round_trip(data_dir, stations):
+    """The snapshot keeps the rows, the prices and the dates of the CSV with compact types"""
+    snapshot_path = build_snapshot(os.path.join(data_dir, CSV_NAME))
+    df = load_snapshot(snapshot_path)
+
+    assert snapshot_path == os.path.join(data_dir, SNAPSHOT_NAME)
+    assert len(df) == len(stations)
+    assert np.array_equal(df['id'].to_numpy(), stations['id'].to_numpy())
+    assert all(df[column].dtype == 'float32' for column in PRICE_COLUMNS)
+    assert all(str(df[column].dtype).startswith('datetime64') for column in DATE_COLUMNS)
+    assert isinstance(df['ville'].dtype, pd.CategoricalDtype)
+    np.testing.assert_allclose(df['gazole_prix'].to_numpy(), stations['gazole_prix'].to_numpy(), rtol=1e-6)
+    assert df['gazole_maj'].isna().equals(stations['gazole_maj'].isna())
+
+
+def test_load_selected_columns(data_dir):
+    """Only the requested columns are read"""
+    df = load_snapshot(build_snapshot(os.path.join(data_dir, CSV_NAME)), columns=['id', 'gazole_prix'])
+    assert list(df.columns) == ['id', 'gazole_prix']
+
+
+def test_ensure_snapshot_rebuilds_after_the_csv(data_dir, stations):
+    """The snapshot is rebuilt when the CSV is newer, and its hash follows the CSV"""
+    snapshot_path = ensure_snapshot(data_dir)
+    first_hash = snapshot_hash(snapshot_path)
+    assert ensure_snapshot(data_dir) == snapshot_path
+    assert snapshot_hash(snapshot_path) == first_hash
+
+    csv_path = os.path.join(data_dir, CSV_NAME)
+    stations.iloc[:100].to_csv(csv_path, sep=';', index=False)
+    later = time.time() + 10
+    os.utime(csv_path, (later, later))
+
+    assert len(load_snapshot(ensure_snapshot(data_dir), columns=['id'])) == 100
+    assert snapshot_hash(snapshot_path) != first_hash
+
+
+def test_ensure_snapshot_screens_the_prices(data_dir, stations):
+    """The snapshot built for the app goes through the validation, its hash differing from the unscreened one"""
+    csv_path = os.path.join(data_dir, CSV_NAME)
+    stations.loc[0, 'gazole_prix'] = 42.0
+    stations.to_csv(csv_path, sep=';', index=False)
+    raw_hash = snapshot_hash(build_snapshot(csv_path))
+    assert snapshot_validation(os.path.join(data_dir, SNAPSHOT_NAME)) == ''
+
+    # An unscreened snapshot is rebuilt even if it is newer than the CSV
+    snapshot_path = ensure_snapshot(data_dir)
+    df = load_snapshot(snapshot_path, columns=['id', 'gazole_prix'])
+
+    assert snapshot_validation(snapshot_path) == VALIDATION
+    assert snapshot_hash(snapshot_path) != raw_hash
+    assert np.isnan(df['gazole_prix'].iloc[0])
+    quarantine = load_quarantine(data_dir)
+    flagged = (quarantine['id'] == stations['id'].iloc[0]) & (quarantine['fuel'] == 'gazole')
+    assert quarantine.loc[flagged, 'reason'].tolist() == ['bounds']
+
+
+def test_rebuilt_snapshot_is_screened_at_the_download_time(data_dir, stations):
+    """The stale check of a rebuilt snapshot is relative to the download of its CSV, not to the current time"""
+    csv_path = os.path.join(data_dir, CSV_NAME)
+    dates = pd.concat([pd.to_datetime(stations[column], utc=True) for column in DATE_COLUMNS])
+    downloaded = dates.max() + pd.Timedelta(hours=1)
+    os.utime(csv_path, (downloaded.timestamp(), downloaded.timestamp()))
+
+    ensure_snapshot(data_dir)
+    quarantine = load_quarantine(data_dir)
+    assert (quarantine['reason'] == 'stale').sum() == (dates < downloaded - pd.Timedelta(days=STALE_DAYS)).sum()
+
+
+def test_concurrent_atomic_writes(tmp_path):
+    """Two writers of the same file never share a temporary file, a failed write leaves nothing behind"""
+    path = os.path.join(tmp_path, 'file.bin')
+    errors = []
+
+    def writer(value):
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as file:
+                for _ in range(50):
+                    file.write(value * 1000)
+        try:
+            for _ in range(50):
+                write_atomic(path, write)
+        except OSError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=writer, args=(value,)) for value in (b'a', b'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    with open(path, 'rb') as file:
+        content = file.read()
+    assert content in (b'a' * 50000, b'b' * 50000)
+
+    def failing(tmp_path):
+        raise OSError('disk full')
+    try:
+        write_atomic(path, failing)
+    except OSError:
+        pass
+    assert os.listdir(tmp_path) == ['file.bin']
@@ -0,0 +1,86 @@
+# ------------------------------------------------------------------------------
+# Description: This file tests the bucketing and the downsampling of the
+# price-evolution series (app/utils/timeseries.py)
+# ------------------------------------------------------------------------------
+
+# Import libraries
+import numpy as np
+import pandas as pd
+
+from app.utils.timeseries import TIMEZONE, choose_bucket, resample_prices, lttb, downsample, price_series
+
+
+def test_resample_prices_per_day():
+    """Each local day gets the minimum, mean, maximum and number of its prices, empty days being dropped"""
+    dates = pd.Series(pd.to_datetime(['2024-01-01 08:00', '2024-01-01 23:30', '2024-01-03 10:00'], utc=True))
+    series = resample_prices(dates, pd.Series([1.8, 2.0, 1.7]), 'Daily')
+
+    # 23:30 UTC is already the next day in France
+    assert series['date'].dt.tz_convert(TIMEZONE).dt.strftime('%Y-%m-%d').tolist() == ['2024-01-01', '2024-01-02', '2024-01-03']
+    assert series['min'].tolist() == [1.8, 2.0, 1.7]
+    assert series['count'].tolist() == [1, 1, 1]
+
+
+def test_resample_prices_per_week_and_month():
+    """Weeks start on Monday and months on their first day, the missing prices being ignored"""
+    dates = pd.Series(pd.date_range('2024-01-03', '2024-02-20', freq='D', tz=TIMEZONE))
+    prices = pd.Series(np.arange(len(dates), dtype='float64'))
+    prices.iloc[0] = np.nan
+
+    weeks = resample_prices(dates, prices, 'Weekly')
+    assert (weeks['date'].dt.dayofweek == 0).all()
+    assert weeks['count'].sum() == len(dates) - 1
+
+    months = resample_prices(dates, prices, 'Monthly')
+    assert months['date'].dt.day.tolist() == [1, 1]
+    assert months['min'].tolist() == [1.0, 29.0]
+    assert months['max'].tolist() == [28.0, len(dates) - 1]
+
+
+def test_choose_bucket():
+    """The finest bucket fitting in the number of points is chosen"""
+    day = pd.Series(pd.date_range('2024-01-01', periods=24, freq='h', tz='UTC'))
+    years = pd.Series(pd.to_datetime(['2020-01-01', '2024-01-01'], utc=True))
+    assert choose_bucket(day) == 'Hourly'
+    assert choose_bucket(years) == 'Weekly'
+    assert choose_bucket(years, max_points=10) == 'Monthly'
+
+
+def test_lttb_keeps_the_ends_and_the_peaks():
+    """LTTB keeps the first and last points, and the spikes of the line"""
+    x = np.arange(1000, dtype='float64')
+    y = np.zeros(1000)
+    y[[250, 700]] = [5.0, -5.0]
+    positions = lttb(x, y, 50)
+
+    assert len(positions) == 50
+    assert positions[0] == 0 and positions[-1] == 999
+    assert np.all(np.diff(positions) > 0)
+    assert {250, 700} <= set(positions.tolist())
+    assert np.array_equal(lttb(x[:10], y[:10], 50), np.arange(10))
+
+
+def test_downsample_keeps_the_band_and_the_counts():
+    """The downsampled series is capped, its band and counts covering every bucket"""
+    dates = pd.Series(pd.date_range('2023-01-01', periods=24 * 400, freq='h', tz='UTC'))
+    rng = np.random.default_rng(0)
+    prices = pd.Series(1.8 + rng.normal(0, 0.05, len(dates)))
+    series = resample_prices(dates, prices, 'Hourly')
+    small = downsample(series, 300)
+
+    assert len(small) == 300
+    assert small['count'].sum() == series['count'].sum()
+    assert small['min'].min() == series['min'].min()
+    assert small['max'].max() == series['max'].max()
+    assert small['date'].is_monotonic_increasing
+
+
+def test_price_series():
+    """The automatic bucket fits the range, and an empty history gives an empty series"""
+    dates = pd.Series(pd.date_range('2023-01-01', periods=5000, freq='3h', tz='UTC'))
+    series, bucket = price_series(dates, pd.Series(np.full(5000, 1.8)))
+    assert bucket == 'Daily'
+    assert len(series) <= 1000
+
+    series, _ = price_series(dates.iloc[:0], pd.Series([], dtype='float64'))
+    assert series.empty